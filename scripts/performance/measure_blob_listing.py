@@ -0,0 +1,94 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Measures the cost of listing the blobs matching a pattern in containers of growing size, listing the whole
+container and filtering the names as before, and with the prefix of the pattern pushed down to the service.
+The containers are stand-ins which count the pages of results a service would return.
+
+  python measure_blob_listing.py [--sizes N [N ...]] [--page-latency SECONDS]
+"""
+
+import argparse
+from fnmatch import fnmatch
+from timeit import default_timer
+
+from azure.cli.core.profiles import get_sdk, ResourceType
+from azure.cli.command_modules.storage.util import collect_blobs
+
+PAGE_SIZE = 5000
+PATTERNS = ['logs/2017/10/*', 'logs/201[67]/1?/*.log', '*.png']
+
+
+class StandInContainer(object):
+    """ A container of log blobs logs/<year>/<month>/<day>/<n>.log which counts the pages listed. """
+
+    def __init__(self, size):
+        per_day = max(1, size // (10 * 12 * 28))
+        self.names = sorted('logs/{}/{:02d}/{:02d}/{:06d}.log'.format(2008 + i // (12 * 28 * per_day) % 10,
+                                                                      1 + i // (28 * per_day) % 12,
+                                                                      1 + i // per_day % 28, i)
+                            for i in range(size))
+        self.pages = 0
+        self.items = 0
+
+    def list_blobs(self, container, prefix=None, delimiter=None):
+        Blob, BlobPrefix = get_sdk(ResourceType.DATA_STORAGE, 'blob.models#Blob', 'blob.models#BlobPrefix')
+        results = []
+        last_prefix = None
+        for name in self.names:
+            if prefix and not name.startswith(prefix):
+                continue
+            rest = name[len(prefix or ''):]
+            if delimiter and delimiter in rest:
+                virtual_directory = (prefix or '') + rest[:rest.index(delimiter) + 1]
+                if virtual_directory != last_prefix:
+                    last_prefix = virtual_directory
+                    item = BlobPrefix()
+                    item.name = virtual_directory
+                    results.append(item)
+                continue
+            blob = Blob()
+            blob.name = name
+            results.append(blob)
+        self.pages += max(1, (len(results) + PAGE_SIZE - 1) // PAGE_SIZE)
+        self.items += len(results)
+        return results
+
+
+def _list_all(container, pattern):
+    return [b.name for b in container.list_blobs('container') if fnmatch(b.name, pattern)]
+
+
+def measure(size, pattern, page_latency):
+    results = []
+    for name, action in [('full listing', _list_all),
+                         ('prefix pushdown', lambda c, p: list(collect_blobs(c, 'container', p)))]:
+        container = StandInContainer(size)
+        start = default_timer()
+        matched = action(container, pattern)
+        elapsed = default_timer() - start + container.pages * page_latency
+        results.append((name, len(matched), container.pages, container.items, elapsed))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--page-latency', type=float, default=0.1,
+                        help='The time the service takes to return a page of results, in seconds.')
+    args = parser.parse_args()
+
+    print('{:>9} {:<24} {:<16} {:>8} {:>6} {:>8} {:>9}'.format('blobs', 'pattern', 'listing', 'matched', 'pages',
+                                                               'items', 'seconds'))
+    for size in args.sizes:
+        for pattern in PATTERNS:
+            for name, matched, pages, items, elapsed in measure(size, pattern, args.page_latency):
+                print('{:>9} {:<24} {:<16} {:>8} {:>6} {:>8} {:>9.2f}'.format(size, pattern, name, matched, pages,
+                                                                              items, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Measures the upload of a large file in blocks with the Content-MD5 of the file computed, reading the file once to
+hash it and again to upload it as before, and from a memory map of the file hashed while the blocks are uploaded.
+The uploads go to a stand-in which takes the time a connection of the given bandwidth would take for each block.
+The peak memory is the peak of the Python allocations, which shows whether the file is ever buffered as a whole.
+Both uploads read the file from the page cache, warmed before each run.
+
+  python measure_upload_md5.py [--size-gb N] [--bandwidth MBPS] [--concurrency N]
+"""
+
+import argparse
+import base64
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from timeit import default_timer
+
+from azure.cli.command_modules.storage.transfer import choose_block_size, upload_blocks_adaptively
+
+
+def _create_file(path, size):
+    chunk = os.urandom(4 * 1024 * 1024)
+    with open(path, 'wb') as f:
+        for offset in range(0, size, len(chunk)):
+            f.write(chunk[:size - offset])
+
+
+def _warm(path):
+    with open(path, 'rb') as f:
+        while f.read(16 * 1024 * 1024):
+            pass
+
+
+def _stand_in_put_block(bandwidth):
+    def _put_block(data, _):
+        time.sleep(len(data) / bandwidth)
+    return _put_block
+
+
+def _read_then_upload(path, put_block, concurrency):
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(4 * 1024 * 1024), b''):
+            md5.update(chunk)
+    size = os.path.getsize(path)
+    block_size = choose_block_size(size)
+
+    def _put(index):
+        with open(path, 'rb') as f:
+            f.seek(index * block_size)
+            put_block(f.read(block_size), '{:08d}'.format(index))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(_put, range((size + block_size - 1) // block_size)))
+    return base64.b64encode(md5.digest()).decode('utf-8')
+
+
+def _mapped_overlapped(path, put_block, concurrency):
+    return upload_blocks_adaptively(path, put_block, initial_concurrency=concurrency, max_concurrency=concurrency,
+                                    compute_md5=True).content_md5
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-gb', type=float, default=4)
+    parser.add_argument('--bandwidth', type=float, default=100,
+                        help='The bandwidth of a connection to the stand-in service, in MB/s.')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    try:
+        path = os.path.join(folder, 'large.bin')
+        size = int(args.size_gb * 1024 ** 3)
+        _create_file(path, size)
+        put_block = _stand_in_put_block(args.bandwidth * 1e6)
+
+        print('{} bytes in blocks of {} bytes, {} connections of {} MB/s'.format(
+            size, choose_block_size(size), args.concurrency, args.bandwidth))
+        print('{:<24} {:>9} {:>9} {:>16}'.format('upload', 'seconds', 'MB/s', 'peak memory MB'))
+        digests = set()
+        for name, upload in [('read, then upload', _read_then_upload), ('mapped, overlapped MD5', _mapped_overlapped)]:
+            _warm(path)
+            tracemalloc.start()
+            start = default_timer()
+            digests.add(upload(path, put_block, args.concurrency))
+            elapsed = default_timer() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print('{:<24} {:>9.2f} {:>9.1f} {:>16.1f}'.format(name, elapsed, size / elapsed / 1e6, peak / 1e6))
+        assert len(digests) == 1, 'the uploads computed different MD5s'
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
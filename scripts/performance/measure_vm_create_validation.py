@@ -0,0 +1,110 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# Measures the latency of the 'az vm create' argument validation against a stand-in for ARM which
+# answers every request after a fixed delay, with validators run sequentially and concurrently.
+#
+#   python measure_vm_create_validation.py [--latency SECONDS] [--loop N]
+
+import argparse
+import inspect
+import os
+import sys
+import threading
+import time
+from timeit import default_timer
+
+import mock
+
+from azure.cli.command_modules.vm.custom import create_vm
+import azure.cli.command_modules.vm._validators as vm_validators
+
+SUBSCRIPTION = '00000000-0000-0000-0000-000000000000'
+IMAGE_ALIASES = [{'urnAlias': 'UbuntuLTS', 'publisher': 'Canonical', 'offer': 'UbuntuServer',
+                  'sku': '16.04-LTS', 'version': 'latest'}]
+
+
+class StandInARM(object):  # pylint: disable=too-few-public-methods
+    """ Mocked management clients whose operations all take `latency` seconds. """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def respond(self, value):
+        def _operation(*_, **__):
+            with self._lock:
+                self.requests += 1
+            time.sleep(self.latency)
+            return value
+        return _operation
+
+    def client(self, *_, **__):
+        client = mock.MagicMock()
+        client.config.subscription_id = SUBSCRIPTION
+        resource_group = mock.MagicMock(location='westus')
+        resource_group.name = 'rg'
+        role = mock.MagicMock(id='/subscriptions/{}/providers/Microsoft.Authorization/roleDefinitions/'
+                                 'b24988ac-6180-42a0-ab88-20f7382dd24c'.format(SUBSCRIPTION))
+        client.resource_groups.get.side_effect = self.respond(resource_group)
+        client.role_definitions.list.side_effect = self.respond([role])
+        client.virtual_networks.list.side_effect = self.respond([])
+        client.storage_accounts.list_by_resource_group.side_effect = self.respond([])
+        return client
+
+
+def _create_namespace():
+    spec = getattr(inspect, 'getfullargspec', getattr(inspect, 'getargspec', None))(create_vm)
+    defaults = dict(zip(spec.args[-len(spec.defaults):], spec.defaults))
+    defaults.update({
+        'vm_name': 'vm1',
+        'resource_group_name': 'rg',
+        'image': 'UbuntuLTS',
+        'admin_username': 'azureuser',
+        'admin_password': 'Password1234!',
+        'authentication_type': 'password',
+        'availability_set': 'set1',
+        'nsg': 'nsg1',
+        'public_ip_address': 'ip1',
+        'vnet_name': 'vnet1',
+        'subnet': 'subnet1',
+        'assign_identity': True,
+        'identity_scope': '/subscriptions/{}/resourceGroups/rg'.format(SUBSCRIPTION),
+        'validate': True
+    })
+    return argparse.Namespace(**defaults)
+
+
+def measure(arm, max_concurrency, loop):
+    timings = []
+    with mock.patch.dict(os.environ, {'AZURE_CORE_MAX_CONCURRENCY': str(max_concurrency)}):
+        for _ in range(loop):
+            arm.requests = 0
+            start = default_timer()
+            vm_validators.process_vm_create_namespace(_create_namespace())
+            timings.append(default_timer() - start)
+    print('max_concurrency={:<3} requests={:<3} mean={:.3f}s min={:.3f}s'.format(
+        max_concurrency, arm.requests, sum(timings) / len(timings), min(timings)))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Measure vm create argument validation latency.')
+    parser.add_argument('--latency', type=float, default=0.2, help='ARM response time in seconds')
+    parser.add_argument('--loop', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    arm = StandInARM(args.latency)
+    with mock.patch('azure.cli.core.commands.client_factory.get_mgmt_service_client', arm.client), \
+            mock.patch('azure.cli.core.commands.client_factory.get_subscription_id', lambda: SUBSCRIPTION), \
+            mock.patch.object(vm_validators, 'check_existence', arm.respond(True)), \
+            mock.patch('azure.cli.command_modules.vm._actions.load_images_from_aliases_doc', lambda: IMAGE_ALIASES):
+        print('ARM latency: {}s'.format(args.latency))
+        measure(arm, 1, args.loop)
+        measure(arm, 8, args.loop)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,79 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import threading
+import time
+
+import azure.cli.core.azlogging as azlogging
+from azure.cli.core._session import Session
+
+logger = azlogging.get_az_logger(__name__)
+
+
+class SubscriptionCatalog(object):
+    '''Rarely changing subscription metadata persisted in a JSON file per cloud and subscription.
+
+    :param filename: Name of the catalog file in the configuration directory.
+    :param ttl: Number of seconds after which an entry is fetched again.
+    '''
+
+    def __init__(self, filename, ttl):
+        self.filename = filename
+        self.ttl = ttl
+        self._session = None
+        self._lock = threading.RLock()
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                from azure.cli.core._environment import get_config_dir
+                self._session = Session()
+                try:
+                    self._session.load(os.path.join(get_config_dir(), self.filename))
+                except (OSError, IOError, ValueError):
+                    # A missing config directory or a corrupt catalog only disables persistence
+                    self._session.filename = None
+                    self._session.data = {}
+            return self._session
+
+    def _get_entries(self, cloud_name, subscription_id):
+        return self.session[cloud_name].setdefault(subscription_id, {})
+
+    def get(self, key, fetch, refresh=False, cloud_name=None, subscription_id=None):
+        '''Return the catalog entry `key` of the current (or given) subscription, calling `fetch` to
+        populate it when it is missing, expired or `refresh` is requested.
+        '''
+        cloud_name, subscription_id = _resolve_scope(cloud_name, subscription_id)
+        with self._lock:
+            entry = self._get_entries(cloud_name, subscription_id).get(key)
+        if refresh or not entry or time.time() - entry['time'] > self.ttl:
+            logger.debug("Refreshing '%s' in catalog '%s'", key, self.filename)
+            return self.set(key, fetch(), cloud_name, subscription_id)
+        return entry['value']
+
+    def set(self, key, value, cloud_name=None, subscription_id=None):
+        cloud_name, subscription_id = _resolve_scope(cloud_name, subscription_id)
+        with self._lock:
+            self._get_entries(cloud_name, subscription_id)[key] = {'time': time.time(), 'value': value}
+            self.session.save_with_retry()
+        return value
+
+    def clear(self, cloud_name=None, subscription_id=None):
+        cloud_name, subscription_id = _resolve_scope(cloud_name, subscription_id)
+        with self._lock:
+            self.session[cloud_name].pop(subscription_id, None)
+            self.session.save_with_retry()
+
+
+def _resolve_scope(cloud_name, subscription_id):
+    if not cloud_name:
+        from azure.cli.core.cloud import get_active_cloud_name
+        cloud_name = get_active_cloud_name()
+    if not subscription_id:
+        from azure.cli.core._profile import Profile
+        subscription_id = Profile().get_subscription_id()
+    return cloud_name, subscription_id
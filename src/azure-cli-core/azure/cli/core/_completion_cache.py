@@ -0,0 +1,184 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import threading
+import time
+
+import azure.cli.core.azlogging as azlogging
+from azure.cli.core._session import Session
+
+logger = azlogging.get_az_logger(__name__)
+
+COMPLETION_CACHE_FILE_NAME = 'completionCache.json'
+# Entries younger than the TTL are served as is. Older entries are served while they are refreshed in the
+# background, unless they are older than the maximum staleness, in which case they are fetched again first.
+COMPLETION_CACHE_TTL = 60
+COMPLETION_CACHE_MAX_STALENESS = 60 * 60
+COMPLETION_CACHE_MAX_ENTRIES = 100
+COMPLETION_REFRESH_TIMEOUT = 30
+
+# Commands which change the resources listed by the completers of their command module
+INVALIDATING_COMMANDS = ('create', 'delete')
+
+
+class CompletionCache(object):
+    '''Caches completion values per subscription in a JSON file so they can be shared between TAB
+    presses, which are separate processes for shell completion.
+    '''
+
+    def __init__(self, filename=None, ttl=None, max_staleness=COMPLETION_CACHE_MAX_STALENESS,
+                 max_entries=COMPLETION_CACHE_MAX_ENTRIES):
+        self.filename = filename
+        self.ttl = ttl
+        self.max_staleness = max_staleness
+        self.max_entries = max_entries
+        self._session = None
+        self._lock = threading.RLock()
+        self._refreshing = {}
+        # When set, stale entries are queued by `_refresh` and fetched by `run_deferred_refresh` instead of
+        # a background thread, so that the caller can do it in a process the shell does not wait for.
+        self.defer_refresh = False
+        self._deferred = {}
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                self._session = Session()
+                if self.filename:
+                    try:
+                        self._session.load(self.filename)
+                    except (OSError, IOError, ValueError):
+                        # A missing config directory or a corrupt cache file only disables caching
+                        self._session.filename = None
+                        self._session.data = {}
+            return self._session
+
+    def _get_ttl(self):
+        if self.ttl is not None:
+            return self.ttl
+        from azure.cli.core._config import az_config
+        return az_config.getint('core', 'completion_cache_ttl', fallback=COMPLETION_CACHE_TTL)
+
+    def get(self, subscription_id, key, fetch, scope=None):
+        '''Return the cached values for `key`, calling `fetch` to get them when they are missing or expired.
+        :param scope: Name of the command module whose create/delete commands invalidate the entry.
+        '''
+        ttl = self._get_ttl()
+        if ttl <= 0:
+            return fetch()
+
+        with self._lock:
+            entry = self.session[subscription_id].get(key)
+        age = time.time() - entry['time'] if entry else None
+        if age is None or age > max(ttl, self.max_staleness):
+            logger.debug("Completion cache miss for '%s'", key)
+            return self._store(subscription_id, key, fetch(), scope)
+        if age > ttl:
+            logger.debug("Completion cache entry for '%s' is stale, refreshing in the background", key)
+            self._refresh(subscription_id, key, fetch, scope)
+        return entry['values']
+
+    def _store(self, subscription_id, key, values, scope):
+        values = list(values)
+        with self._lock:
+            self.session[subscription_id][key] = {'time': time.time(), 'scope': scope, 'values': values}
+            self._evict()
+            self.session.save_with_retry()
+        return values
+
+    def _evict(self):
+        entries = [(entry['time'], subscription_id, key)
+                   for subscription_id, cache in self.session.data.items()
+                   for key, entry in cache.items()]
+        for _, subscription_id, key in sorted(entries)[:max(0, len(entries) - self.max_entries)]:
+            del self.session.data[subscription_id][key]
+
+    def _refresh(self, subscription_id, key, fetch, scope):
+        def _run():
+            try:
+                self._store(subscription_id, key, fetch(), scope)
+            except Exception as ex:  # pylint: disable=broad-except
+                logger.debug("Unable to refresh completion cache entry for '%s': %s", key, ex)
+            finally:
+                with self._lock:
+                    self._refreshing.pop((subscription_id, key), None)
+
+        with self._lock:
+            if self.defer_refresh:
+                self._deferred.setdefault((subscription_id, key), _run)
+                return
+            if (subscription_id, key) in self._refreshing:
+                return
+            thread = threading.Thread(target=_run)
+            thread.daemon = True
+            self._refreshing[(subscription_id, key)] = thread
+        thread.start()
+
+    @property
+    def has_deferred_refresh(self):
+        with self._lock:
+            return bool(self._deferred)
+
+    def run_deferred_refresh(self):
+        with self._lock:
+            refreshes = list(self._deferred.values())
+            self._deferred.clear()
+        for refresh in refreshes:
+            refresh()
+
+    def wait_for_refresh(self, timeout=COMPLETION_REFRESH_TIMEOUT):
+        deadline = time.time() + timeout
+        with self._lock:
+            threads = list(self._refreshing.values())
+        for thread in threads:
+            thread.join(max(0, deadline - time.time()))
+
+    def invalidate(self, scope):
+        with self._lock:
+            invalidated = False
+            for cache in self.session.data.values():
+                for key in [k for k, entry in cache.items() if entry.get('scope') == scope]:
+                    del cache[key]
+                    invalidated = True
+            if invalidated:
+                logger.debug("Invalidated completion cache entries of '%s'", scope)
+                self.session.save_with_retry()
+
+
+def _get_completion_cache_path():
+    from azure.cli.core._environment import get_config_dir
+    return os.path.join(get_config_dir(), COMPLETION_CACHE_FILE_NAME)
+
+
+COMPLETION_CACHE = CompletionCache(_get_completion_cache_path())
+
+
+def get_command_scope(command):
+    '''Name of the command module (or extension) that registered `command`.'''
+    from azure.cli.core.commands import command_module_map
+    module_name = command_module_map.get(command) if command else None
+    return module_name.rsplit('.', 1)[0] if module_name else None
+
+
+def get_cached_completion_list(key, fetch, scope=None):
+    '''Return completion values for `key` in the current subscription from the completion cache.'''
+    from azure.cli.core._profile import Profile
+    try:
+        subscription_id = Profile().get_subscription_id()
+    except Exception:  # pylint: disable=broad-except
+        return list(fetch())
+    return COMPLETION_CACHE.get(subscription_id, key, fetch, scope)
+
+
+def register(application):
+    def invalidate_completion_cache(**_):
+        command = application.session.get('command')
+        if command and command.split()[-1] in INVALIDATING_COMMANDS:
+            scope = get_command_scope(command)
+            if scope:
+                COMPLETION_CACHE.invalidate(scope)
+    application.register(application.TRANSFORM_RESULT, invalidate_completion_cache)
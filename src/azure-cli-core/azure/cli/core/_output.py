@@ -13,7 +13,6 @@ import traceback
 from collections import OrderedDict
 from six import StringIO, text_type, u, string_types
 import colorama
-from tabulate import tabulate
 
 from azure.cli.core.util import CLIError
 import azure.cli.core.azlogging as azlogging
@@ -88,10 +87,11 @@ def format_tsv(obj):
 
 class CommandResultItem(object):  # pylint: disable=too-few-public-methods
 
-    def __init__(self, result, table_transformer=None, is_query_active=False):
+    def __init__(self, result, table_transformer=None, is_query_active=False, exit_code=0):
         self.result = result
         self.table_transformer = table_transformer
         self.is_query_active = is_query_active
+        self.exit_code = exit_code
 
 
 class OutputProducer(object):  # pylint: disable=too-few-public-methods
@@ -167,6 +167,7 @@ class TableOutput(object):  # pylint: disable=too-few-public-methods
 
     def dump(self, data):
         table_data = self._auto_table(data)
+        from tabulate import tabulate
         table_str = tabulate(table_data, headers="keys", tablefmt="simple") if table_data else ''
         if table_str == '\n':
             raise ValueError('Unable to extract fields for table.')
@@ -8,20 +8,31 @@ import sys
 import os
 import uuid
 import argparse
+import logging
+import timeit
+
+import six
+
 from azure.cli.core.parser import AzCliCommandParser, enable_autocomplete
 from azure.cli.core._output import CommandResultItem
 import azure.cli.core.extensions
-import azure.cli.core._help as _help
+import azure.cli.core._completion_cache
 import azure.cli.core.azlogging as azlogging
-from azure.cli.core.util import todict, truncate_text, CLIError, read_file_content
+from azure.cli.core.util import (todict, truncate_text, CLIError, CLIPartialResultError, read_file_content,
+                                 LazyModule)
 from azure.cli.core._config import az_config
-import azure.cli.core.commands.progress as progress
 
 import azure.cli.core.telemetry as telemetry
 
 logger = azlogging.get_az_logger(__name__)
 
+_help = LazyModule('azure.cli.core._help')
+progress = LazyModule('azure.cli.core.commands.progress')
+
 ARGCOMPLETE_ENV_NAME = '_ARGCOMPLETE'
+# Commands which only read resources. Other commands given multiple --ids may depend on the order of
+# their changes (e.g. deleting a VM before its NIC) and run sequentially unless core.max_concurrency is set.
+READ_ONLY_COMMAND_VERBS = ('show', 'list', 'wait', 'exists', 'get-instance-view')
 
 
 class Configuration(object):  # pylint: disable=too-few-public-methods
@@ -106,6 +117,8 @@ class Application(object):
 
     def __init__(self, configuration=None):
         self._event_handlers = defaultdict(lambda: [])
+        # (event name, handler name) -> [number of calls, total seconds spent in the handler]
+        self.event_handler_timings = defaultdict(lambda: [0, 0.0])
         self.session = {
             'headers': {},  # the x-ms-client-request-id is generated before a command is to execute
             'command': 'unknown',
@@ -120,6 +133,7 @@ class Application(object):
 
         # Let other extensions make their presence known
         azure.cli.core.extensions.register_extensions(self)
+        azure.cli.core._completion_cache.register(self)
 
         self.global_parser = AzCliCommandParser(prog='az', add_help=False)
         global_group = self.global_parser.add_argument_group('global', 'Global Arguments')
@@ -127,7 +141,13 @@ class Application(object):
 
         self.parser = AzCliCommandParser(prog='az', parents=[self.global_parser])
         self.configuration = configuration
-        self.progress_controller = progress.ProgressHook()
+        self._progress_controller = None
+
+    @property
+    def progress_controller(self):
+        if self._progress_controller is None:
+            self._progress_controller = progress.ProgressHook()
+        return self._progress_controller
 
     def get_progress_controller(self, det=False):
         self.progress_controller.init_progress(progress.get_progress_view(det))
@@ -184,8 +204,14 @@ class Application(object):
         args = self.parser.parse_args(argv)
 
         self.raise_event(self.COMMAND_PARSER_PARSED, command=args.command, args=args)
-        results = []
-        for expanded_arg in _explode_list_args(args):
+        if getattr(getattr(args, 'func', None), 'expand_list_args', True):
+            list_arg_names = [name for name, value in vars(args).items() if isinstance(value, IterateValue)]
+            expanded_args = _explode_list_args(args)
+        else:
+            list_arg_names = []
+            expanded_args = [args]
+        invocations = []
+        for expanded_arg in expanded_args:
             self.session['command'] = expanded_arg.command
             try:
                 _validate_arguments(expanded_arg)
@@ -208,10 +234,10 @@ class Application(object):
             telemetry.set_command_details(expanded_arg.command,
                                           self.configuration.output_format,
                                           [p for p in unexpanded_argv if p.startswith('-')])
+            invocations.append((expanded_arg.func, params))
 
-            result = expanded_arg.func(params)
-            result = todict(result)
-            results.append(result)
+        results, failures = _execute_invocations(invocations, list_arg_names,
+                                                 concurrent=_allows_concurrent_invocations(args.command))
 
         if len(results) == 1:
             results = results[0]
@@ -222,15 +248,26 @@ class Application(object):
 
         return CommandResultItem(event_data['result'],
                                  table_transformer=command_table[args.command].table_transformer,
-                                 is_query_active=self.session['query_active'])
+                                 is_query_active=self.session['query_active'],
+                                 exit_code=1 if failures else 0)
 
     def raise_event(self, name, **kwargs):
         '''Raise the event `name`.
         '''
-        data = truncate_text(str(kwargs), width=500)
-        logger.debug("Application event '%s' with event data %s", name, data)
+        debug_enabled = azlogging.is_logging_enabled_for(logger, logging.DEBUG)
+        if debug_enabled:
+            logger.debug("Application event '%s' with event data %s", name, _EventDataRenderer(kwargs))
         for func in list(self._event_handlers[name]):  # Make copy in case handler modifies the list
+            start_time = timeit.default_timer()
             func(**kwargs)
+            elapsed_time = timeit.default_timer() - start_time
+            handler_name = _get_handler_name(func)
+            timing = self.event_handler_timings[(name, handler_name)]
+            timing[0] += 1
+            timing[1] += elapsed_time
+            if debug_enabled:
+                logger.debug("Application event handler '%s' for '%s' took %.3f seconds.",
+                             handler_name, name, elapsed_time)
 
     def register(self, name, handler):
         '''Register a callable that will be called when the
@@ -330,6 +367,67 @@ def _validate_arguments(args, **_):
         pass
 
 
+def _allows_concurrent_invocations(command):
+    '''Whether the invocations of `command` for multiple --ids may run concurrently.'''
+    return command.split()[-1] in READ_ONLY_COMMAND_VERBS or az_config.has_option('core', 'max_concurrency')
+
+
+def _execute_invocations(invocations, list_arg_names, concurrent=True):
+    '''Run the command handler once per set of (expanded) arguments.
+
+    A single invocation runs as is and its errors propagate. Multiple invocations, typically from
+    --ids, run on a bounded thread pool (core.max_concurrency) after the first one has completed, so
+    credentials and clients are warmed up before going concurrent, or one after the other if not
+    `concurrent`. Each invocation takes a slot of the throttle governor, which lowers the concurrency
+    while ARM is throttling. Results keep the order of the invocations and the error of a failed
+    invocation is reported in its place in the results unless every invocation failed. The result of an
+    invocation which failed in part (CLIPartialResultError) is reported with its error logged.
+    :return: tuple of the list of results and the number of failed invocations
+    '''
+    partial_failures = []
+
+    def _invoke(invocation):
+        func, params = invocation
+        try:
+            return todict(func(params))
+        except CLIPartialResultError as ex:
+            logger.error(ex)
+            partial_failures.append(ex)
+            return todict(ex.result)
+
+    if len(invocations) <= 1:
+        return [_invoke(invocation) for invocation in invocations], len(partial_failures)
+
+    from azure.cli.core.util import get_max_concurrency, to_camel_case
+    from azure.cli.core.throttle import THROTTLE_GOVERNOR
+    errors = []
+
+    def _invoke_isolated(index):
+        try:
+            with THROTTLE_GOVERNOR.slot('invocations'):
+                return _invoke(invocations[index])
+        except Exception as ex:  # pylint: disable=broad-except
+            errors.append((index, sys.exc_info()))
+            identity = ', '.join('{}={}'.format(name, invocations[index][1].get(name)) for name in list_arg_names)
+            logger.error('%s: %s', identity or 'item {}'.format(index), ex)
+            result = {to_camel_case(name): invocations[index][1].get(name) for name in list_arg_names}
+            result['error'] = str(ex)
+            return result
+
+    results = [_invoke_isolated(0)]
+    max_concurrency = get_max_concurrency() if concurrent else 1
+    if max_concurrency > 1 and len(invocations) > 2:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(invocations) - 1)) as executor:
+            results.extend(executor.map(_invoke_isolated, range(1, len(invocations))))
+    else:
+        results.extend(_invoke_isolated(index) for index in range(1, len(invocations)))
+
+    if len(errors) == len(invocations):
+        six.reraise(*min(errors, key=lambda e: e[0])[1])
+    return results, len(errors) + len(partial_failures)
+
+
 def _explode_list_args(args):
     '''Iterate through each attribute member of args and create a copy with
     the IterateValues 'flattened' to only contain a single value
@@ -373,6 +471,29 @@ class IterateValue(list):
     pass
 
 
+class _EventDataRenderer(object):  # pylint: disable=too-few-public-methods
+    '''Renders event data for the debug log only when the log record is actually emitted.
+    The rendering is size limited so large command results are never fully stringified.
+    '''
+    MAX_WIDTH = 500
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        from six.moves import reprlib
+        renderer = reprlib.Repr()
+        renderer.maxstring = renderer.maxother = self.MAX_WIDTH
+        renderer.maxlevel = 4
+        return truncate_text(renderer.repr(self.data), width=self.MAX_WIDTH)
+
+
+def _get_handler_name(handler):
+    name = getattr(handler, '__qualname__', None) or getattr(handler, '__name__', None) or repr(handler)
+    module = getattr(handler, '__module__', None)
+    return '{}.{}'.format(module, name) if module else name
+
+
 APPLICATION = Application()
 
 telemetry.set_application(APPLICATION, ARGCOMPLETE_ENV_NAME)
@@ -183,6 +183,23 @@ def configure_logging(argv, stream=None):
         get_az_logger(__name__).debug("File logging enabled - Writing logs to '%s'.", AzRotatingFileHandler.LOGFILE_DIR)
 
 
+def is_logging_enabled_for(logger, level):
+    """
+    Whether a record of the given level logged through the logger would be emitted by any handler. Use it to avoid
+    building expensive log messages that would be discarded anyway.
+    """
+    if not logger.isEnabledFor(level):
+        return False
+    current = logger
+    while current:
+        if any(level >= handler.level for handler in current.handlers):
+            return True
+        if not current.propagate:
+            break
+        current = current.parent
+    return False
+
+
 def get_az_logger(module_name=None):
     return logging.getLogger(AZ_ROOT_LOGGER_NAME).getChild(module_name) if module_name else logging.getLogger(
         AZ_ROOT_LOGGER_NAME)
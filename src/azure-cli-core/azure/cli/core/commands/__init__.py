@@ -9,8 +9,10 @@ import datetime
 import json
 import logging as logs
 import pkgutil
+import random
 import re
 import sys
+import threading
 import time
 import timeit
 import traceback
@@ -38,9 +40,24 @@ logger = azlogging.get_az_logger(__name__)
 # 1 hour in milliseconds
 DEFAULT_QUERY_TIME_RANGE = 3600000
 
+# Polling of long running operations backs off up to this interval, with +/- LRO_JITTER random variation
+LRO_MAX_INTERVAL_MS = 5000.0
+LRO_BACKOFF_FACTOR = 1.5
+LRO_JITTER = 0.2
+# The Retry-After of the service is honored even above LRO_MAX_INTERVAL_MS, within this sanity bound
+LRO_MAX_RETRY_AFTER_MS = 10 * 60 * 1000.0
+
 
 CONFIRM_PARAM_NAME = 'yes'
 
+# Registration of a resource provider is polled with a backoff between these intervals (in seconds)
+RP_REGISTRATION_POLL_MIN_INTERVAL = 2
+RP_REGISTRATION_POLL_MAX_INTERVAL = 15
+RP_REGISTRATION_POLL_BACKOFF = 1.5
+# Providers known to be registered with a subscription are not checked again for a day
+RP_REGISTRATION_CACHE_TTL = 24 * 60 * 60
+_rp_registration_lock = threading.Lock()
+
 BLACKLISTED_MODS = ['context', 'shell', 'documentdb']
 
 
@@ -129,21 +146,49 @@ class CliCommandArgument(object):  # pylint: disable=too-few-public-methods
         self.type.settings[name] = value
 
 
-class LongRunningOperation(object):  # pylint: disable=too-few-public-methods
+class LongRunningOperation(object):  # pylint: disable=too-few-public-methods,too-many-instance-attributes
 
     def __init__(self, start_msg='', finish_msg='',
-                 poller_done_interval_ms=1000.0, progress_controller=None):
+                 poller_done_interval_ms=1000.0, progress_controller=None,
+                 poller_max_interval_ms=LRO_MAX_INTERVAL_MS, backoff_factor=LRO_BACKOFF_FACTOR):
 
         self.start_msg = start_msg
         self.finish_msg = finish_msg
         self.poller_done_interval_ms = poller_done_interval_ms
+        self.poller_max_interval_ms = max(poller_max_interval_ms, poller_done_interval_ms)
+        self.backoff_factor = backoff_factor
         from azure.cli.core.application import APPLICATION
         self.progress_controller = progress_controller or APPLICATION.get_progress_controller()
         self.deploy_dict = {}
         self.last_progress_report = datetime.datetime.now()
+        self._interval_ms = poller_done_interval_ms
+        self._progress_cursor = None
 
     def _delay(self):
-        time.sleep(self.poller_done_interval_ms / 1000.0)
+        time.sleep(self._interval_ms / 1000.0)
+
+    def _next_interval_ms(self, poller):
+        """ Honors the Retry-After header of the last polling response if present, otherwise backs off
+        exponentially (with jitter) from poller_done_interval_ms up to poller_max_interval_ms. """
+        retry_after = _get_retry_after_ms(getattr(poller, '_response', None))
+        if retry_after is not None:
+            interval = min(max(retry_after, self.poller_done_interval_ms), LRO_MAX_RETRY_AFTER_MS)
+            self._interval_ms = min(interval, self.poller_max_interval_ms)
+            return interval
+        interval = self._interval_ms
+        self._interval_ms = min(self._interval_ms * self.backoff_factor, self.poller_max_interval_ms)
+        return min(interval * random.uniform(1 - LRO_JITTER, 1 + LRO_JITTER), self.poller_max_interval_ms)
+
+    def _wait(self, poller, interval_ms):
+        """ Waits for the interval, returning early if the poller finishes in the meantime. """
+        wait = getattr(poller, 'wait', None)
+        if wait is None or getattr(poller, '_thread', None) is None:
+            time.sleep(interval_ms / 1000.0)
+            return
+        try:
+            wait(timeout=interval_ms / 1000.0)
+        except Exception:  # pylint: disable=broad-except
+            pass  # the operation failure is surfaced by poller.result()
 
     def _generate_template_progress(self, correlation_id):  # pylint: disable=no-self-use
         """ gets the progress for template deployments """
@@ -153,8 +198,10 @@ class LongRunningOperation(object):  # pylint: disable=too-few-public-methods
         if correlation_id is not None:  # pylint: disable=too-many-nested-blocks
             formatter = "eventTimestamp ge {}"
 
-            end_time = datetime.datetime.utcnow()
-            start_time = end_time - datetime.timedelta(seconds=DEFAULT_QUERY_TIME_RANGE)
+            # only ask for the events after the last one we have already seen
+            start_time = self._progress_cursor
+            if start_time is None:
+                start_time = datetime.datetime.utcnow() - datetime.timedelta(seconds=DEFAULT_QUERY_TIME_RANGE)
             odata_filters = formatter.format(start_time.strftime('%Y-%m-%dT%H:%M:%SZ'))
 
             odata_filters = "{} and {} eq '{}'".format(odata_filters, 'correlationId', correlation_id)
@@ -170,6 +217,9 @@ class LongRunningOperation(object):  # pylint: disable=too-few-public-methods
                     break
 
             if results:
+                latest = max(event.event_timestamp for event in results)
+                if self._progress_cursor is None or latest > self._progress_cursor:
+                    self._progress_cursor = latest
                 for event in results:
                     update = False
                     long_name = event.resource_id.split('/')[-1]
@@ -218,14 +268,10 @@ class LongRunningOperation(object):  # pylint: disable=too-few-public-methods
 
         while not poller.done():
             self.progress_controller.add(message='Running')
-            try:
-                # pylint: disable=protected-access
-                correlation_id = json.loads(
-                    poller._response.__dict__['_content'].decode())['properties']['correlationId']
-
-                correlation_message = 'Correlation ID: {}'.format(correlation_id)
-            except:  # pylint: disable=bare-except
-                pass
+            if correlation_id is None:
+                correlation_id = _get_correlation_id(poller)
+                if correlation_id is not None:
+                    correlation_message = 'Correlation ID: {}'.format(correlation_id)
 
             current_time = datetime.datetime.now()
             if is_verbose and current_time - self.last_progress_report >= datetime.timedelta(seconds=10):
@@ -235,7 +281,7 @@ class LongRunningOperation(object):  # pylint: disable=too-few-public-methods
                 except Exception as ex:  # pylint: disable=broad-except
                     logger.warning('%s during progress reporting: %s', getattr(type(ex), '__name__', type(ex)), ex)
             try:
-                self._delay()
+                self._wait(poller, self._next_interval_ms(poller))
             except KeyboardInterrupt:
                 self.progress_controller.stop()
                 logger.error('Long running operation wait cancelled.  %s', correlation_message)
@@ -252,6 +298,23 @@ class LongRunningOperation(object):  # pylint: disable=too-few-public-methods
         return result
 
 
+def _get_correlation_id(poller):
+    try:
+        # pylint: disable=protected-access
+        return json.loads(poller._response.__dict__['_content'].decode())['properties']['correlationId']
+    except:  # pylint: disable=bare-except
+        return None
+
+
+def _get_retry_after_ms(response):
+    """ Reads the Retry-After header (in seconds) of a response, if any. """
+    try:
+        retry_after = response.headers.get('retry-after')
+        return float(retry_after) * 1000.0 if retry_after else None
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
 # pylint: disable=too-few-public-methods
 class DeploymentOutputLongRunningOperation(LongRunningOperation):
     def __call__(self, result):
@@ -311,7 +374,7 @@ class CliCommand(object):  # pylint:disable=too-many-instance-attributes
 
     def __init__(self, name, handler, description=None, table_transformer=None,
                  arguments_loader=None, description_loader=None,
-                 formatter_class=None, deprecate_info=None):
+                 formatter_class=None, deprecate_info=None, query_pushdown=None):
         self.name = name
         self.handler = handler
         self.help = None
@@ -323,7 +386,11 @@ class CliCommand(object):  # pylint:disable=too-many-instance-attributes
         self.table_transformer = table_transformer
         self.formatter_class = formatter_class
         self.deprecate_info = deprecate_info
+        self.query_pushdown = query_pushdown
         self.command_source = None
+        # When False, arguments with multiple values (e.g. from --ids) are passed to the handler as lists
+        # instead of invoking the handler once per value
+        self.expand_list_args = True
 
     @staticmethod
     def _should_load_description():
@@ -499,7 +566,7 @@ def cli_command(module_name, name, operation,
                 client_factory=None, transform=None, table_transformer=None,
                 no_wait_param=None, confirmation=None, exception_handler=None,
                 formatter_class=None, deprecate_info=None,
-                resource_type=None, max_api=None, min_api=None):
+                resource_type=None, max_api=None, min_api=None, query_pushdown=None):
     """ Registers a default Azure CLI command. These commands require no special parameters. """
     if resource_type and (max_api or min_api):
         if not supported_api_version(resource_type, min_api=min_api, max_api=max_api):
@@ -509,7 +576,8 @@ def cli_command(module_name, name, operation,
                          client_factory, no_wait_param, confirmation=confirmation,
                          exception_handler=exception_handler,
                          formatter_class=formatter_class,
-                         deprecate_info=deprecate_info)
+                         deprecate_info=deprecate_info,
+                         query_pushdown=query_pushdown)
 
     # Set the command source as we have the current command table and are about to add the command
     if module_name and module_name.startswith(EXTENSIONS_MOD_PREFIX):
@@ -584,7 +652,7 @@ def _is_poller(obj):
 def create_command(module_name, name, operation,
                    transform_result, table_transformer, client_factory,
                    no_wait_param=None, confirmation=None, exception_handler=None,
-                   formatter_class=None, deprecate_info=None):
+                   formatter_class=None, deprecate_info=None, query_pushdown=None):
     if not isinstance(operation, string_types):
         raise ValueError("Operation must be a string. Got '{}'".format(operation))
 
@@ -657,7 +725,8 @@ def create_command(module_name, name, operation,
 
     cmd = CliCommand(name, _execute_command, table_transformer=table_transformer,
                      arguments_loader=arguments_loader, description_loader=description_loader,
-                     formatter_class=formatter_class, deprecate_info=deprecate_info)
+                     formatter_class=formatter_class, deprecate_info=deprecate_info,
+                     query_pushdown=query_pushdown)
     if confirmation:
         cmd.add_argument(CONFIRM_PARAM_NAME, '--yes', '-y',
                          action='store_true',
@@ -688,18 +757,75 @@ def _check_rp_not_registered_err(ex):
     return None
 
 
-def _register_rp(rp):
+def _get_rp_registration_cache(subscription_id):
+    from azure.cli.core._session import SESSION
+    return SESSION['registered_providers'].setdefault(subscription_id, {})
+
+
+def _is_rp_registration_cached(subscription_id, namespace):
+    registered_at = _get_rp_registration_cache(subscription_id).get(namespace.lower())
+    return registered_at is not None and time.time() - registered_at < RP_REGISTRATION_CACHE_TTL
+
+
+def _cache_rp_registration(subscription_id, namespace):
+    from azure.cli.core._session import SESSION
+    with _rp_registration_lock:
+        _get_rp_registration_cache(subscription_id)[namespace.lower()] = time.time()
+        SESSION.save_with_retry()
+
+
+def _wait_for_rp_registration(rcf, rp):
+    interval = RP_REGISTRATION_POLL_MIN_INTERVAL
+    while True:
+        time.sleep(interval)
+        rp_info = rcf.providers.get(rp)
+        if rp_info.registration_state == 'Registered':
+            return
+        interval = min(interval * RP_REGISTRATION_POLL_BACKOFF, RP_REGISTRATION_POLL_MAX_INTERVAL)
+
+
+def _register_rp(rp, rcf=None):
     from azure.cli.core.commands.client_factory import get_mgmt_service_client
-    rcf = get_mgmt_service_client(ResourceType.MGMT_RESOURCE_RESOURCES)
+    rcf = rcf or get_mgmt_service_client(ResourceType.MGMT_RESOURCE_RESOURCES)
     logger.warning("Resource provider '%s' used by the command is not "
                    "registered. We are registering for you", rp)
     rcf.providers.register(rp)
-    while True:
-        time.sleep(10)
-        rp_info = rcf.providers.get(rp)
-        if rp_info.registration_state == 'Registered':
-            logger.warning("Registration succeeded.")
-            break
+    _wait_for_rp_registration(rcf, rp)
+    _cache_rp_registration(rcf.config.subscription_id, rp)
+    logger.warning("Registration succeeded.")
+
+
+def register_providers(namespaces):
+    """ Make sure all the given resource providers are registered with the current subscription before a
+    command uses them. Providers are checked and registered concurrently and providers known to be registered
+    are skipped. """
+    from concurrent.futures import ThreadPoolExecutor
+    from azure.cli.core.commands.client_factory import get_mgmt_service_client
+    from azure.cli.core.util import get_max_concurrency
+    from azure.cli.core.throttle import THROTTLE_GOVERNOR
+    rcf = get_mgmt_service_client(ResourceType.MGMT_RESOURCE_RESOURCES)
+    subscription_id = rcf.config.subscription_id
+
+    pending = []
+    for namespace in namespaces:
+        if not _is_rp_registration_cached(subscription_id, namespace) and \
+                namespace.lower() not in [p.lower() for p in pending]:
+            pending.append(namespace)
+    if not pending:
+        return
+
+    def _ensure_registered(namespace):
+        with THROTTLE_GOVERNOR.slot():
+            registered = rcf.providers.get(namespace).registration_state == 'Registered'
+        if registered:
+            _cache_rp_registration(subscription_id, namespace)
+        else:
+            _register_rp(namespace, rcf)
+
+    logger.info("Checking registration of resource providers: %s", ', '.join(pending))
+    with ThreadPoolExecutor(max_workers=min(len(pending), get_max_concurrency())) as executor:
+        for _ in executor.map(_ensure_registered, pending):
+            pass
 
 
 def _get_cli_argument(command, argname):
@@ -20,9 +20,13 @@ from azure.cli.core._config import az_config
 import azure.cli.core.azlogging as azlogging
 from azure.cli.core.util import CLIError, todict, shell_safe_json_parse
 from azure.cli.core.profiles import ResourceType
+from azure.cli.core._catalog import SubscriptionCatalog
+from azure.cli.core.throttle import THROTTLE_GOVERNOR
 
 logger = azlogging.get_az_logger(__name__)
 
+PROVIDER_CATALOG = SubscriptionCatalog('providerCatalog.json', ttl=24 * 60 * 60)
+
 regex = re.compile(
     '/subscriptions/(?P<subscription>[^/]*)(/resource[gG]roups/(?P<resource_group>[^/]*))?'
     '/providers/(?P<namespace>[^/]*)/(?P<type>[^/]*)/(?P<name>[^/]*)'
@@ -206,6 +210,49 @@ def resource_exists(resource_group, name, namespace, type, **_):  # pylint: disa
     return existing
 
 
+def _get_provider_metadata_from_service(rcf, namespace):
+    provider = rcf.providers.get(namespace)
+    resource_types = {}
+    for rt in provider.resource_types or []:
+        resource_types[rt.resource_type.lower()] = {
+            'resourceType': rt.resource_type,
+            'apiVersions': list(rt.api_versions or []),
+            'locations': list(rt.locations or [])
+        }
+    return {'namespace': provider.namespace, 'resourceTypes': resource_types}
+
+
+def get_provider_metadata(namespace, rcf=None, refresh=False):
+    """ Resource types of a provider with their API versions and locations, read from the provider catalog
+    of the subscription which is refreshed daily. """
+    rcf = rcf or get_mgmt_service_client(ResourceType.MGMT_RESOURCE_RESOURCES)
+    subscription_id = rcf.config.subscription_id
+    if not isinstance(subscription_id, string_types):
+        # the catalog is kept per subscription so it is bypassed for clients not bound to one
+        return _get_provider_metadata_from_service(rcf, namespace)
+    return PROVIDER_CATALOG.get('providers/{}'.format(namespace.lower()),
+                                lambda: _get_provider_metadata_from_service(rcf, namespace),
+                                refresh=refresh, subscription_id=subscription_id)
+
+
+def resolve_api_version(namespace, resource_type, parent_path=None, rcf=None):
+    """ The latest non-preview (or, if there is none, the latest preview) API version of a resource type.
+    If available the API version of the parent resource type is used. The provider catalog is refreshed once
+    if it does not know the resource type. """
+    resource_type_str = parent_path.split('/')[0] if parent_path else resource_type
+    rt = None
+    for refresh in (False, True):
+        rt = get_provider_metadata(namespace, rcf, refresh)['resourceTypes'].get(resource_type_str.lower())
+        if rt and rt['apiVersions']:
+            break
+    if not rt:
+        raise CLIError('Resource type {} not found.'.format(resource_type_str))
+    if rt['apiVersions']:
+        npv = [v for v in rt['apiVersions'] if 'preview' not in v.lower()]
+        return npv[0] if npv else rt['apiVersions'][0]
+    raise CLIError('API version is required and could not be resolved for resource {}'.format(resource_type))
+
+
 def add_id_parameters(command_table):
     def split_action(arguments):
         class SplitAction(argparse.Action):  # pylint: disable=too-few-public-methods
@@ -481,6 +528,59 @@ def cli_generic_update_command(module_name, name, getter_op, setter_op, factory=
     main_command_module_map[name] = module_name
 
 
+# Per resource polling of the generic wait command starts at this interval (in seconds) and backs off up
+# to --interval while the provisioning state does not change
+WAIT_MIN_INTERVAL = 5
+WAIT_BACKOFF_FACTOR = 1.5
+
+
+class _WaitTarget(object):  # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """ The polling state of a single resource of the generic wait command """
+
+    def __init__(self, getter_args, identity, interval):
+        self.getter_args = getter_args
+        self.identity = identity
+        self.max_interval = interval
+        self.interval = min(WAIT_MIN_INTERVAL, interval)
+        self.next_poll = 0
+        self.status = 'Pending'
+        self.provisioning_state = None
+        self.error = None
+        self.elapsed = None
+
+    def schedule(self, now, provisioning_state):
+        if provisioning_state != self.provisioning_state:
+            # a state transition is often followed by completion, so look again soon
+            self.interval = min(WAIT_MIN_INTERVAL, self.max_interval)
+        else:
+            self.interval = min(self.interval * WAIT_BACKOFF_FACTOR, self.max_interval)
+        self.provisioning_state = provisioning_state
+        self.next_poll = now + self.interval
+
+    def report(self):
+        report = dict(self.identity)
+        report.update({'status': self.status, 'provisioningState': self.provisioning_state,
+                       'elapsedSeconds': round(self.elapsed, 1) if self.elapsed is not None else None})
+        if self.error:
+            report['error'] = self.error
+        return report
+
+
+def _get_wait_targets(getterargs, interval):
+    """ Expand getter arguments holding multiple values (from --ids) into one target per resource """
+    from azure.cli.core.util import to_camel_case
+    list_args = [key for key, value in getterargs.items() if isinstance(value, IterateValue)]
+    if not list_args:
+        return [_WaitTarget(getterargs, {}, interval)]
+    targets = []
+    for values in zip(*[getterargs[key] for key in list_args]):
+        target_args = dict(getterargs)
+        target_args.update(zip(list_args, values))
+        identity = [(to_camel_case(key), value) for key, value in zip(list_args, values)]
+        targets.append(_WaitTarget(target_args, identity, interval))
+    return targets
+
+
 def cli_generic_wait_command(module_name, name, getter_op, factory=None, exception_handler=None):
 
     if not isinstance(getter_op, string_types):
@@ -509,8 +609,10 @@ def cli_generic_wait_command(module_name, name, getter_op, factory=None, excepti
         else:
             raise ex
 
-    def handler(args):
+    def handler(args):  # pylint: disable=too-many-statements
         from msrest.exceptions import ClientException
+        from concurrent.futures import ThreadPoolExecutor
+        from azure.cli.core.util import get_max_concurrency
         import time
         try:
             client = factory() if factory else None
@@ -529,46 +631,118 @@ def cli_generic_wait_command(module_name, name, getter_op, factory=None, excepti
         wait_for_updated = args.pop('updated')
         wait_for_exists = args.pop('exists')
         custom_condition = args.pop('custom')
+        wait_for_any = args.pop('wait_for_any', False)
         if not any([wait_for_created, wait_for_updated, wait_for_deleted,
                     wait_for_exists, custom_condition]):
             raise CLIError(
                 "incorrect usage: --created | --updated | --deleted | --exists | --custom JMESPATH")
 
-        for _ in range(0, timeout, interval):
+        def poll(target):
+            """ Returns (condition met, provisioning state). Exceptions are returned, not raised. """
             try:
-                instance = getter(client, **getterargs) if client else getter(**getterargs)
-                if wait_for_exists:
-                    return
-                provisioning_state = get_provisioning_state(instance)
-                # until we have any needs to wait for 'Failed', let us bail out on this
-                if provisioning_state == 'Failed':
-                    raise CLIError('The operation failed')
-                if wait_for_created or wait_for_updated:
-                    if provisioning_state == 'Succeeded':
-                        return
-                if custom_condition and bool(verify_property(instance, custom_condition)):
-                    return
-            except ClientException as ex:
-                if getattr(ex, 'status_code', None) == 404:
-                    if wait_for_deleted:
-                        return
-                    if not any([wait_for_created, wait_for_exists, custom_condition]):
+                try:
+                    # the client is shared by all the resources being polled
+                    with THROTTLE_GOVERNOR.slot():
+                        instance = getter(client, **target.getter_args) if client else getter(**target.getter_args)
+                    if wait_for_exists:
+                        return True, None
+                    provisioning_state = get_provisioning_state(instance)
+                    # until we have any needs to wait for 'Failed', let us bail out on this
+                    if provisioning_state == 'Failed':
+                        raise CLIError('The operation failed')
+                    if wait_for_created or wait_for_updated:
+                        if provisioning_state == 'Succeeded':
+                            return True, provisioning_state
+                    if custom_condition and bool(verify_property(instance, custom_condition)):
+                        return True, provisioning_state
+                    return False, provisioning_state
+                except ClientException as ex:
+                    if getattr(ex, 'status_code', None) == 404:
+                        if wait_for_deleted:
+                            return True, None
+                        if not any([wait_for_created, wait_for_exists, custom_condition]):
+                            _handle_exception(ex)
+                    else:
                         _handle_exception(ex)
-                else:
+                except Exception as ex:  # pylint: disable=broad-except
                     _handle_exception(ex)
+                return False, target.provisioning_state
             except Exception as ex:  # pylint: disable=broad-except
-                _handle_exception(ex)
-
-            time.sleep(interval)
-
-        return CLIError('Wait operation timed-out after {} seconds'.format(timeout))
+                return ex, None
+
+        targets = _get_wait_targets(getterargs, interval)
+        single = len(targets) == 1
+        start_time = time.time()
+        deadline = start_time + timeout
+        pending = list(targets)
+        progress_tasks = {}
+        progress_controller = None
+        if not single:
+            progress_controller = APPLICATION.get_progress_controller()
+            progress_controller.begin(message='Waiting')
+            progress_tasks = dict((id(t), progress_controller.add_task(t.identity)) for t in targets)
+        try:
+            with ThreadPoolExecutor(max_workers=min(len(targets), get_max_concurrency())) as executor:
+                while pending and time.time() < deadline:
+                    now = time.time()
+                    due = [t for t in pending if t.next_poll <= now]
+                    for target, (outcome, provisioning_state) in zip(due, executor.map(poll, due)):
+                        now = time.time()
+                        if isinstance(outcome, Exception):
+                            if single:
+                                raise outcome
+                            target.status, target.error = 'Failed', str(outcome)
+                        elif outcome:
+                            target.status = 'Succeeded'
+                        else:
+                            target.schedule(now, provisioning_state)
+                            continue
+                        target.provisioning_state = provisioning_state or target.provisioning_state
+                        target.elapsed = now - start_time
+                        pending.remove(target)
+                        if progress_tasks:
+                            progress_tasks[id(target)].end(failed=target.status != 'Succeeded')
+                        logger.info("Wait for %s finished: %s after %.1f seconds.",
+                                    target.identity or name, target.status, target.elapsed)
+
+                    if wait_for_any and any(t.status == 'Succeeded' for t in targets):
+                        break
+                    if pending:
+                        next_poll = min(t.next_poll for t in pending)
+                        time.sleep(max(0, min(next_poll, deadline) - time.time()))
+        finally:
+            # also on timeouts, errors and Ctrl-C, so that no progress line is left on screen
+            if progress_controller:
+                progress_controller.end()
+
+        if single:
+            if pending:
+                raise CLIError('Wait operation timed-out after {} seconds'.format(timeout))
+            return None
+
+        # with --any, the resources still pending once one met the condition are no longer waited for
+        if not (wait_for_any and any(t.status == 'Succeeded' for t in targets)):
+            for target in pending:
+                target.status = 'TimedOut'
+                target.elapsed = time.time() - start_time
+        report = [t.report() for t in targets]
+        failed = [t for t in targets if t.status in ('Failed', 'TimedOut')]
+        if failed:
+            from azure.cli.core.util import CLIPartialResultError
+            for target in failed:
+                logger.error("Wait for %s: %s %s", target.identity, target.status, target.error or '')
+            raise CLIPartialResultError('{} of {} resources did not meet the wait condition.'.format(
+                len(failed), len(targets)), report)
+        return report
 
     cmd = CliCommand(name, handler, arguments_loader=arguments_loader)
+    # all the resources given with --ids are polled together by a single call of the handler
+    cmd.expand_list_args = False
     group_name = 'Wait Condition'
     cmd.add_argument('timeout', '--timeout', default=3600, arg_group=group_name, type=int,
                      help='maximum wait in seconds')
     cmd.add_argument('interval', '--interval', default=30, arg_group=group_name, type=int,
-                     help='polling interval in seconds')
+                     help='maximum polling interval in seconds')
     cmd.add_argument('deleted', '--deleted', action='store_true', arg_group=group_name,
                      help='wait till deleted')
     cmd.add_argument('created', '--created', action='store_true', arg_group=group_name,
@@ -581,6 +755,8 @@ def cli_generic_wait_command(module_name, name, getter_op, factory=None, excepti
                      help=("Wait until the condition satisfies a custom JMESPath query. E.g. "
                            "provisioningState!='InProgress', "
                            "instanceView.statuses[?code=='PowerState/running']"))
+    cmd.add_argument('wait_for_any', '--any', action='store_true', arg_group=group_name,
+                     help='with multiple --ids, stop waiting as soon as one resource meets the condition')
     main_command_table[name] = cmd
     main_command_module_map[name] = module_name
 
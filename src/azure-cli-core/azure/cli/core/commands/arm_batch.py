@@ -0,0 +1,176 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import time
+
+import azure.cli.core.azlogging as azlogging
+from azure.cli.core.util import CLIError
+from azure.cli.core.throttle import THROTTLE_GOVERNOR
+
+logger = azlogging.get_az_logger(__name__)
+
+ARM_BATCH_API_VERSION = '2015-11-01'
+# Number of requests sent in a single ARM batch call
+ARM_BATCH_MAX_REQUESTS = 20
+ARM_BATCH_POLL_INTERVAL = 1
+
+
+class ArmRequestError(CLIError):
+    '''A request of a batch failed.'''
+
+    def __init__(self, message, status_code=None, error_code=None):
+        super(ArmRequestError, self).__init__(message)
+        self.status_code = status_code
+        self.error_code = error_code
+
+
+class ArmBatchResult(object):  # pylint: disable=too-few-public-methods
+    '''The outcome of a single request of a batch: either `value` or `error` is set.'''
+
+    __slots__ = ('value', 'error')
+
+    def __init__(self, value=None, error=None):
+        self.value = value
+        self.error = error
+
+    def result(self):
+        if self.error is not None:
+            raise self.error  # pylint: disable=raising-bad-type
+        return self.value
+
+
+class ArmRequestBatch(object):
+    '''Collects independent requests so they can be resolved together.
+
+    GET requests for ARM resources (`add_get`) are grouped into ARM batch calls, and sent individually if the
+    cloud does not support batching. SDK operations (`add`) are dispatched concurrently. `resolve` returns
+    an ArmBatchResult per request in the order the requests were added.
+
+    :param client: Management client whose pipeline (credentials, endpoint) is used for the GET requests.
+        Defaults to the resource management client of the current subscription.
+    :param use_batch_api: Whether GET requests are sent through the ARM batch endpoint.
+    '''
+
+    def __init__(self, client=None, use_batch_api=True):
+        self._client = client
+        self.use_batch_api = use_batch_api
+        self._requests = []
+
+    @property
+    def client(self):
+        if self._client is None:
+            from azure.cli.core.commands.client_factory import get_mgmt_service_client
+            from azure.cli.core.profiles import ResourceType
+            self._client = get_mgmt_service_client(ResourceType.MGMT_RESOURCE_RESOURCES)
+        return self._client
+
+    def __len__(self):
+        return len(self._requests)
+
+    def add(self, operation, *args, **kwargs):
+        '''Enqueue a call of an SDK operation. Returns the index of its result.'''
+        self._requests.append((operation, args, kwargs))
+        return len(self._requests) - 1
+
+    def add_get(self, resource_id, api_version):
+        '''Enqueue a GET of an ARM resource, the result of which is the JSON content of the response.
+        Returns the index of its result.
+        '''
+        url = '{}?api-version={}'.format(resource_id, api_version)
+        self._requests.append((None, (url,), {}))
+        return len(self._requests) - 1
+
+    def resolve(self):
+        '''Send all enqueued requests and return their results in order.'''
+        from concurrent.futures import ThreadPoolExecutor
+        from azure.cli.core.util import get_max_concurrency
+
+        requests, self._requests = self._requests, []
+        results = [None] * len(requests)
+        gets = [(index, args[0]) for index, (operation, args, _) in enumerate(requests) if operation is None]
+        if gets and self.use_batch_api and len(gets) > 1:
+            gets = self._send_batches(gets, results)
+
+        tasks = [(index, operation, args, kwargs)
+                 for index, (operation, args, kwargs) in enumerate(requests) if operation is not None]
+        tasks.extend((index, self._send_get, (url,), {}) for index, url in gets)
+
+        def _run(task):
+            index, operation, args, kwargs = task
+            try:
+                with THROTTLE_GOVERNOR.slot():
+                    results[index] = ArmBatchResult(value=operation(*args, **kwargs))
+            except Exception as ex:  # pylint: disable=broad-except
+                results[index] = ArmBatchResult(error=ex)
+
+        if len(tasks) == 1:
+            _run(tasks[0])
+        elif tasks:
+            with ThreadPoolExecutor(max_workers=min(len(tasks), get_max_concurrency())) as executor:
+                list(executor.map(_run, tasks))
+        return results
+
+    def _send(self, method, url, content=None):
+        service_client = self.client._client  # pylint: disable=protected-access
+        request = service_client.get(url) if method == 'GET' else service_client.post(url)
+        headers = {'Content-Type': 'application/json; charset=utf-8'}
+        return service_client.send(request, headers, content)
+
+    def _send_get(self, url):
+        response = self._send('GET', url)
+        return _get_content(response.status_code, _get_json(response))
+
+    def _send_batches(self, gets, results):
+        '''Send the GET requests in ARM batch calls. Returns the requests which have to be sent individually.'''
+        base_url = self.client.config.base_url.rstrip('/')
+        unsent = []
+        for start in range(0, len(gets), ARM_BATCH_MAX_REQUESTS):
+            chunk = gets[start:start + ARM_BATCH_MAX_REQUESTS]
+            content = {'requests': [{'name': str(index), 'httpMethod': 'GET', 'url': base_url + url}
+                                    for index, url in chunk]}
+            try:
+                responses = self._post_batch(content)
+            except Exception as ex:  # pylint: disable=broad-except
+                logger.debug('ARM batch request failed, sending the requests individually: %s', ex)
+                unsent.extend(chunk)
+                continue
+            by_name = dict((r.get('name'), r) for r in responses)
+            for position, (index, url) in enumerate(chunk):
+                response = by_name.get(str(index)) or (responses[position] if position < len(responses) else None)
+                if response is None:
+                    unsent.append((index, url))
+                    continue
+                try:
+                    results[index] = ArmBatchResult(
+                        value=_get_content(response.get('httpStatusCode'), response.get('content')))
+                except ArmRequestError as ex:
+                    results[index] = ArmBatchResult(error=ex)
+        return unsent
+
+    def _post_batch(self, content):
+        response = self._send('POST', '/batch?api-version={}'.format(ARM_BATCH_API_VERSION), content)
+        # large batches are processed asynchronously
+        while response.status_code == 202:
+            time.sleep(int(response.headers.get('Retry-After', ARM_BATCH_POLL_INTERVAL)))
+            response = self._send('GET', response.headers['Location'])
+        if response.status_code != 200:
+            raise ArmRequestError('Batch request failed with status code {}'.format(response.status_code),
+                                  status_code=response.status_code)
+        return _get_json(response).get('responses', [])
+
+
+def _get_json(response):
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+def _get_content(status_code, content):
+    if status_code is not None and 200 <= int(status_code) < 300:
+        return content
+    error = (content or {}).get('error', {}) if isinstance(content, dict) else {}
+    message = error.get('message') or 'Request failed with status code {}'.format(status_code)
+    raise ArmRequestError(message, status_code=status_code, error_code=error.get('code'))
@@ -10,6 +10,7 @@ import azure.cli.core._debug as _debug
 import azure.cli.core.azlogging as azlogging
 from azure.cli.core.util import CLIError
 from azure.cli.core.application import APPLICATION
+from azure.cli.core.throttle import THROTTLE_GOVERNOR
 from azure.cli.core.profiles._shared import get_client_class
 from azure.cli.core.profiles import get_api_version, get_sdk, ResourceType
 
@@ -57,6 +58,7 @@ def configure_common_settings(client):
     client._client.add_header('CommandName',  # pylint: disable=protected-access
                               "{}{}".format(APPLICATION.session['command'], command_name_suffix))
     client.config.generate_client_request_id = 'x-ms-client-request-id' not in APPLICATION.session['headers']
+    client.config.hooks.append(THROTTLE_GOVERNOR.observe)
 
 
 def _get_mgmt_service_client(client_type,
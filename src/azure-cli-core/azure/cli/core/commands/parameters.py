@@ -13,20 +13,45 @@ from azure.cli.core.commands.validators import validate_tag, validate_tags
 from azure.cli.core.util import CLIError
 from azure.cli.core.commands.validators import generate_deployment_name
 from azure.cli.core.profiles import get_sdk, ResourceType, supported_api_version
+from azure.cli.core._catalog import SubscriptionCatalog
 import azure.cli.core.azlogging as azlogging
 
 logger = azlogging.get_az_logger(__name__)
 
+LOCATION_CATALOG = SubscriptionCatalog('locationCatalog.json', ttl=24 * 60 * 60)
 
-def get_subscription_locations():
+# Resource group completions are invalidated by 'az group create/delete'
+RESOURCE_GROUP_COMPLETION_SCOPE = 'azure.cli.command_modules.resource'
+
+
+def _list_subscription_locations():
     from azure.cli.core.commands.client_factory import get_subscription_service_client
     subscription_client, subscription_id = get_subscription_service_client()
-    return list(subscription_client.subscriptions.list_locations(subscription_id))
+    return list(subscription_client.subscriptions.list_locations(subscription_id)), subscription_id
+
+
+def get_subscription_locations():
+    result, subscription_id = _list_subscription_locations()
+    LOCATION_CATALOG.set('locations', _build_location_catalog(result), subscription_id=subscription_id)
+    return result
+
+
+def _build_location_catalog(locations):
+    return {
+        'names': [l.name for l in locations],
+        'displayNames': dict((l.display_name.lower(), l.name) for l in locations if l.display_name)
+    }
+
+
+def get_location_catalog(refresh=False):
+    """ Names and a display name to name index of the locations available to the current subscription,
+    read from the location catalog which is refreshed daily. """
+    return LOCATION_CATALOG.get('locations', lambda: _build_location_catalog(_list_subscription_locations()[0]),
+                                refresh=refresh)
 
 
 def get_location_completion_list(prefix, **kwargs):  # pylint: disable=unused-argument
-    result = get_subscription_locations()
-    return [l.name for l in result]
+    return get_location_catalog()['names']
 
 
 def file_type(path):
@@ -36,16 +61,19 @@ def file_type(path):
 
 def location_name_type(name):
     if ' ' in name:
-        # if display name is provided, attempt to convert to short form name
-        name = next((l.name for l in get_subscription_locations()
-                     if l.display_name.lower() == name.lower()), name)
+        # if display name is provided, attempt to convert to short form name. A display name missing from the
+        # catalog may be of a location added since the catalog was refreshed.
+        display_names = get_location_catalog()['displayNames']
+        if name.lower() not in display_names:
+            display_names = get_location_catalog(refresh=True)['displayNames']
+        name = display_names.get(name.lower(), name)
     return name
 
 
 def get_one_of_subscription_locations():
-    result = get_subscription_locations()
+    result = get_location_catalog()['names']
     if result:
-        return next((r.name for r in result if r.name.lower() == 'westus'), result[0].name)
+        return next((r for r in result if r.lower() == 'westus'), result[0])
     else:
         raise CLIError('Current subscription does not have valid location list')
 
@@ -57,8 +85,9 @@ def get_resource_groups():
 
 
 def get_resource_group_completion_list(prefix, **kwargs):  # pylint: disable=unused-argument
-    result = get_resource_groups()
-    return [l.name for l in result]
+    from azure.cli.core._completion_cache import get_cached_completion_list
+    return get_cached_completion_list('resourceGroups', lambda: [l.name for l in get_resource_groups()],
+                                      scope=RESOURCE_GROUP_COMPLETION_SCOPE)
 
 
 def get_resources_in_resource_group(resource_group_name, resource_type=None):
@@ -79,10 +108,16 @@ def get_resources_in_subscription(resource_type=None):
 
 def get_resource_name_completion_list(resource_type=None):
     def completer(prefix, action, parsed_args, **kwargs):  # pylint: disable=unused-argument
-        if getattr(parsed_args, 'resource_group_name', None):
-            rg = parsed_args.resource_group_name
-            return [r.name for r in get_resources_in_resource_group(rg, resource_type=resource_type)]
-        return [r.name for r in get_resources_in_subscription(resource_type=resource_type)]
+        from azure.cli.core._completion_cache import get_cached_completion_list, get_command_scope
+        rg = getattr(parsed_args, 'resource_group_name', None)
+        if rg:
+            def fetch():
+                return [r.name for r in get_resources_in_resource_group(rg, resource_type=resource_type)]
+        else:
+            def fetch():
+                return [r.name for r in get_resources_in_subscription(resource_type=resource_type)]
+        key = 'resources/{}/{}'.format((rg or '').lower(), resource_type or '')
+        return get_cached_completion_list(key, fetch, scope=get_command_scope(getattr(parsed_args, 'command', None)))
     return completer
 
 
@@ -5,16 +5,23 @@
 from __future__ import division
 import sys
 import platform
+import threading
+import time
 
-import humanfriendly
-BAR_LEN = 70
+from azure.cli.core.util import LazyModule
 
-if platform.system() == 'Windows':
-    humanfriendly.erase_line_code = ''
+humanfriendly = LazyModule('humanfriendly')
+BAR_LEN = 70
+# Minimum number of seconds between two updates of a terminal
+PROGRESS_REFRESH_INTERVAL = 0.1
+# Number of seconds between two summary lines when the output is not a terminal
+PROGRESS_SUMMARY_INTERVAL = 10
 
 
 class ProgressViewBase(object):
     """ a view base for progress reporting """
+    refresh_interval = PROGRESS_REFRESH_INTERVAL
+
     def __init__(self, out):
         self.out = out
 
@@ -60,11 +67,52 @@ class ProgressReporter(object):
         return {'message': self.message, 'percent': percent}
 
 
+class ProgressTask(object):
+    """ progress of one of the concurrent tasks reported to a ProgressHook """
+    def __init__(self, hook, name, total_val=None):
+        self.hook = hook
+        self.name = name
+        self.value = 0
+        self.total_val = total_val
+        self.closed = False
+        self.failed = False
+
+    def add(self, value=None, total_val=None, increment=None):
+        """
+        adds a progress report of the task
+        :param value: progress of the task so far
+        :param total_val: value of the task once completed
+        :param increment: progress since the last report, instead of value
+        """
+        with self.hook.lock:
+            if total_val is not None:
+                self.total_val = total_val
+            if increment is not None:
+                self.value += increment
+            elif value is not None:
+                self.value = value
+        self.hook.update()
+
+    def end(self, failed=False):
+        """ ending reporting of progress of the task """
+        with self.hook.lock:
+            if self.total_val is not None and not failed:
+                self.value = self.total_val
+            self.closed = True
+            self.failed = failed
+        self.hook.update()
+
+
 class ProgressHook(object):
-    """ sends the progress to the view """
+    """ sends the progress to the view, at most once per refresh interval of the view """
     def __init__(self):
         self.reporter = ProgressReporter()
         self.active_progress = None
+        self.lock = threading.RLock()
+        self.tasks = []
+        self._render_lock = threading.Lock()
+        self._last_render = 0
+        self._start_time = None
 
     def init_progress(self, progress_view):
         """ activate a view """
@@ -72,38 +120,102 @@ class ProgressHook(object):
 
     def add(self, **kwargs):
         """ adds a progress report """
-        self.reporter.add(**kwargs)
+        force = kwargs.pop('force', False)
+        with self.lock:
+            self.reporter.add(**kwargs)
+        self.update(force=force)
+
+    def add_task(self, name, total_val=None):
+        """ starts reporting the progress of one of several concurrent tasks """
+        task = ProgressTask(self, name, total_val)
+        with self.lock:
+            if self._start_time is None:
+                self._start_time = time.time()
+            self.tasks.append(task)
         self.update()
+        return task
 
-    def update(self):
-        """ updates the view with the progress """
-        self.active_progress.write(self.reporter.report())
-        self.active_progress.flush()
+    def report(self):
+        """ the progress of the reporter, aggregated over the tasks if there are any """
+        with self.lock:
+            report = self.reporter.report()
+            if not self.tasks:
+                return report
+            value = sum(t.value for t in self.tasks)
+            total_val = sum(t.total_val for t in self.tasks if t.total_val)
+            elapsed = time.time() - self._start_time
+            throughput = value / elapsed if value and elapsed > 0 else None
+            report.update({
+                'percent': min(1, value / total_val) if total_val else None,
+                'tasks': len(self.tasks),
+                'completed': len([t for t in self.tasks if t.closed]),
+                'failed': len([t for t in self.tasks if t.failed]),
+                'throughput': throughput,
+                'eta': (total_val - value) / throughput if throughput and total_val > value else None
+            })
+            return report
+
+    def update(self, force=False):
+        """ updates the view with the progress, if the refresh interval of the view has passed """
+        refresh_interval = getattr(self.active_progress, 'refresh_interval', PROGRESS_REFRESH_INTERVAL)
+        if not force and time.time() - self._last_render < refresh_interval:
+            return
+        # producers do not wait for the view, another report is rendered soon enough
+        if not self._render_lock.acquire(force):
+            return
+        try:
+            self._last_render = time.time()
+            self.active_progress.write(self.report())
+            self.active_progress.flush()
+        finally:
+            self._render_lock.release()
 
     def stop(self):
         """ if there is an abupt stop before ending """
         self.reporter.closed = True
-        self.add(message='Interrupted')
+        self.add(message='Interrupted', force=True)
         self.active_progress.clear()
+        self._reset_tasks()
 
     def begin(self, **kwargs):
         """ start reporting progress """
         kwargs['message'] = kwargs.get('message', 'Starting')
-        self.add(**kwargs)
+        self._reset_tasks()
+        self.add(force=True, **kwargs)
         self.reporter.closed = False
 
     def end(self, **kwargs):
         """ ending reporting of progress """
         kwargs['message'] = kwargs.get('message', 'Finished')
         self.reporter.closed = True
-        self.add(**kwargs)
+        self.add(force=True, **kwargs)
         self.active_progress.clear()
+        self._reset_tasks()
+
+    def _reset_tasks(self):
+        with self.lock:
+            self.tasks = []
+            self._start_time = None
 
     def is_running(self):
         """ whether progress is continuing """
         return not self.reporter.closed
 
 
+def _format_tasks(args):
+    """ summary of the tasks of a progress report, empty if there are none """
+    if not args.get('tasks'):
+        return ''
+    summary = '{}/{} done'.format(args['completed'], args['tasks'])
+    if args.get('failed'):
+        summary += ', {} failed'.format(args['failed'])
+    if args.get('throughput'):
+        summary += ', {}/s'.format(humanfriendly.format_size(int(args['throughput'])))
+    if args.get('eta') is not None:
+        summary += ', ETA {}'.format(humanfriendly.format_timespan(args['eta'], max_units=2))
+    return summary
+
+
 class IndeterminateStandardOut(ProgressViewBase):
     """ custom output for progress reporting """
     def __init__(self, out=None):
@@ -117,9 +229,14 @@ class IndeterminateStandardOut(ProgressViewBase):
         :param args: dictionary containing key 'message'
         """
         if self.spinner is None:
+            if platform.system() == 'Windows':
+                humanfriendly.erase_line_code = ''
             self.spinner = humanfriendly.Spinner(
                 label='In Progress', stream=self.out, hide_cursor=False)
         msg = args.get('message', 'In Progress')
+        tasks = _format_tasks(args)
+        if tasks:
+            msg = '{} ({})'.format(msg, tasks)
         self.spinner.step(label=msg)
 
     def clear(self):
@@ -146,18 +263,24 @@ class DeterminateStandardOut(ProgressViewBase):
     """ custom output for progress reporting """
     def __init__(self, out=None):
         super(DeterminateStandardOut, self).__init__(out if out else sys.stderr)
+        self._last_len = 0
 
     def write(self, args):
         """
         writes the progress
-        :param args: args is a dictionary containing 'percent', 'message'
+        :param args: args is a dictionary containing 'percent', 'message' and optionally the task summary
         """
         percent = args.get('percent', 0)
         message = args.get('message', '')
 
         if percent:
             progress = _format_value(message, percent)
-            self.out.write(progress)
+            tasks = _format_tasks(args)
+            if tasks:
+                progress = '{}  {}'.format(progress, tasks)
+            # overwrite what is left of a longer previous line
+            self._last_len, last_len = len(progress), self._last_len
+            self.out.write(progress.ljust(last_len))
 
     def clear(self):
         self.out.write('\n')
@@ -166,8 +289,40 @@ class DeterminateStandardOut(ProgressViewBase):
         self.out.flush()
 
 
+class SummaryStandardOut(ProgressViewBase):
+    """ one line summaries of the progress, for output which is not a terminal """
+    refresh_interval = PROGRESS_SUMMARY_INTERVAL
+
+    def __init__(self, out=None):
+        super(SummaryStandardOut, self).__init__(out if out else sys.stderr)
+
+    def write(self, args):
+        """
+        writes a summary of the progress, if there is more to it than a message
+        :param args: dictionary containing 'message', 'percent' and optionally the task summary
+        """
+        percent = args.get('percent')
+        tasks = _format_tasks(args)
+        if percent is None and not tasks:
+            return
+        summary = [s for s in ['{:.1%}'.format(percent) if percent is not None else None, tasks] if s]
+        self.out.write('{}: {}\n'.format(args.get('message', ''), ', '.join(summary)))
+
+    def flush(self):
+        self.out.flush()
+
+
+def _is_tty(stream):
+    try:
+        return stream.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
 def get_progress_view(determinant=False, outstream=sys.stderr):
     """ gets your view """
+    if not _is_tty(outstream):
+        return SummaryStandardOut(out=outstream)
     if determinant:
         return DeterminateStandardOut(out=outstream)
     return IndeterminateStandardOut(out=outstream)
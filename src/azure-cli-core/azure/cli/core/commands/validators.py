@@ -64,6 +64,63 @@ def validate_file_or_dict(string):
     return shell_safe_json_parse(string)
 
 
+def run_validators(namespace, validators, interactive=None):
+    """ Run validators concurrently, each one as soon as the validators it depends on have completed.
+
+    :param validators: list of (validator, depends_on) tuples in the order the validators run sequentially,
+        where depends_on lists validators from the same list.
+    :param interactive: validators which may prompt. They run on the calling thread, so that Ctrl-C interrupts the
+        prompt, in list order after the other validators succeeded, so that the user is not prompted before an
+        error. The validators which depend on them run after them.
+    Validators whose dependencies failed are not run and of the failed validators the error of the first
+    one in the list is raised, so the error reported is the one the sequential run would report.
+    """
+    import sys
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    import six
+    from azure.cli.core.util import get_max_concurrency
+
+    deferred = set(interactive or [])
+    for validator, depends_on in validators:
+        if any(d in deferred for d in depends_on):
+            deferred.add(validator)
+    validators, deferred = [v for v in validators if v[0] not in deferred], [v for v in validators if v[0] in deferred]
+
+    order = dict((validator, index) for index, (validator, _) in enumerate(validators))
+    pending = list(validators)
+    succeeded = set()
+    skipped = set()
+    errors = {}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=get_max_concurrency()) as executor:
+        while pending or running:
+            first_error = min(errors) if errors else len(validators)
+            for validator, depends_on in list(pending):
+                if order[validator] > first_error or any(order[d] in errors or d in skipped for d in depends_on):
+                    # cannot affect the error being reported
+                    pending.remove((validator, depends_on))
+                    skipped.add(validator)
+                elif all(d in succeeded for d in depends_on):
+                    pending.remove((validator, depends_on))
+                    running[executor.submit(validator, namespace)] = validator
+            if not running:
+                break
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                validator = running.pop(future)
+                try:
+                    future.result()
+                    succeeded.add(validator)
+                except Exception:  # pylint: disable=broad-except
+                    errors[order[validator]] = sys.exc_info()
+
+    if errors:
+        six.reraise(*errors[min(errors)])
+    for validator, _ in deferred:
+        validator(namespace)
+
+
 def validate_parameter_set(namespace, required, forbidden, dest_to_options=None, description=None):
     """ validates that a given namespace contains the specified required parameters and does not contain any of
         the provided forbidden parameters (unless the value came from a default). """
@@ -5,6 +5,139 @@
 
 import collections
 
+from six import string_types
+
+import azure.cli.core.azlogging as azlogging
+
+logger = azlogging.get_az_logger(__name__)
+
+_ODATA_COMPARATORS = {'eq': 'eq', 'ne': 'ne', 'gt': 'gt', 'gte': 'ge', 'lt': 'lt', 'lte': 'le'}
+
+# Keys added to every result by the client side transforms and the server fields they are derived from
+_TRANSFORM_SOURCE_FIELDS = {'resourceGroup': 'id'}
+
+
+class QueryPushdown(object):  # pylint: disable=too-few-public-methods
+    '''Describes which parts of a --query expression an operation can evaluate server side.
+
+    :param filter_fields: Top level result keys the operation accepts in `eq`/`ne`/... $filter clauses.
+    :param select: Whether the operation accepts a $select clause of top level result keys.
+    :param filter_param: Name of the operation parameter that receives the $filter string.
+    :param select_param: Name of the operation parameter that receives the $select string.
+    '''
+
+    def __init__(self, filter_fields=None, select=False, filter_param='filter', select_param='select'):
+        self.filter_fields = set(filter_fields or [])
+        self.select = select
+        self.filter_param = filter_param
+        self.select_param = select_param
+
+
+def _odata_literal(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    elif isinstance(value, (int, float)):
+        return str(value)
+    elif isinstance(value, string_types):
+        return "'{}'".format(value.replace("'", "''"))
+    return None
+
+
+def _plan_filter(node, filter_fields):
+    '''Translate a JMESPath filter condition into an OData $filter clause.
+    Returns None if the condition (or the safe part of it) cannot be evaluated server side.
+    '''
+    node_type = node['type']
+    if node_type == 'comparator':
+        field, literal = node['children']
+        if field['type'] == 'literal' and literal['type'] == 'field':
+            field, literal = literal, field
+            swapped = {'gt': 'lt', 'gte': 'lte', 'lt': 'gt', 'lte': 'gte'}
+            operator = swapped.get(node['value'], node['value'])
+        else:
+            operator = node['value']
+        if field['type'] != 'field' or literal['type'] != 'literal' or field['value'] not in filter_fields:
+            return None
+        value = _odata_literal(literal['value'])
+        if value is None or operator not in _ODATA_COMPARATORS:
+            return None
+        return '{} {} {}'.format(field['value'], _ODATA_COMPARATORS[operator], value)
+    elif node_type == 'and_expression':
+        # Pushing only one side of a conjunction is still safe as the full expression is applied locally
+        parts = [p for p in (_plan_filter(c, filter_fields) for c in node['children']) if p]
+        return ' and '.join(parts) if parts else None
+    elif node_type == 'or_expression':
+        parts = [_plan_filter(c, filter_fields) for c in node['children']]
+        return '({})'.format(' or '.join(parts)) if all(parts) else None
+    return None
+
+
+def _collect_fields(node, fields):
+    '''Collect the top level keys of the current element referenced by `node`.
+    Returns False if the expression refers to the element in a way that cannot be narrowed.
+    '''
+    node_type = node['type']
+    if node_type == 'field':
+        fields.add(node['value'])
+        return True
+    elif node_type == 'subexpression':
+        return _collect_fields(node['children'][0], fields)
+    elif node_type == 'literal':
+        return True
+    elif node_type in ('comparator', 'and_expression', 'or_expression', 'not_expression',
+                       'multi_select_list', 'multi_select_dict', 'key_val_pair'):
+        return all(_collect_fields(c, fields) for c in node['children'])
+    return False
+
+
+def plan_query_pushdown(parsed, pushdown):
+    '''Find the parts of a compiled JMESPath AST which the target operation can evaluate itself.
+
+    Only list filters and projections applied directly to the result are considered. The full
+    expression must still be applied locally to the returned result.
+    :return: tuple of ($filter, $select) strings, either of which may be None
+    '''
+    if parsed['type'] == 'pipe':
+        # Nothing after the pipe can be pushed down but the filter on the left hand side can be
+        odata_filter, _ = plan_query_pushdown(parsed['children'][0], pushdown)
+        return odata_filter, None
+
+    if parsed['type'] == 'filter_projection':
+        left, right, condition = parsed['children']
+    elif parsed['type'] == 'projection':
+        (left, right), condition = parsed['children'], None
+        if left['type'] == 'flatten':
+            left = left['children'][0]
+    else:
+        return None, None
+    if left['type'] != 'identity':
+        return None, None
+
+    odata_filter = _plan_filter(condition, pushdown.filter_fields) \
+        if condition and pushdown.filter_fields else None
+
+    odata_select = None
+    fields = set()
+    if pushdown.select and right['type'] != 'identity' and _collect_fields(right, fields) and \
+            (condition is None or _collect_fields(condition, fields)) and fields:
+        fields = set(_TRANSFORM_SOURCE_FIELDS.get(f, f) for f in fields)
+        odata_select = ','.join(sorted(fields))
+    return odata_filter, odata_select
+
+
+def apply_query_pushdown(query_expression, pushdown, args):
+    '''Set the $filter/$select parameters of the parsed command arguments from the query when
+    the user has not supplied them already.
+    '''
+    odata_filter, odata_select = plan_query_pushdown(query_expression.parsed, pushdown)
+    pushed = {}
+    for param, value in ((pushdown.filter_param, odata_filter), (pushdown.select_param, odata_select)):
+        if value and hasattr(args, param) and getattr(args, param) is None:
+            setattr(args, param, value)
+            pushed[param] = value
+    logger.debug("Query pushdown for '%s': %s", query_expression.expression, pushed or 'nothing pushed down')
+    return pushed
+
 
 def jmespath_type(raw_query):
     '''Compile the query with JMESPath and return the compiled result.
@@ -32,11 +165,21 @@ def _register_global_parameter(global_group):
 
 
 def register(application):
+    loaded_commands = {}
+
+    def handle_command_table_loaded(**kwargs):
+        loaded_commands.update(kwargs['command_table'])
+
     def handle_query_parameter(**kwargs):
+        from azure.cli.core._config import az_config
         args = kwargs['args']
         query_expression = args._jmespath_query  # pylint: disable=protected-access
         del args._jmespath_query
         if query_expression:
+            pushdown = getattr(loaded_commands.get(kwargs.get('command')), 'query_pushdown', None)
+            if pushdown and az_config.getboolean('core', 'query_pushdown', fallback=False):
+                apply_query_pushdown(query_expression, pushdown, args)
+
             def filter_output(**kwargs):
                 from jmespath import Options
                 kwargs['event_data']['result'] = query_expression.search(
@@ -46,4 +189,5 @@ def register(application):
             application.session['query_active'] = True
 
     application.register(application.GLOBAL_PARSER_CREATED, _register_global_parameter)
+    application.register(application.COMMAND_TABLE_LOADED, handle_command_table_loaded)
     application.register(application.COMMAND_PARSER_PARSED, handle_query_parameter)
@@ -5,17 +5,80 @@
 
 import re
 
+from six import string_types
+
 from azure.cli.core.util import b64_to_hex
 
+# Matches ids of the form /subscriptions/{sub}/resourceGroups/{rg}/providers/{ns}/{type}/{name}[/...]
+_RESOURCE_GROUP_ID_PATTERN = re.compile(r'^[^/]*/[^/]*/[^/]*/resourcegroups/([^/]*)(?:/[^/]*){4}',
+                                        re.IGNORECASE)
+_ID_SEPARATOR = re.compile('/')
+
+
+class ResultVisitor(object):  # pylint: disable=too-few-public-methods
+    '''A transform applied to every dictionary of a command result that contains `key`.
+
+    :param key: The key which must be present in a dictionary for `func` to be called.
+    :param func: Callable that receives the dictionary and may modify it in place.
+    :param skip_keys: Keys whose values (and everything nested below them) are not visited.
+    '''
+
+    __slots__ = ('key', 'func', 'skip_keys')
+
+    def __init__(self, key, func, skip_keys=None):
+        self.key = key
+        self.func = func
+        self.skip_keys = frozenset(skip_keys or [])
+
+
+_result_visitors = []
+
+
+def register_result_visitor(key, func, skip_keys=None):
+    '''Register a transform that is applied during the single traversal of each command result.'''
+    visitor = ResultVisitor(key, func, skip_keys)
+    _result_visitors.append(visitor)
+    return visitor
+
+
+def _visit(obj, visitors):
+    if isinstance(obj, list):
+        for item in obj:
+            if isinstance(item, (dict, list)):
+                _visit(item, visitors)
+    elif isinstance(obj, dict):
+        # Apply the transforms before walking the values so added keys are never iterated over
+        for visitor in visitors:
+            if visitor.key in obj:
+                visitor.func(obj)
+        for key, value in obj.items():
+            if isinstance(value, (dict, list)):
+                active = visitors
+                for visitor in visitors:
+                    if key in visitor.skip_keys:
+                        active = tuple(v for v in visitors if key not in v.skip_keys)
+                        break
+                if active:
+                    _visit(value, active)
+
+
+def transform_result(obj, visitors=None):
+    '''Apply all registered result transforms to `obj` in a single traversal.
+    This can be used on a complete result or on each item of a streamed result.
+    '''
+    visitors = tuple(_result_visitors if visitors is None else visitors)
+    if visitors and isinstance(obj, (dict, list)):
+        _visit(obj, visitors)
+    return obj
+
 
 def register(application):
-    application.register(application.TRANSFORM_RESULT, _resource_group_transform)
-    application.register(application.TRANSFORM_RESULT, _x509_from_base64_to_hex_transform)
+    application.register(application.TRANSFORM_RESULT, _result_transform)
 
 
 def _parse_id(strid):
     parsed = {}
-    parts = re.split('/', strid)
+    parts = _ID_SEPARATOR.split(strid)
     if parts[3].lower() != 'resourcegroups':
         raise KeyError()
 
@@ -24,40 +87,35 @@ def _parse_id(strid):
     return parsed
 
 
-def _add_resource_group(obj):
-    if isinstance(obj, list):
-        for array_item in obj:
-            _add_resource_group(array_item)
-    elif isinstance(obj, dict):
-        try:
-            if 'resourceGroup' not in obj:
-                if obj['id']:
-                    obj['resourceGroup'] = _parse_id(obj['id'])['resource-group']
-        except (KeyError, IndexError, TypeError):
-            pass
-        for item_key in obj:
-            if item_key != 'sourceVault':
-                _add_resource_group(obj[item_key])
+def _resource_group_visitor(obj):
+    if 'resourceGroup' not in obj:
+        strid = obj['id']
+        if strid and isinstance(strid, string_types):
+            match = _RESOURCE_GROUP_ID_PATTERN.match(strid)
+            if match:
+                obj['resourceGroup'] = match.group(1)
 
 
-def _add_x509_hex(obj):
-    if isinstance(obj, list):
-        for array_item in obj:
-            _add_x509_hex(array_item)
-    elif isinstance(obj, dict):
+def _x509_hex_visitor(obj):
+    if 'x509ThumbprintHex' not in obj:
         try:
-            if 'x509ThumbprintHex' not in obj:
-                if obj['x509Thumbprint']:
-                    obj['x509ThumbprintHex'] = b64_to_hex(obj['x509Thumbprint'])
+            if obj['x509Thumbprint']:
+                obj['x509ThumbprintHex'] = b64_to_hex(obj['x509Thumbprint'])
         except (KeyError, IndexError, TypeError):
             pass
-        for item_key in obj:
-            _add_x509_hex(obj[item_key])
 
 
-def _resource_group_transform(**kwargs):
-    _add_resource_group(kwargs['event_data']['result'])
+RESOURCE_GROUP_VISITOR = register_result_visitor('id', _resource_group_visitor, skip_keys=['sourceVault'])
+X509_HEX_VISITOR = register_result_visitor('x509Thumbprint', _x509_hex_visitor)
+
+
+def _add_resource_group(obj):
+    transform_result(obj, [RESOURCE_GROUP_VISITOR])
+
+
+def _add_x509_hex(obj):
+    transform_result(obj, [X509_HEX_VISITOR])
 
 
-def _x509_from_base64_to_hex_transform(**kwargs):
-    _add_x509_hex(kwargs['event_data']['result'])
+def _result_transform(**kwargs):
+    transform_result(kwargs['event_data']['result'])
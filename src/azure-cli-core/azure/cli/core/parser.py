@@ -9,14 +9,15 @@ import argparse
 import argcomplete
 
 import azure.cli.core.telemetry as telemetry
-import azure.cli.core._help as _help
-from azure.cli.core.util import CLIError
+from azure.cli.core.util import CLIError, LazyModule
 from azure.cli.core._pkg_util import handle_module_not_installed
 
 import azure.cli.core.azlogging as azlogging
 
 logger = azlogging.get_az_logger(__name__)
 
+_help = LazyModule('azure.cli.core._help')
+
 
 class IncorrectUsageError(CLIError):
     '''Raised when a command is incorrectly used and the usage should be
@@ -35,10 +36,39 @@ class CaseInsensitiveChoicesCompleter(argcomplete.completers.ChoicesCompleter):
 argcomplete.completers.ChoicesCompleter = CaseInsensitiveChoicesCompleter
 
 
+def _exit_after_completion_refresh(code):
+    import os
+    from azure.cli.core._completion_cache import COMPLETION_CACHE
+    if COMPLETION_CACHE.has_deferred_refresh:
+        # The shell reads the completions until every process holding its end of the pipe has exited,
+        # so stale completion cache entries are refreshed by a detached child with its stdio closed.
+        if os.fork() == 0:
+            try:
+                os.setsid()
+                devnull = os.open(os.devnull, os.O_RDWR)
+                for fd in (0, 1, 2):
+                    os.dup2(devnull, fd)
+                for fd in (8, 9):
+                    try:
+                        os.close(fd)
+                    except OSError:
+                        pass
+                COMPLETION_CACHE.run_deferred_refresh()
+            finally:
+                os._exit(0)  # pylint: disable=protected-access
+    else:
+        COMPLETION_CACHE.wait_for_refresh()
+    os._exit(code)  # pylint: disable=protected-access
+
+
 def enable_autocomplete(parser):
+    import os
+    from azure.cli.core._completion_cache import COMPLETION_CACHE
+    # Without fork (Windows) the refresh runs in a background thread which completion waits for
+    COMPLETION_CACHE.defer_refresh = hasattr(os, 'fork')
     argcomplete.autocomplete = argcomplete.CompletionFinder()
     argcomplete.autocomplete(parser, validator=lambda c, p: c.lower().startswith(p.lower()),
-                             default_completer=lambda _: ())
+                             default_completer=lambda _: (), exit_method=_exit_after_completion_refresh)
 
 
 class AzCliCommandParser(argparse.ArgumentParser):
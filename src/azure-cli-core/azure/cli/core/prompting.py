@@ -6,6 +6,8 @@
 from __future__ import print_function
 import sys
 import getpass
+import threading
+from functools import wraps
 from six.moves import input  # pylint: disable=redefined-builtin
 
 import azure.cli.core.azlogging as azlogging
@@ -13,16 +15,29 @@ import azure.cli.core.azlogging as azlogging
 logger = azlogging.get_az_logger(__name__)
 
 
+# Command handlers may run concurrently (e.g. for multiple --ids) so only one of them may prompt at a time
+_prompt_lock = threading.RLock()
+
+
 class NoTTYException(Exception):
     pass
 
 
+def _serialized(func):
+    @wraps(func)
+    def _wrapper(*args, **kwargs):
+        with _prompt_lock:
+            return func(*args, **kwargs)
+    return _wrapper
+
+
 def _verify_is_a_tty():
     if not sys.stdin.isatty():
         logger.debug('No tty available.')
         raise NoTTYException()
 
 
+@_serialized
 def prompt(msg, help_string=None):
     _verify_is_a_tty()
     while True:
@@ -33,6 +48,7 @@ def prompt(msg, help_string=None):
         return val
 
 
+@_serialized
 def prompt_int(msg, help_string=None):
     _verify_is_a_tty()
 
@@ -47,6 +63,7 @@ def prompt_int(msg, help_string=None):
             logger.warning('%s is not a valid number', value)
 
 
+@_serialized
 def prompt_pass(msg='Password: ', confirm=False, help_string=None):
     _verify_is_a_tty()
     while True:
@@ -70,6 +87,7 @@ def prompt_t_f(msg, default=None, help_string=None):
     return _prompt_bool(msg, 't', 'f', default=default, help_string=help_string)
 
 
+@_serialized
 def _prompt_bool(msg, true_str, false_str, default=None, help_string=None):
     _verify_is_a_tty()
     if default not in [None, true_str, false_str]:
@@ -89,6 +107,7 @@ def _prompt_bool(msg, true_str, false_str, default=None, help_string=None):
             return default == y.lower()
 
 
+@_serialized
 def prompt_choice_list(msg, a_list, default=1, help_string=None):
     '''Prompt user to select from a list of possible choices.
     :param str msg:A message displayed to the user before the choice list
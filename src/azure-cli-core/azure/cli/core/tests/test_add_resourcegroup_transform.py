@@ -5,7 +5,8 @@
 
 import unittest
 from six import StringIO
-from azure.cli.core.extensions.transform import _parse_id, _add_resource_group
+from azure.cli.core.extensions.transform import (_parse_id, _add_resource_group, transform_result,
+                                                 register_result_visitor)
 
 
 class TestResourceGroupTransform(unittest.TestCase):
@@ -85,6 +86,34 @@ class TestResourceGroupTransform(unittest.TestCase):
             'name': 'A name'
         })
 
+    def test_transforms_applied_in_single_traversal(self):
+        instance = [{
+            'id': TestResourceGroupTransform.CORRECT_ID,
+            'x509Thumbprint': 'AQI=',
+            'sourceVault': {'id': TestResourceGroupTransform.CORRECT_ID, 'x509Thumbprint': 'Aw=='}
+        }]
+        transform_result(instance)
+        self.assertEqual(instance[0]['resourceGroup'], 'REsourceGROUPname')
+        self.assertEqual(instance[0]['x509ThumbprintHex'], '0102')
+        # sourceVault is skipped by the resource group transform only
+        self.assertNotIn('resourceGroup', instance[0]['sourceVault'])
+        self.assertEqual(instance[0]['sourceVault']['x509ThumbprintHex'], '03')
+
+    def test_short_id_not_transformed(self):
+        instance = {'id': '/subscriptions/sub/resourceGroups/rg'}
+        _add_resource_group(instance)
+        self.assertNotIn('resourceGroup', instance)
+
+    def test_custom_visitor_per_item(self):
+        visitor = register_result_visitor('name', lambda obj: obj.update(upper=obj['name'].upper()))
+        try:
+            item = transform_result({'name': 'a', 'nested': [{'name': 'b'}]}, visitors=[visitor])
+            self.assertEqual(item['upper'], 'A')
+            self.assertEqual(item['nested'][0]['upper'], 'B')
+        finally:
+            from azure.cli.core.extensions import transform
+            transform._result_visitors.remove(visitor)  # pylint: disable=protected-access
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -7,6 +7,7 @@ import unittest
 
 import os
 import tempfile
+import mock
 
 from azure.cli.core.application import Application, Configuration, IterateAction
 from azure.cli.core.commands import CliCommand
@@ -74,6 +75,154 @@ class TestApplication(unittest.TestCase):
 
         app.raise_event('other_handler_called', args='secret sauce')
 
+    def test_application_records_event_handler_timings(self):
+        def handler(**kwargs):
+            pass
+
+        app = Application()
+        app.register('timed_event', handler)
+        app.raise_event('timed_event')
+        app.raise_event('timed_event')
+
+        name = next(n for e, n in app.event_handler_timings if e == 'timed_event')
+        self.assertTrue(name.endswith('handler'))
+        calls, total = app.event_handler_timings[('timed_event', name)]
+        self.assertEqual(calls, 2)
+        self.assertGreaterEqual(total, 0)
+
+    def test_event_data_rendered_lazily_and_bounded(self):
+        from azure.cli.core.application import _EventDataRenderer
+
+        class Expensive(object):  # pylint: disable=too-few-public-methods
+            rendered = False
+
+            def __repr__(self):
+                Expensive.rendered = True
+                return 'expensive'
+
+        renderer = _EventDataRenderer({'event_data': {'result': [Expensive()] + ['x' * 1000] * 10000}})
+        self.assertFalse(Expensive.rendered)
+        self.assertLessEqual(len(str(renderer)), _EventDataRenderer.MAX_WIDTH)
+        self.assertTrue(Expensive.rendered)
+
+    def test_execute_invocations_preserves_order(self):
+        from azure.cli.core.application import _execute_invocations
+        import time
+
+        def handler(params):
+            time.sleep(0.01 * (5 - params['name']))
+            return {'name': params['name']}
+
+        results, failures = _execute_invocations([(handler, {'name': i}) for i in range(5)], ['name'])
+        self.assertEqual(results, [{'name': i} for i in range(5)])
+        self.assertEqual(failures, 0)
+
+    def test_execute_invocations_isolates_failures(self):
+        from azure.cli.core.application import _execute_invocations
+
+        def handler(params):
+            if params['vm_name'] == 'bad':
+                raise CLIError('not found')
+            return params['vm_name']
+
+        invocations = [(handler, {'vm_name': n}) for n in ['a', 'bad', 'c']]
+        results, failures = _execute_invocations(invocations, ['vm_name'])
+        self.assertEqual(results, ['a', {'vmName': 'bad', 'error': 'not found'}, 'c'])
+        self.assertEqual(failures, 1)
+
+        with self.assertRaises(CLIError):
+            _execute_invocations([(handler, {'vm_name': 'bad'})] * 3, ['vm_name'])
+        with self.assertRaises(CLIError):
+            _execute_invocations([(handler, {'vm_name': 'bad'})], ['vm_name'])
+
+    def test_execute_invocations_reports_partial_results(self):
+        from azure.cli.core.application import _execute_invocations
+        from azure.cli.core.util import CLIPartialResultError
+
+        def handler(params):
+            if params['name'] == 'partial':
+                raise CLIPartialResultError('1 of 2 files failed', [{'file': 'a'}, {'file': 'b', 'error': 'failed'}])
+            return params['name']
+
+        results, failures = _execute_invocations([(handler, {'name': 'partial'})], ['name'])
+        self.assertEqual(results, [[{'file': 'a'}, {'file': 'b', 'error': 'failed'}]])
+        self.assertEqual(failures, 1)
+
+        invocations = [(handler, {'name': n}) for n in ['a', 'partial', 'c']]
+        results, failures = _execute_invocations(invocations, ['name'])
+        self.assertEqual(results[0], 'a')
+        self.assertEqual(len(results[1]), 2)
+        self.assertEqual(failures, 1)
+
+    @mock.patch('azure.cli.core.util.get_max_concurrency', lambda: 8)
+    def test_execute_invocations_uses_throttle_limit(self):
+        from azure.cli.core.application import _execute_invocations
+        from azure.cli.core.throttle import ThrottleGovernor
+        import threading
+        import time
+
+        governor = ThrottleGovernor()
+        for _ in range(2):
+            governor.observe(mock.MagicMock(status_code=429, headers={'Retry-After': '0'}, request=mock.MagicMock(
+                url='https://management.azure.com/subscriptions/sub1/resourceGroups/rg1', method='GET')))
+        self.assertEqual(governor.concurrency_limit, 2)
+
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def handler(params):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            # requests of the handler do not wait for the slots of the invocations
+            with governor.slot():
+                time.sleep(0.01)
+            with lock:
+                active.pop()
+            return params['name']
+
+        with mock.patch('azure.cli.core.throttle.THROTTLE_GOVERNOR', governor):
+            results, failures = _execute_invocations([(handler, {'name': i}) for i in range(6)], ['name'])
+        self.assertEqual(results, list(range(6)))
+        self.assertEqual(failures, 0)
+        self.assertEqual(max(peak), 2)
+
+    def test_execute_invocations_sequential(self):
+        from azure.cli.core.application import _execute_invocations
+        import threading
+        import time
+
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def handler(params):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.pop()
+            return params['name']
+
+        invocations = [(handler, {'name': i}) for i in range(4)]
+        results, _ = _execute_invocations(invocations, ['name'], concurrent=False)
+        self.assertEqual(results, list(range(4)))
+        self.assertEqual(max(peak), 1)
+
+    def test_allows_concurrent_invocations(self):
+        from azure.cli.core.application import _allows_concurrent_invocations
+
+        with mock.patch('azure.cli.core._config.AzConfig.has_option', return_value=False):
+            self.assertTrue(_allows_concurrent_invocations('vm show'))
+            self.assertTrue(_allows_concurrent_invocations('network nic list'))
+            self.assertFalse(_allows_concurrent_invocations('vm delete'))
+            self.assertFalse(_allows_concurrent_invocations('vm start'))
+        # changes run concurrently once core.max_concurrency is configured
+        with mock.patch('azure.cli.core._config.AzConfig.has_option', return_value=True):
+            self.assertTrue(_allows_concurrent_invocations('vm delete'))
+
     def test_list_value_parameter(self):
         hellos = []
 
@@ -3,9 +3,15 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import shutil
+import tempfile
 import unittest
 
-from azure.cli.core.commands.arm import parse_resource_id
+import mock
+
+from azure.cli.core._catalog import SubscriptionCatalog
+from azure.cli.core.commands.arm import parse_resource_id, resolve_api_version
+from azure.cli.core.util import CLIError
 
 
 class TestARM(unittest.TestCase):
@@ -156,6 +162,36 @@ class TestARM(unittest.TestCase):
                 except KeyError:
                     self.assertTrue(key not in kwargs and test['expected'][key] is None)
 
+    def test_resolve_api_version_from_provider_catalog(self):
+        def _resource_type(name, api_versions):
+            return mock.MagicMock(resource_type=name, api_versions=api_versions, locations=['West US'])
+
+        provider = mock.MagicMock(namespace='Microsoft.Mock')
+        provider.resource_types = [_resource_type('sites', ['2016-09-01', '2016-08-01']),
+                                   _resource_type('previews', ['2017-01-01-preview'])]
+        rcf = mock.MagicMock()
+        rcf.config.subscription_id = 'sub1'
+        rcf.providers.get.return_value = provider
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            with mock.patch.dict('os.environ', {'AZURE_CONFIG_DIR': temp_dir}), \
+                    mock.patch('azure.cli.core._catalog._resolve_scope', lambda cloud, sub: ('AzureCloud', sub)), \
+                    mock.patch('azure.cli.core.commands.arm.PROVIDER_CATALOG',
+                               SubscriptionCatalog('providerCatalog.json', ttl=60)):
+                self.assertEqual(resolve_api_version('Microsoft.Mock', 'sites', rcf=rcf), '2016-09-01')
+                self.assertEqual(resolve_api_version('Microsoft.Mock', 'config', 'Sites/site1', rcf=rcf),
+                                 '2016-09-01')
+                self.assertEqual(resolve_api_version('microsoft.mock', 'previews', rcf=rcf), '2017-01-01-preview')
+                self.assertEqual(rcf.providers.get.call_count, 1)
+
+                # unknown resource types refresh the catalog once
+                with self.assertRaises(CLIError):
+                    resolve_api_version('Microsoft.Mock', 'unknown', rcf=rcf)
+                self.assertEqual(rcf.providers.get.call_count, 2)
+        finally:
+            shutil.rmtree(temp_dir)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,116 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import threading
+import unittest
+
+from six.moves import BaseHTTPServer  # pylint: disable=import-error
+from six.moves.urllib.parse import urlparse  # pylint: disable=import-error
+
+from msrest.authentication import BasicTokenAuthentication
+from azure.mgmt.resource import ResourceManagementClient
+
+from azure.cli.core.commands.arm_batch import ArmRequestBatch, ArmRequestError
+
+VNET_ID = '/subscriptions/sub1/resourceGroups/rg1/providers/Microsoft.Network/virtualNetworks/vnet{}'
+
+
+class _StandInARMHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def _get_resource(self, path):
+        if path.endswith('missing'):
+            return 404, {'error': {'code': 'ResourceNotFound', 'message': 'vnetmissing not found'}}
+        return 200, {'id': path, 'name': path.rsplit('/', 1)[-1]}
+
+    def _reply(self, status, content):
+        body = json.dumps(content).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.server.requests.append(('GET', self.path))
+        self._reply(*self._get_resource(urlparse(self.path).path))
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self.server.requests.append(('POST', self.path))
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8'))
+        if not self.server.batch_supported:
+            self._reply(404, {'error': {'code': 'NotFound', 'message': 'no batch'}})
+            return
+        responses = []
+        for request in reversed(body['requests']):
+            status, content = self._get_resource(urlparse(request['url']).path)
+            responses.append({'name': request['name'], 'httpStatusCode': status, 'content': content})
+        self._reply(200, {'responses': responses})
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class TestArmRequestBatch(unittest.TestCase):
+    def setUp(self):
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), _StandInARMHandler)
+        self.server.requests = []
+        self.server.batch_supported = True
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.client = ResourceManagementClient(BasicTokenAuthentication({'access_token': 'token'}), 'sub1',
+                                               base_url='http://127.0.0.1:{}'.format(self.server.server_port))
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _add_gets(self, batch):
+        for name in ['1', 'missing', '2']:
+            batch.add_get(VNET_ID.format(name), '2017-06-01')
+
+    def _check_results(self, results):
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0].result()['name'], 'vnet1')
+        self.assertEqual(results[2].value['name'], 'vnet2')
+        self.assertIsInstance(results[1].error, ArmRequestError)
+        self.assertEqual(results[1].error.status_code, 404)
+        self.assertEqual(results[1].error.error_code, 'ResourceNotFound')
+        with self.assertRaises(ArmRequestError):
+            results[1].result()
+
+    def test_arm_batch_get(self):
+        batch = ArmRequestBatch(self.client)
+        self._add_gets(batch)
+        self._check_results(batch.resolve())
+        self.assertEqual(self.server.requests, [('POST', '/batch?api-version=2015-11-01')])
+        self.assertEqual(len(batch), 0)
+
+    def test_arm_batch_fallback(self):
+        self.server.batch_supported = False
+        batch = ArmRequestBatch(self.client)
+        self._add_gets(batch)
+        self._check_results(batch.resolve())
+        self.assertEqual(self.server.requests[0][0], 'POST')
+        self.assertEqual(sorted(r[1] for r in self.server.requests[1:]),
+                         sorted(VNET_ID.format(n) + '?api-version=2017-06-01' for n in ['1', '2', 'missing']))
+
+    def test_arm_batch_operations(self):
+        def _fail():
+            raise ValueError('bad')
+
+        batch = ArmRequestBatch(self.client, use_batch_api=False)
+        batch.add(lambda x: x * 2, 21)
+        batch.add(_fail)
+        batch.add_get(VNET_ID.format('1'), '2017-06-01')
+        results = batch.resolve()
+        self.assertEqual(results[0].result(), 42)
+        self.assertIsInstance(results[1].error, ValueError)
+        self.assertEqual(results[2].result()['name'], 'vnet1')
+        self.assertEqual([r[0] for r in self.server.requests], ['GET'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+
+from azure.cli.core._catalog import SubscriptionCatalog
+import azure.cli.core.commands.parameters as parameters
+
+
+def _mock_location(name, display_name):
+    location = mock.MagicMock()
+    location.name = name
+    location.display_name = display_name
+    return location
+
+
+class TestSubscriptionCatalog(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.env_patch = mock.patch.dict('os.environ', {'AZURE_CONFIG_DIR': self.temp_dir})
+        self.env_patch.start()
+        self.scope_patch = mock.patch('azure.cli.core._catalog._resolve_scope',
+                                      lambda cloud, sub: (cloud or 'AzureCloud', sub or 'sub1'))
+        self.scope_patch.start()
+
+    def tearDown(self):
+        self.scope_patch.stop()
+        self.env_patch.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def test_catalog_ttl_and_persistence(self):
+        catalog = SubscriptionCatalog('testCatalog.json', ttl=60)
+        fetch = mock.MagicMock(return_value={'a': 1})
+        self.assertEqual(catalog.get('key', fetch), {'a': 1})
+        self.assertEqual(catalog.get('key', fetch), {'a': 1})
+        self.assertEqual(fetch.call_count, 1)
+        self.assertTrue(os.path.isfile(os.path.join(self.temp_dir, 'testCatalog.json')))
+
+        # a new process reads the persisted entry
+        catalog = SubscriptionCatalog('testCatalog.json', ttl=60)
+        self.assertEqual(catalog.get('key', fetch), {'a': 1})
+        self.assertEqual(fetch.call_count, 1)
+
+        # entries are per cloud and subscription
+        catalog.get('key', fetch, subscription_id='sub2')
+        catalog.get('key', fetch, cloud_name='AzureChinaCloud')
+        self.assertEqual(fetch.call_count, 3)
+
+        catalog.get('key', fetch, refresh=True)
+        self.assertEqual(fetch.call_count, 4)
+
+        catalog.session['AzureCloud']['sub1']['key']['time'] = time.time() - 61
+        catalog.get('key', fetch)
+        self.assertEqual(fetch.call_count, 5)
+
+    def test_location_catalog(self):
+        locations = [_mock_location('eastus', 'East US'), _mock_location('westus', 'West US')]
+        with mock.patch.object(parameters, 'LOCATION_CATALOG', SubscriptionCatalog('locations.json', ttl=60)), \
+                mock.patch.object(parameters, '_list_subscription_locations',
+                                  return_value=(locations, 'sub1')) as list_mock:
+            self.assertEqual(parameters.location_name_type('West US'), 'westus')
+            self.assertEqual(parameters.location_name_type('eastus'), 'eastus')
+            self.assertEqual(parameters.get_one_of_subscription_locations(), 'westus')
+            self.assertEqual(parameters.get_location_completion_list(''), ['eastus', 'westus'])
+            self.assertEqual(list_mock.call_count, 1)
+
+            # an unknown display name refreshes the catalog once
+            self.assertEqual(parameters.location_name_type('Unknown Location'), 'Unknown Location')
+            self.assertEqual(list_mock.call_count, 2)
+            list_mock.return_value = (locations + [_mock_location('westus2', 'West US 2')], 'sub1')
+            self.assertEqual(parameters.location_name_type('West US 2'), 'westus2')
+            self.assertEqual(list_mock.call_count, 3)
+            self.assertEqual(parameters.location_name_type('West US 2'), 'westus2')
+            self.assertEqual(list_mock.call_count, 3)
+
+            # listing the locations refreshes the catalog
+            list_mock.return_value = ([_mock_location('northeurope', 'North Europe')], 'sub1')
+            parameters.get_subscription_locations()
+            self.assertEqual(parameters.get_one_of_subscription_locations(), 'northeurope')
+            self.assertEqual(list_mock.call_count, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
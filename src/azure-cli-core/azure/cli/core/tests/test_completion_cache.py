@@ -0,0 +1,118 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import codecs
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+
+from azure.cli.core._completion_cache import CompletionCache, get_command_scope
+
+
+class TestCompletionCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.temp_dir, 'completionCache.json')
+        self.cache = CompletionCache(self.cache_file, ttl=60, max_staleness=3600, max_entries=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _age(self, key, seconds):
+        self.cache.session['sub1'][key]['time'] = time.time() - seconds
+
+    def test_completion_cache_fresh_entry(self):
+        fetch = mock.MagicMock(return_value=['rg1', 'rg2'])
+        self.assertEqual(self.cache.get('sub1', 'resourceGroups', fetch), ['rg1', 'rg2'])
+        self.assertEqual(self.cache.get('sub1', 'resourceGroups', fetch), ['rg1', 'rg2'])
+        self.assertEqual(fetch.call_count, 1)
+
+        # entries are per subscription and shared through the cache file
+        self.cache.get('sub2', 'resourceGroups', fetch)
+        self.assertEqual(fetch.call_count, 2)
+        with codecs.open(self.cache_file, encoding='utf-8-sig') as f:
+            self.assertEqual(json.load(f)['sub1']['resourceGroups']['values'], ['rg1', 'rg2'])
+        other_process = CompletionCache(self.cache_file, ttl=60)
+        self.assertEqual(other_process.get('sub1', 'resourceGroups', fetch), ['rg1', 'rg2'])
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_completion_cache_stale_entry_refreshed_in_background(self):
+        self.cache.get('sub1', 'locations', lambda: ['westus'])
+        self._age('locations', 120)
+
+        self.assertEqual(self.cache.get('sub1', 'locations', lambda: ['westus', 'eastus']), ['westus'])
+        self.cache.wait_for_refresh()
+        self.assertEqual(self.cache.get('sub1', 'locations', lambda: []), ['westus', 'eastus'])
+
+    def test_completion_cache_deferred_refresh(self):
+        self.cache.get('sub1', 'locations', lambda: ['westus'])
+        self._age('locations', 120)
+        self.cache.defer_refresh = True
+
+        self.assertEqual(self.cache.get('sub1', 'locations', lambda: ['westus', 'eastus']), ['westus'])
+        self.assertTrue(self.cache.has_deferred_refresh)
+        self.assertEqual(self.cache.get('sub1', 'locations', lambda: []), ['westus'])
+
+        self.cache.run_deferred_refresh()
+        self.assertFalse(self.cache.has_deferred_refresh)
+        self.assertEqual(self.cache.get('sub1', 'locations', lambda: []), ['westus', 'eastus'])
+
+    @mock.patch('os._exit', side_effect=SystemExit)
+    @mock.patch('os.fork', return_value=1234, create=True)
+    def test_completion_exits_without_waiting_for_deferred_refresh(self, fork, _exit):
+        from azure.cli.core.parser import _exit_after_completion_refresh
+        refresh = mock.MagicMock()
+        with mock.patch('azure.cli.core._completion_cache.COMPLETION_CACHE', self.cache):
+            self.cache.get('sub1', 'locations', lambda: ['westus'])
+            self._age('locations', 120)
+            self.cache.defer_refresh = True
+            self.cache.get('sub1', 'locations', refresh)
+            with self.assertRaises(SystemExit):
+                _exit_after_completion_refresh(0)
+        fork.assert_called_once_with()
+        _exit.assert_called_once_with(0)
+        # the refresh runs in the detached child only
+        refresh.assert_not_called()
+
+    def test_completion_cache_expired_entry(self):
+        self.cache.get('sub1', 'locations', lambda: ['westus'])
+        self._age('locations', 7200)
+        self.assertEqual(self.cache.get('sub1', 'locations', lambda: ['eastus']), ['eastus'])
+
+    def test_completion_cache_disabled(self):
+        cache = CompletionCache(self.cache_file, ttl=0)
+        fetch = mock.MagicMock(return_value=['rg1'])
+        cache.get('sub1', 'resourceGroups', fetch)
+        cache.get('sub1', 'resourceGroups', fetch)
+        self.assertEqual(fetch.call_count, 2)
+        self.assertFalse(os.path.exists(self.cache_file))
+
+    def test_completion_cache_max_entries(self):
+        for i in range(4):
+            self.cache.get('sub1', 'key{}'.format(i), lambda: [])
+            self._age('key{}'.format(i), 10 - i)
+        self.assertEqual(sorted(self.cache.session['sub1'].keys()), ['key1', 'key2', 'key3'])
+
+    def test_completion_cache_invalidate(self):
+        self.cache.get('sub1', 'resourceGroups', lambda: ['rg1'], scope='resource')
+        self.cache.get('sub1', 'resources/rg1/', lambda: ['vm1'], scope='vm')
+        self.cache.invalidate('resource')
+        self.assertEqual(list(self.cache.session['sub1'].keys()), ['resources/rg1/'])
+
+    def test_completion_cache_command_scope(self):
+        with mock.patch('azure.cli.core.commands.command_module_map',
+                        {'group create': 'azure.cli.command_modules.resource.commands'}):
+            self.assertEqual(get_command_scope('group create'), 'azure.cli.command_modules.resource')
+            self.assertIsNone(get_command_scope('vm create'))
+            self.assertIsNone(get_command_scope(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,9 +3,11 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import argparse
 import unittest
 
-from azure.cli.core.extensions.query import jmespath_type
+from azure.cli.core.extensions.query import (jmespath_type, QueryPushdown, plan_query_pushdown,
+                                             apply_query_pushdown)
 
 
 class TestQuery(unittest.TestCase):
@@ -56,5 +58,51 @@ class TestQuery(unittest.TestCase):
             jmespath_type(query)
 
 
+class TestQueryPushdown(unittest.TestCase):
+
+    def setUp(self):
+        self.pushdown = QueryPushdown(filter_fields=['location', 'name'], select=True)
+
+    def _plan(self, query):
+        return plan_query_pushdown(jmespath_type(query).parsed, self.pushdown)
+
+    def test_pushdown_filter_and_select(self):
+        self.assertEqual(self._plan("[?location=='westus'].{name:name,id:id}"),
+                         ("location eq 'westus'", 'id,location,name'))
+
+    def test_pushdown_partial_conjunction(self):
+        odata_filter, _ = self._plan("[?location=='westus' && tags.env=='prod']")
+        self.assertEqual(odata_filter, "location eq 'westus'")
+
+    def test_pushdown_disjunction_requires_both_sides(self):
+        self.assertEqual(self._plan("[?location=='westus' || name=='a']")[0],
+                         "(location eq 'westus' or name eq 'a')")
+        self.assertIsNone(self._plan("[?location=='westus' || tags.env=='prod']")[0])
+
+    def test_pushdown_unsupported_field(self):
+        self.assertEqual(self._plan("[?tags.env=='prod']"), (None, None))
+
+    def test_pushdown_escapes_literal(self):
+        self.assertEqual(self._plan("[?name=='it\\'s'].name")[0], "name eq 'it''s'")
+
+    def test_pushdown_select_only(self):
+        self.assertEqual(self._plan('[].[name, resourceGroup]'), (None, 'id,name'))
+        self.assertEqual(self._plan('[].properties.provisioningState'), (None, 'properties'))
+
+    def test_pushdown_not_applied_to_functions(self):
+        self.assertEqual(self._plan("[?contains(name, 'a')].name"), (None, None))
+        self.assertEqual(self._plan('length(@)'), (None, None))
+
+    def test_pushdown_pipe_filter_only(self):
+        self.assertEqual(self._plan("[?location=='westus'] | [0].name"), ("location eq 'westus'", None))
+
+    def test_apply_pushdown_keeps_user_values(self):
+        args = argparse.Namespace(filter="name eq 'x'", select=None)
+        pushed = apply_query_pushdown(jmespath_type("[?location=='westus'].name"), self.pushdown, args)
+        self.assertEqual(pushed, {'select': 'location,name'})
+        self.assertEqual(args.filter, "name eq 'x'")
+        self.assertEqual(args.select, 'location,name')
+
+
 if __name__ == '__main__':
     unittest.main()
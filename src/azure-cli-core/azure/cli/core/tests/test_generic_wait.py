@@ -0,0 +1,107 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import unittest
+
+import mock
+
+from azure.cli.core.application import IterateValue
+from azure.cli.core.commands import command_table
+from azure.cli.core.commands.arm import cli_generic_wait_command
+from azure.cli.core.util import CLIError, CLIPartialResultError
+
+
+class _Instance(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, provisioning_state):
+        self.provisioning_state = provisioning_state
+
+
+_states = {}
+_lock = threading.Lock()
+
+
+def get_resource(resource_group_name, resource_name):
+    with _lock:
+        states = _states[(resource_group_name, resource_name)]
+        state = states.pop(0) if len(states) > 1 else states[0]
+    if isinstance(state, BaseException):
+        raise state
+    return _Instance(state)
+
+
+class GenericWaitTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cli_generic_wait_command(__name__, 'test wait', '{}#get_resource'.format(__name__))
+        cls.handler = staticmethod(command_table['test wait'].handler)
+
+    def _args(self, names, **kwargs):
+        args = {'resource_group_name': 'rg',
+                'resource_name': IterateValue(names) if isinstance(names, list) else names,
+                'timeout': 10, 'interval': 0, 'created': True, 'deleted': False, 'updated': False,
+                'exists': False, 'custom': None, 'wait_for_any': False}
+        args.update(kwargs)
+        return args
+
+    def test_wait_single_resource(self):
+        _states[('rg', 'vm1')] = ['Creating', 'Creating', 'Succeeded']
+        self.assertIsNone(self.handler(self._args('vm1')))
+        self.assertFalse(command_table['test wait'].expand_list_args)
+
+    def test_wait_single_resource_failed(self):
+        _states[('rg', 'vm1')] = ['Creating', 'Failed']
+        with self.assertRaises(CLIError):
+            self.handler(self._args('vm1'))
+
+    def test_wait_multiple_resources_reports_each(self):
+        _states[('rg', 'vm1')] = ['Creating', 'Succeeded']
+        _states[('rg', 'vm2')] = ['Creating', 'Creating', 'Failed']
+        _states[('rg', 'vm3')] = ['Succeeded']
+        with self.assertRaisesRegexp(CLIPartialResultError, '1 of 3 resources') as context:
+            self.handler(self._args(['vm1', 'vm2', 'vm3']))
+        report = context.exception.result
+        self.assertEqual([(r['resourceName'], r['status']) for r in report],
+                         [('vm1', 'Succeeded'), ('vm2', 'Failed'), ('vm3', 'Succeeded')])
+        self.assertEqual(report[1]['error'], 'The operation failed')
+        self.assertTrue(all(r['elapsedSeconds'] is not None for r in report))
+
+    def test_wait_multiple_resources_any(self):
+        _states[('rg', 'vm1')] = ['Creating']
+        _states[('rg', 'vm2')] = ['Succeeded']
+        report = self.handler(self._args(['vm1', 'vm2'], wait_for_any=True))
+        self.assertEqual([r['status'] for r in report], ['Pending', 'Succeeded'])
+
+    def test_wait_multiple_resources_timeout(self):
+        _states[('rg', 'vm1')] = ['Creating']
+        _states[('rg', 'vm2')] = ['Succeeded']
+        with self.assertRaises(CLIPartialResultError) as context:
+            self.handler(self._args(['vm1', 'vm2'], timeout=0.2))
+        self.assertEqual([r['status'] for r in context.exception.result], ['TimedOut', 'Succeeded'])
+
+    def test_wait_multiple_resources_any_timeout(self):
+        _states[('rg', 'vm1')] = ['Creating']
+        _states[('rg', 'vm2')] = ['Updating']
+        with self.assertRaisesRegexp(CLIPartialResultError, '2 of 2 resources') as context:
+            self.handler(self._args(['vm1', 'vm2'], timeout=0.2, wait_for_any=True))
+        self.assertEqual([r['status'] for r in context.exception.result], ['TimedOut', 'TimedOut'])
+
+    def test_wait_single_resource_timeout(self):
+        _states[('rg', 'vm1')] = ['Creating']
+        with self.assertRaisesRegexp(CLIError, 'timed-out'):
+            self.handler(self._args('vm1', timeout=0.2))
+
+    def test_wait_multiple_resources_ends_progress_when_interrupted(self):
+        _states[('rg', 'vm1')] = ['Creating', KeyboardInterrupt()]
+        _states[('rg', 'vm2')] = ['Creating']
+        with mock.patch('azure.cli.core.application.APPLICATION.get_progress_controller') as get_controller:
+            with self.assertRaises(KeyboardInterrupt):
+                self.handler(self._args(['vm1', 'vm2']))
+        get_controller.return_value.end.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# Imports done by 'az <command> -h': the command table of the module, the arguments of the command and the
+# help renderer. The number of modules loaded is checked, not the time it takes. Run with
+# AZURE_CLI_RECORD_IMPORT_BUDGET=1 to record the current module counts as the new baseline.
+_SCENARIO_SCRIPT = '''
+import json
+import sys
+from azure.cli.core.commands import get_command_table, load_params
+get_command_table(sys.argv[1])
+load_params(sys.argv[2])
+import azure.cli.core._help
+print(json.dumps(sorted(sys.modules)))
+'''
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'import_budget.json')
+# Allowed growth of the number of modules loaded over the baseline
+MODULES_TOLERANCE = 1.05
+
+
+def load_modules(module_name, command):
+    """ Returns the names of the modules loaded by the scenario. """
+    config_dir = tempfile.mkdtemp()
+    try:
+        env = dict(os.environ, AZURE_CONFIG_DIR=config_dir)
+        process = subprocess.Popen([sys.executable, '-c', _SCENARIO_SCRIPT, module_name, command],
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+        out, err = process.communicate()
+    finally:
+        shutil.rmtree(config_dir)
+    if process.returncode:
+        lines = err.decode('utf-8', 'replace').splitlines()
+        raise AssertionError('Loading {} failed:\n{}'.format(command, '\n'.join(lines[-10:])))
+    return set(json.loads(out.decode('utf-8').splitlines()[-1]))
+
+
+def _load_baseline():
+    with open(BASELINE_FILE) as f:
+        return json.load(f)
+
+
+class TestImportBudget(unittest.TestCase):
+    """ Checks that 'az <command> -h' loads no deferred modules and not many more modules than the baseline. """
+
+    def _check_budget(self, command, budget):
+        modules = load_modules(budget['module'], command)
+        if os.environ.get('AZURE_CLI_RECORD_IMPORT_BUDGET'):
+            budget['modules'] = len(modules)
+            return
+        deferred = sorted(name for name in modules
+                          if any(name == d or name.startswith(d + '.') for d in budget['deferred']))
+        self.assertEqual(deferred, [],
+                         "'az {} -h' loads modules which are only needed to run some commands. Import them where "
+                         "they are used.".format(command))
+        self.assertLessEqual(len(modules), int(budget['modules'] * MODULES_TOLERANCE),
+                             "'az {} -h' loads {} modules, the budget is {}. Import the modules only needed to run "
+                             "the command where they are used.".format(command, len(modules), budget['modules']))
+
+    def test_import_budget(self):
+        baseline = _load_baseline()
+        checked = 0
+        for command in sorted(baseline):
+            try:
+                __import__('azure.cli.command_modules.' + baseline[command]['module'])
+            except ImportError:
+                continue
+            self._check_budget(command, baseline[command])
+            checked += 1
+        if not checked:
+            self.skipTest('none of the command modules of the baseline is installed')
+        if os.environ.get('AZURE_CLI_RECORD_IMPORT_BUDGET'):
+            with open(BASELINE_FILE, 'w') as f:
+                json.dump(baseline, f, indent=2, sort_keys=True, separators=(',', ': '))
+                f.write('\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,7 @@
 
 import unittest
 from azure.cli.core import get_az_logger
-from azure.cli.core.azlogging import AzLoggingLevelManager
+from azure.cli.core.azlogging import AzLoggingLevelManager, is_logging_enabled_for
 
 
 class TestLogging(unittest.TestCase):
@@ -66,6 +66,23 @@ class TestLogging(unittest.TestCase):
         az_module_logger = get_az_logger('azure.cli.module')
         self.assertEqual(az_module_logger.name, 'az.azure.cli.module')
 
+    def test_is_logging_enabled_for_checks_handlers(self):
+        import logging
+        parent = logging.getLogger('az_test_is_logging_enabled')
+        parent.propagate = False
+        parent.setLevel(logging.DEBUG)
+        child = parent.getChild('module')
+        handler = logging.NullHandler()
+        handler.setLevel(logging.WARNING)
+        parent.addHandler(handler)
+        try:
+            self.assertFalse(is_logging_enabled_for(child, logging.DEBUG))
+            self.assertTrue(is_logging_enabled_for(child, logging.WARNING))
+            handler.setLevel(logging.DEBUG)
+            self.assertTrue(is_logging_enabled_for(child, logging.DEBUG))
+        finally:
+            parent.removeHandler(handler)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,88 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import datetime
+import unittest
+
+import mock
+
+from azure.cli.core.commands import LongRunningOperation, LRO_JITTER, LRO_MAX_RETRY_AFTER_MS
+
+
+class _FakeResponse(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, headers=None, content=b''):
+        self.headers = headers or {}
+        self._content = content
+
+
+class _FakePoller(object):
+    def __init__(self, ticks, response=None):
+        self.ticks = ticks
+        self._response = response or _FakeResponse()
+        self.waits = []
+
+    def done(self):
+        return self.ticks <= 0
+
+    def result(self):
+        return 'done'
+
+    def add_tick(self, timeout):
+        self.waits.append(timeout)
+        self.ticks -= 1
+
+
+class TestLongRunningOperation(unittest.TestCase):
+
+    def _lro(self, **kwargs):
+        return LongRunningOperation(progress_controller=mock.MagicMock(), **kwargs)
+
+    def test_backoff_grows_to_maximum(self):
+        lro = self._lro(poller_done_interval_ms=100, poller_max_interval_ms=400, backoff_factor=2)
+        poller = _FakePoller(10)
+        intervals = [lro._next_interval_ms(poller) for _ in range(5)]  # pylint: disable=protected-access
+        expected = [100, 200, 400, 400, 400]
+        for actual, base in zip(intervals, expected):
+            self.assertGreaterEqual(actual, base * (1 - LRO_JITTER))
+            self.assertLessEqual(actual, min(base * (1 + LRO_JITTER), 400))
+
+    def test_retry_after_is_honored(self):
+        lro = self._lro(poller_done_interval_ms=100, poller_max_interval_ms=5000)
+        poller = _FakePoller(10, _FakeResponse(headers={'retry-after': '3'}))
+        self.assertEqual(lro._next_interval_ms(poller), 3000)  # pylint: disable=protected-access
+        # the service may ask for longer than the backoff of the polling
+        poller._response.headers['retry-after'] = '60'  # pylint: disable=protected-access
+        self.assertEqual(lro._next_interval_ms(poller), 60000)  # pylint: disable=protected-access
+        poller._response.headers['retry-after'] = '86400'  # pylint: disable=protected-access
+        self.assertEqual(lro._next_interval_ms(poller), LRO_MAX_RETRY_AFTER_MS)  # pylint: disable=protected-access
+        # the backoff resumes within poller_max_interval_ms once the service stops sending Retry-After
+        del poller._response.headers['retry-after']  # pylint: disable=protected-access
+        self.assertLessEqual(lro._next_interval_ms(poller), 5000)  # pylint: disable=protected-access
+
+    def test_correlation_id_parsed_once(self):
+        lro = self._lro(poller_done_interval_ms=1)
+        poller = _FakePoller(3, _FakeResponse(content=b'{"properties": {"correlationId": "abc"}}'))
+        with mock.patch('azure.cli.core.commands._get_correlation_id', return_value='abc') as get_id, \
+                mock.patch('time.sleep', side_effect=poller.add_tick):
+            self.assertEqual(lro(poller), 'done')
+        self.assertEqual(get_id.call_count, 1)
+        self.assertEqual(len(poller.waits), 3)
+
+    def test_progress_uses_incremental_cursor(self):
+        lro = self._lro()
+        event_time = datetime.datetime(2017, 9, 1, 10, 30, 0)
+        event = mock.MagicMock(event_timestamp=event_time, resource_id='/a/b/res')
+        client = mock.MagicMock()
+        client.activity_logs.list.return_value = [event]
+        with mock.patch('azure.cli.core.commands.client_factory.get_mgmt_service_client', return_value=client), \
+                mock.patch.dict('sys.modules', {'azure.monitor': mock.MagicMock()}):
+            lro._generate_template_progress('abc')  # pylint: disable=protected-access
+            lro._generate_template_progress('abc')  # pylint: disable=protected-access
+        second_filter = client.activity_logs.list.call_args_list[1][1]['filter']
+        self.assertEqual(second_filter, "eventTimestamp ge 2017-09-01T10:30:00Z and correlationId eq 'abc'")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,8 @@
 # --------------------------------------------------------------------------------------------
 import unittest
 
+import mock
+
 import azure.cli.core.commands.progress as progress
 
 
@@ -18,6 +20,21 @@ class MockOutstream(progress.ProgressViewBase):
         pass
 
 
+class MockStream(object):
+    def __init__(self, tty=False):
+        self.lines = []
+        self.tty = tty
+
+    def write(self, message):
+        self.lines.append(message)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return self.tty
+
+
 class TestProgress(unittest.TestCase):
     def test_progress_indicator_det_model(self):
         # test the progress reporter
@@ -92,6 +109,60 @@ class TestProgress(unittest.TestCase):
         controller.end()
         self.assertEqual(controller.active_progress.string['message'], 'Finished')
 
+    def test_progress_controller_refresh_interval(self):
+        controller = progress.ProgressHook()
+        view = mock.MagicMock(refresh_interval=10)
+        controller.init_progress(view)
+        controller.begin()
+        for value in range(1, 1001):
+            controller.add(message='Alive', value=value, total_val=1000)
+        # reports within the refresh interval are coalesced, begin and end are always shown
+        self.assertEqual(view.write.call_count, 1)
+        controller.end()
+        self.assertEqual(view.write.call_count, 2)
+        self.assertEqual(view.write.call_args[0][0], {'message': 'Finished', 'percent': 1})
+
+    @mock.patch('time.time')
+    def test_progress_controller_tasks(self, time_mock):
+        time_mock.return_value = 100
+        controller = progress.ProgressHook()
+        view = mock.MagicMock(refresh_interval=0)
+        controller.init_progress(view)
+        controller.begin(message='Uploading')
+        tasks = [controller.add_task('file{}'.format(i), total_val=1000) for i in range(4)]
+        time_mock.return_value = 110
+        tasks[0].end()
+        tasks[1].add(value=500)
+        tasks[2].add(increment=250)
+        tasks[2].add(increment=250)
+        tasks[3].end(failed=True)
+        report = view.write.call_args[0][0]
+        self.assertEqual(report['message'], 'Uploading')
+        self.assertEqual(report['percent'], 0.5)
+        self.assertEqual((report['tasks'], report['completed'], report['failed']), (4, 2, 1))
+        self.assertEqual(report['throughput'], 200)
+        self.assertEqual(report['eta'], 10)
+        self.assertEqual(progress._format_tasks(report),  # pylint: disable=protected-access
+                         '2/4 done, 1 failed, 200 bytes/s, ETA 10 seconds')
+        controller.end()
+        self.assertEqual(controller.tasks, [])
+
+    def test_progress_view_without_terminal(self):
+        outstream = MockStream()
+        view = progress.get_progress_view(True, outstream)
+        self.assertIsInstance(view, progress.SummaryStandardOut)
+        self.assertEqual(view.refresh_interval, progress.PROGRESS_SUMMARY_INTERVAL)
+        view.write({'message': 'Running'})
+        self.assertEqual(outstream.lines, [])
+        view.write({'message': 'Alive', 'percent': 0.25})
+        view.write({'message': 'Waiting', 'percent': None, 'tasks': 3, 'completed': 1})
+        self.assertEqual(outstream.lines, ['Alive: 25.0%\n', 'Waiting: 1/3 done\n'])
+
+        self.assertIsInstance(progress.get_progress_view(True, MockStream(tty=True)),
+                              progress.DeterminateStandardOut)
+        self.assertIsInstance(progress.get_progress_view(False, MockStream(tty=True)),
+                              progress.IndeterminateStandardOut)
+
 
 if __name__ == '__main__':
     unittest.main()
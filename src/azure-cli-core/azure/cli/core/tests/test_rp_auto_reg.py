@@ -33,3 +33,62 @@ class TestRPErrorPolish(unittest.TestCase):
                                b'to register subscriptions."}}')
         result = _check_rp_not_registered_err(ex)
         self.assertEqual(str(result), 'Microsoft.Sql')
+
+
+class TestRPRegistration(unittest.TestCase):
+    def setUp(self):
+        from azure.cli.core._session import SESSION
+        self.session_data = SESSION.data
+        SESSION.data = {}
+
+    def tearDown(self):
+        from azure.cli.core._session import SESSION
+        SESSION.data = self.session_data
+
+    @staticmethod
+    def _mock_client(states):
+        rcf = mock.MagicMock()
+        rcf.config.subscription_id = 'sub1'
+
+        def _get(namespace):
+            info = mock.MagicMock()
+            info.registration_state = states[namespace.lower()]
+            return info
+
+        def _register(namespace):
+            states[namespace.lower()] = 'Registered'
+
+        rcf.providers.get.side_effect = _get
+        rcf.providers.register.side_effect = _register
+        return rcf
+
+    @mock.patch('time.sleep', return_value=None)
+    @mock.patch('azure.cli.core.commands.client_factory.get_mgmt_service_client', autospec=True)
+    def test_register_providers(self, client_factory_mock, _):
+        from azure.cli.core.commands import register_providers, _is_rp_registration_cached
+        states = {'microsoft.sql': 'NotRegistered', 'microsoft.web': 'Registered'}
+        rcf = self._mock_client(states)
+        client_factory_mock.return_value = rcf
+
+        register_providers(['Microsoft.Sql', 'Microsoft.Web', 'microsoft.sql'])
+        rcf.providers.register.assert_called_once_with('Microsoft.Sql')
+        self.assertTrue(_is_rp_registration_cached('sub1', 'Microsoft.Sql'))
+        self.assertTrue(_is_rp_registration_cached('sub1', 'Microsoft.Web'))
+        self.assertFalse(_is_rp_registration_cached('sub2', 'Microsoft.Web'))
+
+        # cached providers are not looked up again
+        rcf.providers.get.reset_mock()
+        register_providers(['Microsoft.Sql', 'Microsoft.Web'])
+        rcf.providers.get.assert_not_called()
+
+    @mock.patch('azure.cli.core.commands.client_factory.get_mgmt_service_client', autospec=True)
+    def test_register_providers_cache_expires(self, client_factory_mock):
+        from azure.cli.core.commands import register_providers, RP_REGISTRATION_CACHE_TTL
+        from azure.cli.core._session import SESSION
+        rcf = self._mock_client({'microsoft.web': 'Registered'})
+        client_factory_mock.return_value = rcf
+        SESSION['registered_providers']['sub1'] = {'microsoft.web': time.time() - RP_REGISTRATION_CACHE_TTL - 1}
+
+        register_providers(['Microsoft.Web'])
+        rcf.providers.get.assert_called_once_with('Microsoft.Web')
+        rcf.providers.register.assert_not_called()
@@ -0,0 +1,98 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import unittest
+
+import mock
+
+from azure.cli.core.throttle import ThrottleGovernor, THROTTLE_PACING_DELAY, THROTTLE_RECOVERY_RESPONSES
+
+URL = 'https://management.azure.com/subscriptions/Sub1/resourceGroups/rg1?api-version=2017-05-10'
+
+
+def _response(status_code=200, method='GET', url=URL, headers=None):
+    response = mock.MagicMock(status_code=status_code, headers=headers or {})
+    response.request.url = url
+    response.request.method = method
+    return response
+
+
+@mock.patch('azure.cli.core.util.get_max_concurrency', lambda: 8)
+@mock.patch('time.sleep')
+class TestThrottleGovernor(unittest.TestCase):
+    def test_throttle_retry_after(self, sleep_mock):
+        governor = ThrottleGovernor()
+        governor.observe(_response(429, method='PUT', headers={'Retry-After': '5'}))
+        self.assertEqual(governor.throttled_requests, 1)
+        self.assertEqual(governor.concurrency_limit, 4)
+        sleep_mock.assert_not_called()
+
+        # writes to the subscription wait for the Retry-After, reads and other subscriptions do not
+        governor.observe(_response(method='GET'))
+        governor.observe(_response(method='PUT', url=URL.replace('Sub1', 'sub2')))
+        sleep_mock.assert_not_called()
+        governor.observe(_response(method='DELETE', url=URL.replace('Sub1', 'sub1')))
+        self.assertEqual(sleep_mock.call_count, 1)
+        self.assertTrue(4 < sleep_mock.call_args[0][0] <= 5)
+
+        governor.observe(_response(429, method='PUT', headers={'Retry-After': '1'}))
+        self.assertEqual(governor.concurrency_limit, 2)
+        metrics = governor.get_metrics()
+        self.assertEqual(metrics['throttledRequests'], 2)
+        self.assertEqual(metrics['concurrencyLimit'], 2)
+        self.assertGreater(metrics['waitSeconds'], 4)
+
+    def test_throttle_remaining_requests(self, sleep_mock):
+        governor = ThrottleGovernor()
+        governor.observe(_response(headers={'x-ms-ratelimit-remaining-subscription-reads': '11999'}))
+        self.assertIsNone(governor.concurrency_limit)
+
+        governor.observe(_response(headers={'x-ms-ratelimit-remaining-subscription-reads': '100'}))
+        governor.observe(_response(headers={'x-ms-ratelimit-remaining-subscription-reads': '99'}))
+        self.assertEqual(governor.concurrency_limit, 4)
+        self.assertEqual(sleep_mock.call_count, 2)
+        sleep_mock.assert_called_with(THROTTLE_PACING_DELAY)
+        self.assertEqual(governor.get_metrics()['remaining'], {'sub1/reads': 99})
+
+        # the limit is raised again once ARM reports enough remaining requests
+        for _ in range(THROTTLE_RECOVERY_RESPONSES):
+            governor.observe(_response(headers={'x-ms-ratelimit-remaining-subscription-reads': '11000'}))
+        self.assertEqual(governor.concurrency_limit, 5)
+        for _ in range(3 * THROTTLE_RECOVERY_RESPONSES):
+            governor.observe(_response())
+        self.assertIsNone(governor.concurrency_limit)
+        self.assertEqual(sleep_mock.call_count, 2)
+
+    def test_throttle_slot(self, _):
+        governor = ThrottleGovernor()
+        for _ in range(3):
+            governor.observe(_response(429))
+        self.assertEqual(governor.concurrency_limit, 1)
+
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def _task():
+            with governor.slot():
+                with lock:
+                    active.append(1)
+                    peak.append(len(active))
+                threading.Event().wait(0.01)
+                with lock:
+                    active.pop()
+
+        threads = [threading.Thread(target=_task) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(max(peak), 1)
+        self.assertEqual(len(peak), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
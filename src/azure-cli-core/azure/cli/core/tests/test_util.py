@@ -10,7 +10,7 @@ import tempfile
 
 from azure.cli.core.util import \
     (get_file_json, todict, to_snake_case, truncate_text, shell_safe_json_parse, b64_to_hex,
-     hash_string, random_string)
+     hash_string, random_string, LazyModule)
 
 
 class TestUtils(unittest.TestCase):
@@ -174,6 +174,22 @@ class TestUtils(unittest.TestCase):
         # Test force_lower
         _run_test(16, True)
 
+    def test_lazy_module(self):
+        import sys
+        sys.modules.pop('colorsys', None)
+        lazy = LazyModule('colorsys')
+        self.assertNotIn('colorsys', sys.modules)
+        lazy.VALUE = 42
+        self.assertIn('colorsys', sys.modules)
+        self.assertEqual(sys.modules['colorsys'].VALUE, 42)
+        self.assertEqual(lazy.VALUE, 42)
+        del lazy.VALUE
+        with self.assertRaises(AttributeError):
+            lazy.VALUE  # pylint: disable=pointless-statement
+
+        with self.assertRaises(ImportError):
+            LazyModule('azure.cli.core.tests.does_not_exist').anything  # pylint: disable=expression-not-assigned
+
 
 class TestBase64ToHex(unittest.TestCase):
 
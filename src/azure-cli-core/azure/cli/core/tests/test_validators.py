@@ -8,7 +8,14 @@ import unittest
 import os
 import tempfile
 
-from azure.cli.core.commands.validators import validate_file_or_dict
+import argparse
+import threading
+import time
+
+import six
+
+from azure.cli.core.commands.validators import validate_file_or_dict, run_validators
+from azure.cli.core.util import CLIError
 
 
 class TestValidators(unittest.TestCase):
@@ -38,6 +45,77 @@ class TestValidators(unittest.TestCase):
         res = validate_file_or_dict(data)
         self.assertEqual(res['~d'], '~/haha')
 
+    def test_run_validators_dependencies(self):
+        calls = []
+        lock = threading.Lock()
+        both_started = threading.Barrier(2, timeout=5) if hasattr(threading, 'Barrier') else None
+
+        def _record(name, wait=False):
+            def _validator(ns):
+                if wait and both_started:
+                    both_started.wait()  # only returns if the independent validators run concurrently
+                with lock:
+                    calls.append(name)
+                    setattr(ns, name, True)
+            return _validator
+
+        first, second = _record('first', wait=True), _record('second', wait=True)
+
+        def dependent(ns):
+            self.assertTrue(ns.first and ns.second)
+            calls.append('dependent')
+
+        ns = argparse.Namespace()
+        run_validators(ns, [(first, []), (second, []), (dependent, [first, second])])
+        self.assertEqual(sorted(calls[:2]), ['first', 'second'])
+        self.assertEqual(calls[2], 'dependent')
+
+    def test_run_validators_reports_first_error(self):
+        def fails_late(_):
+            time.sleep(0.2)
+            raise CLIError('first')
+
+        def fails_early(_):
+            raise CLIError('second')
+
+        skipped = []
+
+        def dependent(_):
+            skipped.append('dependent')
+
+        for _ in range(3):
+            with six.assertRaisesRegex(self, CLIError, 'first'):
+                run_validators(argparse.Namespace(), [(fails_late, []), (fails_early, []),
+                                                      (dependent, [fails_early])])
+        self.assertEqual(skipped, [])
+
+    def test_run_validators_prompts_on_calling_thread_last(self):
+        calls = []
+
+        def lookup(_):
+            time.sleep(0.1)
+            calls.append(('lookup', threading.current_thread()))
+
+        def prompt(_):
+            calls.append(('prompt', threading.current_thread()))
+
+        def after_prompt(_):
+            calls.append(('after_prompt', threading.current_thread()))
+
+        validators = [(prompt, []), (after_prompt, [prompt]), (lookup, [])]
+        run_validators(argparse.Namespace(), validators, interactive=[prompt])
+        self.assertEqual(calls[1:], [('prompt', threading.current_thread()),
+                                     ('after_prompt', threading.current_thread())])
+
+        def fails(_):
+            raise CLIError('invalid')
+
+        del calls[:]
+        with six.assertRaisesRegex(self, CLIError, 'invalid'):
+            run_validators(argparse.Namespace(), [(prompt, []), (fails, [])], interactive=[prompt])
+        # the user is not prompted when another validator fails
+        self.assertEqual(calls, [])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,160 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import azure.cli.core.azlogging as azlogging
+
+logger = azlogging.get_az_logger(__name__)
+
+RATELIMIT_REMAINING_HEADER = 'x-ms-ratelimit-remaining-subscription-{}'
+# Below these numbers of remaining requests fan-out concurrency is reduced and requests are paced
+RATELIMIT_LOW_WATERMARK = {'reads': 500, 'writes': 50}
+THROTTLE_DEFAULT_RETRY_AFTER = 10
+# Delay added after each request while the remaining requests are below the low watermark
+THROTTLE_PACING_DELAY = 0.5
+# Number of unthrottled responses after which the concurrency limit is raised by one
+THROTTLE_RECOVERY_RESPONSES = 10
+
+_SUBSCRIPTION_PATTERN = re.compile(r'/subscriptions/([^/?]+)', re.IGNORECASE)
+
+
+class _ThrottleState(object):  # pylint: disable=too-few-public-methods
+    def __init__(self):
+        self.remaining = None
+        self.blocked_until = 0
+        self.limit = None
+        self.successes = 0
+
+
+class ThrottleGovernor(object):
+    '''Process wide pacing of ARM requests, per subscription and kind of operation (reads/writes).
+
+    `observe` is a response hook of the management clients which tracks the remaining requests
+    ARM reports and the Retry-After of throttled requests. Requests to a subscription which is
+    throttled wait until it may be called again. Fan-out paths run each task in `slot()`, which
+    limits the number of concurrent tasks when ARM is throttling and raises the limit again as
+    requests succeed. Tasks which fan out themselves (a command invocation per --ids) take their slot
+    in a separate group, so that their requests are not kept waiting for the slots they hold.
+    '''
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._states = {}
+        self._active = {}
+        self.throttled_requests = 0
+        self.wait_seconds = 0.0
+
+    def _get_state(self, key):
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _ThrottleState()
+        return state
+
+    @property
+    def concurrency_limit(self):
+        '''The number of concurrent fan-out tasks allowed, None if not limited.'''
+        limits = [s.limit for s in self._states.values() if s.limit is not None]
+        return min(limits) if limits else None
+
+    def get_metrics(self):
+        with self._condition:
+            return {
+                'throttledRequests': self.throttled_requests,
+                'waitSeconds': round(self.wait_seconds, 3),
+                'concurrencyLimit': self.concurrency_limit,
+                'remaining': dict(('{}/{}'.format(*key), s.remaining) for key, s in self._states.items()
+                                  if s.remaining is not None)
+            }
+
+    def observe(self, response, *_, **__):
+        '''Response hook (requests signature) for the management clients.'''
+        request = getattr(response, 'request', None)
+        match = _SUBSCRIPTION_PATTERN.search(getattr(request, 'url', None) or '')
+        if not match:
+            return response
+        kind = 'reads' if request.method in ('GET', 'HEAD') else 'writes'
+        key = (match.group(1).lower(), kind)
+        now = time.time()
+        delay = 0
+        with self._condition:
+            state = self._get_state(key)
+            remaining = response.headers.get(RATELIMIT_REMAINING_HEADER.format(kind))
+            if remaining is not None:
+                try:
+                    state.remaining = int(remaining)
+                except ValueError:
+                    pass
+            low = state.remaining is not None and state.remaining < RATELIMIT_LOW_WATERMARK[kind]
+            if response.status_code == 429:
+                self.throttled_requests += 1
+                retry_after = _get_retry_after(response)
+                state.blocked_until = max(state.blocked_until, now + retry_after)
+                self._reduce_limit(state)
+                logger.warning("Azure Resource Manager is throttling %s for subscription '%s'. "
+                               "Slowing down for %s seconds.", kind, key[0], retry_after)
+            else:
+                if low:
+                    if state.limit is None:
+                        self._reduce_limit(state)
+                    delay = THROTTLE_PACING_DELAY
+                else:
+                    self._recover_limit(state)
+                delay = max(delay, state.blocked_until - now)
+            self._condition.notify_all()
+        if delay > 0:
+            logger.debug("Pacing %s for subscription '%s' by %.1f seconds (remaining: %s)",
+                         kind, key[0], delay, state.remaining)
+            time.sleep(delay)
+            with self._condition:
+                self.wait_seconds += delay
+        return response
+
+    def _reduce_limit(self, state):
+        from azure.cli.core.util import get_max_concurrency
+        current = state.limit or max(max(self._active.values() or [0]), get_max_concurrency())
+        state.limit = max(1, current // 2)
+        state.successes = 0
+
+    @staticmethod
+    def _recover_limit(state):
+        from azure.cli.core.util import get_max_concurrency
+        if state.limit is None:
+            return
+        state.successes += 1
+        if state.successes >= THROTTLE_RECOVERY_RESPONSES:
+            state.successes = 0
+            state.limit = state.limit + 1 if state.limit + 1 < get_max_concurrency() else None
+
+    @contextmanager
+    def slot(self, group='requests'):
+        '''Run a fan-out task once fewer tasks of its group than the concurrency limit are running.'''
+        start = None
+        with self._condition:
+            while self.concurrency_limit is not None and self._active.get(group, 0) >= self.concurrency_limit:
+                start = start or time.time()
+                self._condition.wait(1)
+            self._active[group] = self._active.get(group, 0) + 1
+            if start:
+                self.wait_seconds += time.time() - start
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active[group] -= 1
+                self._condition.notify_all()
+
+
+def _get_retry_after(response):
+    try:
+        return max(0, int(response.headers.get('Retry-After', THROTTLE_DEFAULT_RETRY_AFTER)))
+    except ValueError:
+        return THROTTLE_DEFAULT_RETRY_AFTER
+
+
+THROTTLE_GOVERNOR = ThrottleGovernor()
@@ -18,6 +18,8 @@ import azure.cli.core.azlogging as azlogging
 CLI_PACKAGE_NAME = 'azure-cli'
 COMPONENT_PREFIX = 'azure-cli-'
 
+DEFAULT_MAX_CONCURRENCY = 8
+
 logger = azlogging.get_az_logger(__name__)
 
 
@@ -29,6 +31,16 @@ class CLIError(Exception):
     pass
 
 
+class CLIPartialResultError(CLIError):
+    """Raised by a command which failed in part, e.g. some of the files of a batch.
+    The result of the command is output and the command exits with an error code.
+    """
+
+    def __init__(self, message, result):
+        super(CLIPartialResultError, self).__init__(message)
+        self.result = result
+
+
 def handle_exception(ex):
     # For error code, follow guidelines at https://docs.python.org/2/library/sys.html#sys.exit,
     from msrestazure.azure_exceptions import CloudError
@@ -247,3 +259,47 @@ def hash_string(value, length=16, force_lower=False):
 def in_cloud_console():
     import os
     return os.environ.get('ACC_CLOUD', None)
+
+
+def get_max_concurrency(fallback=DEFAULT_MAX_CONCURRENCY):
+    """ The maximum number of concurrent requests a command may issue for fan-out operations.
+    Configured with `az configure` (core.max_concurrency) or the AZURE_CORE_MAX_CONCURRENCY environment variable.
+    """
+    from azure.cli.core._config import az_config
+    try:
+        value = az_config.getint('core', 'max_concurrency', fallback=fallback)
+    except ValueError:
+        logger.warning("Invalid value for 'core.max_concurrency'. Using %s.", fallback)
+        value = fallback
+    return max(1, value)
+
+
+class LazyModule(object):
+    """ Stands in for a module which is imported the first time one of its attributes is used, to keep
+    modules only some commands need off the import path of every command:
+
+        _help = LazyModule('azure.cli.core._help')
+    """
+
+    def __init__(self, module_name):
+        self.__dict__['_lazy_module_name'] = module_name
+        self.__dict__['_lazy_module'] = None
+
+    def _load_module(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            from importlib import import_module
+            module = self.__dict__['_lazy_module'] = import_module(self.__dict__['_lazy_module_name'])
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self._load_module(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load_module(), name, value)
+
+    def __delattr__(self, name):
+        delattr(self._load_module(), name)
+
+    def __repr__(self):
+        return '<lazy module {!r}>'.format(self.__dict__['_lazy_module_name'])
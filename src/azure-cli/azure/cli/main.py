@@ -42,6 +42,11 @@ def main(args, output=sys.stdout, logging_stream=None):
             formatter = OutputProducer.get_formatter(APPLICATION.configuration.output_format)
             OutputProducer(formatter=formatter, file=output).out(cmd_result)
 
+        # Some of the invocations of a command with multiple --ids failed
+        if cmd_result and cmd_result.exit_code:
+            telemetry.set_failure()
+            return cmd_result.exit_code
+
     except Exception as ex:  # pylint: disable=broad-except
 
         # TODO: include additional details of the exception in telemetry
@@ -50,3 +55,13 @@ def main(args, output=sys.stdout, logging_stream=None):
 
         error_code = handle_exception(ex)
         return error_code
+
+    finally:
+        _log_throttle_metrics(logger)
+
+
+def _log_throttle_metrics(logger):
+    from azure.cli.core.throttle import THROTTLE_GOVERNOR
+    metrics = THROTTLE_GOVERNOR.get_metrics()
+    if metrics['throttledRequests'] or metrics['waitSeconds']:
+        logger.debug('ARM throttling: %s', metrics)
@@ -4,6 +4,7 @@
 # --------------------------------------------------------------------------------------------
 
 from azure.cli.core.commands import cli_command
+from azure.cli.core.extensions.query import QueryPushdown
 from azure.cli.core.profiles import supported_api_version, PROFILE_TYPE
 
 from azure.cli.command_modules.batch._command_type import cli_batch_data_plane_command
@@ -105,7 +106,8 @@ if not supported_api_version(PROFILE_TYPE, max_api='2017-03-09-profile'):
     cli_batch_data_plane_command('batch job show', data_path.format('job', 'JobOperations.get'), job_client_factory)
     cli_batch_data_plane_command('batch job set', data_path.format('job', 'JobOperations.patch'), job_client_factory, flatten=2)
     cli_batch_data_plane_command('batch job reset', data_path.format('job', 'JobOperations.update'), job_client_factory, flatten=2)
-    cli_command(__name__, 'batch job list', custom_path.format('list_job'), job_client_factory, table_transformer=job_list_table_format)
+    cli_command(__name__, 'batch job list', custom_path.format('list_job'), job_client_factory, table_transformer=job_list_table_format,
+                query_pushdown=QueryPushdown(filter_fields=['id', 'state', 'priority'], select=True))
     cli_batch_data_plane_command('batch job disable', data_path.format('job', 'JobOperations.disable'), job_client_factory)
     cli_batch_data_plane_command('batch job enable', data_path.format('job', 'JobOperations.enable'), job_client_factory)
     cli_batch_data_plane_command('batch job stop', data_path.format('job', 'JobOperations.terminate'), job_client_factory)
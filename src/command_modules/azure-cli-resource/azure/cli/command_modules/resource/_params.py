@@ -105,6 +105,8 @@ register_cli_argument('group deployment', 'mode', help='Incremental (only add re
 register_cli_argument('group deployment create', 'deployment_name', options_list=('--name', '-n'), required=False,
                       validator=process_deployment_create_namespace, help='The deployment name. Default to template file base name')
 register_cli_argument('group deployment', 'parameters', action='append', nargs='+', completer=FilesCompleter())
+register_cli_argument('group deployment', 'register_providers', action='store_true',
+                      help='Register the resource providers used by the template with the subscription (concurrently) before deploying.')
 
 register_cli_argument('group deployment operation show', 'operation_ids', nargs='+', help='A list of operation ids to show')
 
@@ -246,15 +246,32 @@ def export_group_as_template(
 
 def deploy_arm_template(resource_group_name,
                         template_file=None, template_uri=None, deployment_name=None,
-                        parameters=None, mode='incremental', no_wait=False):
+                        parameters=None, mode='incremental', no_wait=False, register_providers=False):
     return _deploy_arm_template_core(resource_group_name, template_file, template_uri,
-                                     deployment_name, parameters, mode, no_wait=no_wait)
+                                     deployment_name, parameters, mode, no_wait=no_wait,
+                                     register_providers=register_providers)
 
 
 def validate_arm_template(resource_group_name, template_file=None, template_uri=None,
-                          parameters=None, mode='incremental'):
+                          parameters=None, mode='incremental', register_providers=False):
     return _deploy_arm_template_core(resource_group_name, template_file, template_uri,
-                                     'deployment_dry_run', parameters, mode, validate_only=True)
+                                     'deployment_dry_run', parameters, mode, validate_only=True,
+                                     register_providers=register_providers)
+
+
+def _get_template_provider_namespaces(resources):
+    namespaces = []
+    for resource in resources or []:
+        resource_type = resource.get('type', '')
+        # nested deployments and other expressions can't be resolved up front
+        if '/' in resource_type and not resource_type.startswith('['):
+            namespace = resource_type.split('/')[0]
+            if namespace.lower() not in [n.lower() for n in namespaces]:
+                namespaces.append(namespace)
+        for namespace in _get_template_provider_namespaces(resource.get('resources')):
+            if namespace.lower() not in [n.lower() for n in namespaces]:
+                namespaces.append(namespace)
+    return namespaces
 
 
 def _process_parameters(template_param_defs, parameter_lists):
@@ -432,7 +449,7 @@ def _urlretrieve(url):
 def _deploy_arm_template_core(resource_group_name,  # pylint: disable=too-many-arguments
                               template_file=None, template_uri=None, deployment_name=None,
                               parameters=None, mode='incremental', validate_only=False,
-                              no_wait=False):
+                              no_wait=False, register_providers=False):
     DeploymentProperties, TemplateLink = get_sdk(ResourceType.MGMT_RESOURCE_RESOURCES,
                                                  'DeploymentProperties',
                                                  'TemplateLink',
@@ -458,6 +475,10 @@ def _deploy_arm_template_core(resource_group_name,  # pylint: disable=too-many-a
     properties = DeploymentProperties(template=template, template_link=template_link,
                                       parameters=parameters, mode=mode)
 
+    if register_providers:
+        from azure.cli.core.commands import register_providers as register_template_providers
+        register_template_providers(_get_template_provider_namespaces(template_obj['resources']))
+
     smc = get_mgmt_service_client(ResourceType.MGMT_RESOURCE_RESOURCES)
     if validate_only:
         return smc.deployments.validate(resource_group_name, deployment_name, properties, raw=no_wait)
@@ -1361,24 +1382,11 @@ class _ResourceUtils(object):  # pylint: disable=too-many-instance-attributes
 
     @staticmethod
     def resolve_api_version(rcf, resource_provider_namespace, parent_resource_path, resource_type):
-        provider = rcf.providers.get(resource_provider_namespace)
-
-        # If available, we will use parent resource's api-version
-        resource_type_str = (parent_resource_path.split('/')[0]
-                             if parent_resource_path else resource_type)
-
-        rt = [t for t in provider.resource_types
-              if t.resource_type.lower() == resource_type_str.lower()]
-        if not rt:
-            raise IncorrectUsageError('Resource type {} not found.'
-                                      .format(resource_type_str))
-        if len(rt) == 1 and rt[0].api_versions:
-            npv = [v for v in rt[0].api_versions if 'preview' not in v.lower()]
-            return npv[0] if npv else rt[0].api_versions[0]
-        else:
-            raise IncorrectUsageError(
-                'API version is required and could not be resolved for resource {}'
-                .format(resource_type))
+        from azure.cli.core.commands.arm import resolve_api_version
+        try:
+            return resolve_api_version(resource_provider_namespace, resource_type, parent_resource_path, rcf)
+        except CLIError as ex:
+            raise IncorrectUsageError(str(ex))
 
     @staticmethod
     def _resolve_api_version_by_id(rcf, resource_id):
@@ -18,7 +18,7 @@ except ImportError:
 from azure.cli.core.util import CLIError, get_file_json, shell_safe_json_parse
 from azure.cli.command_modules.resource.custom import \
     (_get_missing_parameters, _extract_lock_params, _process_parameters, _find_missing_parameters,
-     _prompt_for_parameters, _load_file_string_or_uri)
+     _prompt_for_parameters, _load_file_string_or_uri, _get_template_provider_namespaces)
 
 
 def _simulate_no_tty():
@@ -301,6 +301,18 @@ class TestCustom(unittest.TestCase):
         results = _prompt_for_parameters(dict(missing_parameters), fail_on_no_tty=False)
         self.assertTrue(str(list(results.keys())) in param_alpha_order)
 
+    def test_deployment_template_provider_namespaces(self):
+        resources = [
+            {'type': 'Microsoft.Storage/storageAccounts'},
+            {'type': 'Microsoft.Web/sites', 'resources': [
+                {'type': 'config'},
+                {'type': 'Microsoft.Insights/components'},
+                {'type': 'microsoft.storage/storageAccounts/blobServices'}]},
+            {'type': "[parameters('resourceType')]"}
+        ]
+        self.assertEqual(_get_template_provider_namespaces(resources),
+                         ['Microsoft.Storage', 'Microsoft.Web', 'Microsoft.Insights'])
+
 
 if __name__ == '__main__':
     unittest.main()
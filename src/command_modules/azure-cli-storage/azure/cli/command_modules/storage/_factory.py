@@ -31,7 +31,12 @@ def get_storage_data_service_client(service, name=None, key=None, connection_str
 
 def generic_data_service_factory(service, name=None, key=None, connection_string=None, sas_token=None):
     try:
-        return get_storage_data_service_client(service, name, key, connection_string, sas_token)
+        client = get_storage_data_service_client(service, name, key, connection_string, sas_token)
+        if name and key:
+            # the key may come from the account cache and have been renewed since
+            from azure.cli.command_modules.storage.account_cache import evict_rejected_key
+            client.response_callback = evict_rejected_key(name, key)
+        return client
     except ValueError as val_exception:
         _ERROR_STORAGE_MISSING_INFO = get_sdk(ResourceType.DATA_STORAGE, '_error#_ERROR_STORAGE_MISSING_INFO')
         message = str(val_exception)
@@ -34,6 +34,8 @@ helps['storage blob upload'] = """
     examples:
         - name: Upload to a blob.
           text: az storage blob upload -f /path/to/file -c MyContainer -n MyBlob
+        - name: Upload a large file to a block blob, tuning the block size and the number of connections to the link. --adaptive does not apply to VHD disk uploads, which go to page blobs in fixed 4 MiB page ranges.
+          text: az storage blob upload -f /path/to/archive.tar -c MyContainer -n archive.tar --adaptive
 """
 
 helps['storage file upload'] = """
@@ -239,6 +241,12 @@ helps['storage blob copy start-batch'] = """
         - name: --source-sas
           type: string
           short-summary: The shared access signature for the source storage account.
+        - name: --max-concurrency
+          type: integer
+          short-summary: The number of copies started or checked concurrently. Defaults to the core.max_concurrency setting.
+        - name: --wait
+          type: bool
+          short-summary: Wait until all the copies completed and report the status of each copy.
 """
 helps['storage container'] = """
     type: group
@@ -394,6 +402,9 @@ helps['storage file upload-batch'] = """
         - name: --max-connections
           type: integer
           short-summary: The maximum number of parallel connections to use. Default value is 1.
+        - name: --max-concurrency
+          type: integer
+          short-summary: The number of files uploaded concurrently. Defaults to the core.max_concurrency setting.
         - name: --validate-content
           type: bool
           short-summary: If set, calculates an MD5 hash for each range of the file for validation.
@@ -421,6 +432,9 @@ helps['storage file download-batch'] = """
         - name: --max-connections
           type: integer
           short-summary: The maximum number of parallel connections to use. Default value is 1.
+        - name: --max-concurrency
+          type: integer
+          short-summary: The number of files downloaded concurrently. Defaults to the core.max_concurrency setting.
         - name: --validate-content
           type: bool
           short-summary: If set, calculates an MD5 hash for each range of the file for validation.
@@ -464,6 +478,12 @@ helps['storage file copy start-batch'] = """
         - name: --source-sas
           type: string
           short-summary: The shared access signature for the source storage account.
+        - name: --max-concurrency
+          type: integer
+          short-summary: The number of copies started or checked concurrently. Defaults to the core.max_concurrency setting.
+        - name: --wait
+          type: bool
+          short-summary: Wait until all the copies completed and report the status of each copy.
 """
 
 helps['storage logging'] = """
@@ -421,6 +421,11 @@ for item in ['update', 'upload', 'upload-batch']:
     register_content_settings_argument('storage blob {}'.format(item), BlobContentSettings, item == 'update')
 
 with CommandContext('storage blob upload') as c:
+    c.reg_arg('adaptive', action='store_true',
+              help='For block blobs, choose the block size from the size of the file and tune the number of '
+                   'concurrent connections, starting from --max-connections, from the measured throughput. VHD '
+                   'disk uploads are out of scope: page blobs, the default for *.vhd files, are uploaded in '
+                   'fixed 4 MiB page ranges without tuning.')
     c.reg_arg('blob_type', help="Defaults to 'page' for *.vhd files, or 'block' otherwise.",
               options_list=('--type', '-t'), validator=validate_blob_type, **enum_choice_list(blob_types.keys()))
     c.reg_arg('maxsize_condition', help='The max length in bytes permitted for an append blob.')
@@ -456,6 +461,7 @@ register_cli_argument('storage blob download-batch', 'source', options_list=('--
                       validator=process_blob_download_batch_parameters)
 
 register_cli_argument('storage blob download-batch', 'source_container_name', ignore_type)
+register_cli_argument('storage blob download-batch', 'max_concurrency', type=int)
 
 # BLOB UPLOAD-BATCH PARAMETERS
 register_cli_argument('storage blob upload-batch', 'destination', options_list=('--destination', '-d'))
@@ -485,6 +491,9 @@ register_cli_argument('storage blob upload-batch', 'content_type', arg_group='Co
 register_cli_argument('storage blob upload-batch', 'content_cache_control', arg_group='Content Control')
 register_cli_argument('storage blob upload-batch', 'content_language', arg_group='Content Control')
 register_cli_argument('storage blob upload-batch', 'max_connections', type=int)
+register_cli_argument('storage blob upload-batch', 'max_concurrency', type=int)
+register_cli_argument('storage blob upload-batch', 'sync', arg_group='Sync')
+register_cli_argument('storage blob upload-batch', 'delete_extra', arg_group='Sync')
 
 # BLOB COPY-BATCH PARAMETERS
 
@@ -500,6 +509,8 @@ with CommandContext('storage blob copy start-batch') as c:
         group.reg_arg('source_share')
         group.reg_arg('prefix', validator=process_blob_copy_batch_namespace)
 
+    c.reg_arg('max_concurrency', type=int)
+
 # FILE UPLOAD-BATCH PARAMETERS
 with CommandContext('storage file upload-batch') as c:
     c.reg_arg('source', options_list=('--source', '-s'), validator=process_file_upload_batch_parameters)
@@ -507,6 +518,7 @@ with CommandContext('storage file upload-batch') as c:
 
     with c.arg_group('Download Control') as group:
         group.reg_arg('max_connections')
+        group.reg_arg('max_concurrency', type=int)
 
         with VersionConstraint(ResourceType.DATA_STORAGE, min_api='2016-05-31') as vc:
             vc.register_cli_argument('storage file upload-batch', 'validate_content')
@@ -521,6 +533,7 @@ with CommandContext('storage file download-batch') as c:
 
     with c.arg_group('Download Control') as group:
         group.reg_arg('max_connections')
+        group.reg_arg('max_concurrency', type=int)
 
         with VersionConstraint(ResourceType.DATA_STORAGE, min_api='2016-05-31') as vc:
             vc.register_cli_argument('storage file download-batch', 'validate_content')
@@ -537,6 +550,8 @@ with CommandContext('storage file copy start-batch') as c:
         group.reg_arg('source_container')
         group.reg_arg('source_share')
 
+    c.reg_arg('max_concurrency', type=int)
+
 for item in ['file', 'blob']:
     register_cli_argument('storage {} url'.format(item), 'protocol', help='Protocol to use.', default='https', **enum_choice_list(['http', 'https']))
     register_source_uri_arguments('storage {} copy start'.format(item))
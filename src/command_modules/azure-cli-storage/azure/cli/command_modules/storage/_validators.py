@@ -24,11 +24,18 @@ storage_account_key_options = {'primary': 'key1', 'secondary': 'key2'}
 # Utilities
 
 def _query_account_key(account_name):
+    """ Query the key of the storage account. The resource group of the account is found from the index of the
+    storage accounts of the subscription, which is rebuilt from a listing of the accounts when it misses. """
+    from msrestazure.azure_exceptions import CloudError
+    from azure.cli.command_modules.storage.account_cache import ACCOUNT_CACHE
     scf = get_mgmt_service_client(ResourceType.MGMT_STORAGE)
-    acc = next((x for x in scf.storage_accounts.list() if x.name == account_name), None)
-    if acc:
-        from azure.cli.core.commands.arm import parse_resource_id
-        rg = parse_resource_id(acc.id)['resource_group']
+    subscription_id = scf.config.subscription_id
+
+    def _list_keys(refresh=False):
+        acc = ACCOUNT_CACHE.get_account(subscription_id, account_name, scf.storage_accounts.list, refresh)
+        if not acc:
+            raise ValueError("Storage account '{}' not found.".format(account_name))
+        rg = acc['resource_group']
 
         (StorageAccountKeys, StorageAccountListKeysResult) = get_sdk(
             ResourceType.MGMT_STORAGE,
@@ -39,8 +46,17 @@ def _query_account_key(account_name):
             return scf.storage_accounts.list_keys(rg, account_name).key1
         elif StorageAccountListKeysResult:
             return scf.storage_accounts.list_keys(rg, account_name).keys[0].value  # pylint: disable=no-member
-    else:
-        raise ValueError("Storage account '{}' not found.".format(account_name))
+
+    def _fetch_key():
+        try:
+            return _list_keys()
+        except CloudError as ex:
+            if ex.status_code != 404:
+                raise
+            # the account was deleted or moved to another resource group since it was indexed
+            return _list_keys(refresh=True)
+
+    return ACCOUNT_CACHE.get_key(subscription_id, account_name, _fetch_key)
 
 
 def _create_short_lived_blob_sas(account_name, account_key, container, blob):
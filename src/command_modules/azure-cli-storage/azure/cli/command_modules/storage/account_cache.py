@@ -0,0 +1,192 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Cache of the storage accounts of the subscriptions and, when enabled, of their keys, so that a command given only an
+account name does not list every storage account of the subscription to find the key
+"""
+
+import json
+import os
+import threading
+import time
+
+from azure.cli.core.azlogging import get_az_logger
+
+logger = get_az_logger(__name__)
+
+ACCOUNT_INDEX_FILE_NAME = 'storage_accounts.json'
+ACCOUNT_KEY_CACHE_FILE_NAME = 'storage_account_keys.json'
+# The index of the accounts is rebuilt from a single listing when it is older than the TTL or an account is missing
+ACCOUNT_INDEX_TTL = 24 * 60 * 60
+# Keys are cached on disk only when storage.account_key_cache_ttl is set. They are always cached in memory.
+# A cached key the service rejects, e.g. renewed outside the CLI, is evicted for the next command to get the new key.
+ACCOUNT_KEY_CACHE_TTL = 0
+
+# Commands which change the storage accounts or their keys
+INVALIDATING_COMMANDS = ('storage account create', 'storage account delete', 'storage account keys renew')
+
+
+def _index_entry(account):
+    from azure.cli.core.commands.arm import parse_resource_id
+    endpoints = account.primary_endpoints
+    return {'resource_group': parse_resource_id(account.id)['resource_group'],
+            'endpoints': dict((service, getattr(endpoints, service, None))
+                              for service in ['blob', 'file', 'queue', 'table']) if endpoints else {}}
+
+
+class StorageAccountCache(object):
+    '''Index of the storage accounts of each subscription, the name of an account to its resource group and endpoints,
+    and cache of the account keys.
+
+    The files are written by replacing them with a temporary file. The key cache can be read by the user only.'''
+
+    def __init__(self, index_path=None, key_path=None, index_ttl=None, key_ttl=None):
+        self.index_path = index_path
+        self.key_path = key_path
+        self.index_ttl = index_ttl
+        self.key_ttl = key_ttl
+        self._lock = threading.RLock()
+        self._index = None
+        self._stored_keys = None
+        self._keys = {}
+
+    def _get_index_ttl(self):
+        if self.index_ttl is not None:
+            return self.index_ttl
+        from azure.cli.core._config import az_config
+        return az_config.getint('storage', 'account_index_ttl', fallback=ACCOUNT_INDEX_TTL)
+
+    def _get_key_ttl(self):
+        if self.key_ttl is not None:
+            return self.key_ttl
+        from azure.cli.core._config import az_config
+        return az_config.getint('storage', 'account_key_cache_ttl', fallback=ACCOUNT_KEY_CACHE_TTL)
+
+    @staticmethod
+    def _load(path):
+        if path:
+            try:
+                with open(path) as f:
+                    return json.load(f)
+            except (IOError, OSError, ValueError):
+                # a missing or corrupt cache is rebuilt
+                pass
+        return {}
+
+    @staticmethod
+    def _save(path, data, mode=0o666):
+        from azure.cli.command_modules.storage.util import mkdir_p, write_file_atomically
+        if not path:
+            return
+        try:
+            mkdir_p(os.path.dirname(path))
+            write_file_atomically(path, json.dumps(data), mode=mode)
+        except (IOError, OSError) as ex:
+            logger.debug('Unable to save the storage account cache %s: %s', path, ex)
+
+    def get_account(self, subscription_id, account_name, list_accounts, refresh=False):
+        '''The resource group and endpoints of the account, from the index of the subscription. The index is rebuilt
+        with `list_accounts` when it expired or the account is missing, or when `refresh` is set.
+
+        :returns: dict with the resource_group and endpoints of the account, None if there is no such account
+        '''
+        with self._lock:
+            if self._index is None:
+                self._index = self._load(self.index_path)
+            index = self._index.get(subscription_id)
+            if not refresh and index and time.time() - index['time'] <= self._get_index_ttl() and \
+                    account_name in index['accounts']:
+                return index['accounts'][account_name]
+
+        logger.debug("Storage account '%s' not in the index, listing the storage accounts", account_name)
+        accounts = dict((account.name, _index_entry(account)) for account in list_accounts())
+        with self._lock:
+            self._index[subscription_id] = {'time': time.time(), 'accounts': accounts}
+            self._save(self.index_path, self._index)
+        return accounts.get(account_name)
+
+    def get_key(self, subscription_id, account_name, fetch):
+        '''The key of the account, calling `fetch` to get it when it is not cached.'''
+        cache_key = '{}/{}'.format(subscription_id, account_name)
+        ttl = self._get_key_ttl()
+        with self._lock:
+            if cache_key in self._keys:
+                return self._keys[cache_key]
+            if ttl > 0:
+                if self._stored_keys is None:
+                    self._stored_keys = self._load(self.key_path)
+                entry = self._stored_keys.get(cache_key)
+                if entry and time.time() - entry['time'] <= ttl:
+                    self._keys[cache_key] = entry['key']
+                    return entry['key']
+
+        key = fetch()
+        with self._lock:
+            self._keys[cache_key] = key
+            if ttl > 0:
+                now = time.time()
+                self._stored_keys = dict((k, e) for k, e in self._stored_keys.items() if now - e['time'] <= ttl)
+                self._stored_keys[cache_key] = {'time': now, 'key': key}
+                # the keys are readable by the user only
+                self._save(self.key_path, self._stored_keys, mode=0o600)
+        return key
+
+    def evict_key(self, account_name, key):
+        '''Forget `key` as the key of the account, e.g. when the service rejected it because the key was renewed
+        elsewhere, so that the next command gets the current key.
+
+        :returns: whether the key was cached
+        '''
+        suffix = '/{}'.format(account_name)
+        with self._lock:
+            cached = [k for k, v in self._keys.items() if k.endswith(suffix) and v == key]
+            for cache_key in cached:
+                del self._keys[cache_key]
+            if self._stored_keys is None:
+                self._stored_keys = self._load(self.key_path)
+            stored = [k for k, e in self._stored_keys.items() if k.endswith(suffix) and e['key'] == key]
+            for cache_key in stored:
+                del self._stored_keys[cache_key]
+            if stored:
+                self._save(self.key_path, self._stored_keys, mode=0o600)
+        return bool(cached or stored)
+
+    def invalidate(self):
+        '''Forget the accounts and keys of all the subscriptions.'''
+        with self._lock:
+            self._index = {}
+            self._keys = {}
+            self._stored_keys = {}
+            for path in [self.index_path, self.key_path]:
+                if path and os.path.exists(path):
+                    os.remove(path)
+        logger.debug('Invalidated the storage account cache')
+
+
+def _get_cache_path(file_name):
+    from azure.cli.core._environment import get_config_dir
+    return os.path.join(get_config_dir(), file_name)
+
+
+ACCOUNT_CACHE = StorageAccountCache(_get_cache_path(ACCOUNT_INDEX_FILE_NAME),
+                                    _get_cache_path(ACCOUNT_KEY_CACHE_FILE_NAME))
+
+
+def evict_rejected_key(account_name, account_key):
+    '''Response callback of a data-plane client using the key of the account, which evicts the key from the cache
+    when the service rejects it.'''
+    def _on_response(response):
+        if response.status == 403 and response.headers.get('x-ms-error-code') == 'AuthenticationFailed' and \
+                ACCOUNT_CACHE.evict_key(account_name, account_key):
+            logger.warning("The key of storage account '%s' was rejected and is removed from the cache. If it was "
+                           "renewed, run the command again to use the current key.", account_name)
+    return _on_response
+
+
+def invalidate_account_cache(**_):
+    from azure.cli.core.application import APPLICATION
+    if APPLICATION.session.get('command') in INVALIDATING_COMMANDS:
+        ACCOUNT_CACHE.invalidate()
@@ -6,7 +6,6 @@
 from __future__ import print_function
 import os.path
 from collections import namedtuple
-from azure.common import AzureException
 
 from azure.cli.core.util import CLIError
 from azure.cli.core.azlogging import get_az_logger
@@ -15,19 +14,22 @@ from azure.cli.command_modules.storage.util import (create_blob_service_from_sto
                                                     create_file_share_from_storage_client,
                                                     create_short_lived_share_sas,
                                                     create_short_lived_container_sas,
-                                                    filter_none, collect_blobs, collect_files,
-                                                    mkdir_p, guess_content_type)
+                                                    collect_blobs, collect_files,
+                                                    guess_content_type)
+from azure.cli.command_modules.storage.transfer import (run_transfers, wait_for_started_copies,
+                                                        raise_for_failed_transfers, transfer_results,
+                                                        prepare_directories, download_to_path, upload_blob_blocks,
+                                                        TransferOperation)
 
 BlobCopyResult = namedtuple('BlobCopyResult', ['name', 'copy_id'])
 
 
 def storage_blob_copy_batch(client, source_client,
                             destination_container=None, source_container=None, source_share=None,
-                            source_sas=None, pattern=None, dryrun=False):
+                            source_sas=None, pattern=None, dryrun=False, max_concurrency=None, wait=False):
     """Copy a group of blob or files to a blob container."""
-    logger = None
+    logger = get_az_logger(__name__)
     if dryrun:
-        logger = get_az_logger(__name__)
         logger.warning('copy files or blobs to blob container')
         logger.warning('    account %s', client.account_name)
         logger.warning('  container %s', destination_container)
@@ -49,16 +51,14 @@ def storage_blob_copy_batch(client, source_client,
                                                           source_client.account_key,
                                                           source_container)
 
-        def action_blob_copy(blob_name):
-            if dryrun:
-                logger.warning('  - copy blob %s', blob_name)
-            else:
-                return _copy_blob_to_blob_container(client, source_client, destination_container,
-                                                    source_container, source_sas, blob_name)
+        operations = [TransferOperation(blob, blob, None)
+                      for blob in collect_blobs(source_client, source_container, pattern)]
 
-        return list(filter_none(action_blob_copy(blob) for blob in collect_blobs(source_client,
-                                                                                 source_container,
-                                                                                 pattern)))
+        def action_blob_copy(blob_name, _, _progress_callback):
+            return {'Blob': _copy_blob_to_blob_container(client, source_client, destination_container,
+                                                         source_container, source_sas, blob_name)}
+
+        copy_action = action_blob_copy
 
     elif source_share:
         # copy blob from file share
@@ -72,23 +72,37 @@ def storage_blob_copy_batch(client, source_client,
                                                       source_client.account_key,
                                                       source_share)
 
-        def action_file_copy(file_info):
+        operations = [TransferOperation(file_info, os.path.join(*file_info) if file_info[0] else file_info[1], None)
+                      for file_info in collect_files(source_client, source_share, pattern)]
+
+        def action_file_copy(file_info, _, _progress_callback):
             dir_name, file_name = file_info
-            if dryrun:
-                logger.warning('  - copy file %s', os.path.join(dir_name, file_name))
-            else:
-                return _copy_file_to_blob_container(client, source_client, destination_container,
-                                                    source_share, source_sas, dir_name, file_name)
+            return {'Blob': _copy_file_to_blob_container(client, source_client, destination_container,
+                                                         source_share, source_sas, dir_name, file_name)}
 
-        return list(filter_none(action_file_copy(file) for file in collect_files(source_client,
-                                                                                 source_share,
-                                                                                 pattern)))
+        copy_action = action_file_copy
     else:
         raise ValueError('Fail to find source. Neither blob container or file share is specified')
 
+    if dryrun:
+        for operation in operations:
+            logger.warning('  - copy %s %s', 'blob' if source_container else 'file', operation.destination)
+        return []
+
+    outcomes = run_transfers(operations, copy_action, max_concurrency=max_concurrency)
+    if wait:
+        outcomes = wait_for_started_copies(outcomes,
+                                           lambda o: client.get_blob_properties(destination_container,
+                                                                                o.destination).properties.copy,
+                                           max_concurrency=max_concurrency, progress_message='Copying')
+    return transfer_results(outcomes, 'copy',
+                            lambda operation: {'Blob': client.make_blob_url(destination_container,
+                                                                            operation.destination)})
+
 
 # pylint: disable=unused-argument
-def storage_blob_download_batch(client, source, destination, source_container_name, pattern=None, dryrun=False):
+def storage_blob_download_batch(client, source, destination, source_container_name, pattern=None, dryrun=False,
+                                max_concurrency=None, resume=False):
     """
     Download blobs in a container recursively
 
@@ -107,6 +121,13 @@ def storage_blob_download_batch(client, source, destination, source_container_na
     :param str pattern:
         The pattern is used for files globbing. The supported patterns are '*', '?', '[seq]',
         and '[!seq]'.
+
+    :param int max_concurrency:
+        The number of blobs downloaded concurrently. Defaults to the core.max_concurrency setting.
+
+    :param bool resume:
+        Continue the interrupted download of the container to the same folder. The blobs downloaded
+        before the interruption are skipped.
     """
     source_blobs = list(collect_blobs(client, source_container_name, pattern))
 
@@ -121,7 +142,31 @@ def storage_blob_download_batch(client, source, destination, source_container_na
             logger.warning('  - %s', b)
         return []
 
-    return list(_download_blob(client, source_container_name, destination, blob) for blob in source_blobs)
+    from azure.cli.command_modules.storage.journal import TransferJournal
+    journal = TransferJournal.for_batch('download', client.account_name, source_container_name, destination, resume)
+    if resume:
+        # a downloaded file is complete, as it is renamed into place once downloaded
+        remaining = [b for b in source_blobs
+                     if not journal.is_completed(b, _get_file_version(os.path.join(destination, b))[0])]
+        logger = get_az_logger(__name__)
+        logger.warning('Skipping %d blobs downloaded before the interruption.', len(source_blobs) - len(remaining))
+        source_blobs = remaining
+
+    prepare_directories(destination, source_blobs)
+
+    def _download(blob_name, destination_path, progress_callback):
+        _download_blob(client, source_container_name, destination_path, blob_name, progress_callback)
+        journal.record_completed(blob_name, os.path.getsize(destination_path))
+        return {'Blob': blob_name, 'File': destination_path}
+
+    outcomes = None
+    try:
+        outcomes = run_transfers([TransferOperation(b, os.path.join(destination, b), None) for b in source_blobs],
+                                 _download, max_concurrency=max_concurrency, progress_message='Downloading')
+    finally:
+        journal.close(completed=outcomes is not None and all(o.error is None for o in outcomes))
+    return transfer_results(outcomes, 'download',
+                            lambda operation: {'Blob': operation.source, 'File': operation.destination})
 
 
 def storage_blob_upload_batch(client, source, destination, pattern=None, source_files=None,  # pylint: disable=too-many-locals
@@ -129,7 +174,8 @@ def storage_blob_upload_batch(client, source, destination, pattern=None, source_
                               content_settings=None, metadata=None, validate_content=False,
                               maxsize_condition=None, max_connections=2, lease_id=None,
                               if_modified_since=None, if_unmodified_since=None, if_match=None,
-                              if_none_match=None, timeout=None, dryrun=False):
+                              if_none_match=None, timeout=None, dryrun=False, max_concurrency=None, sync=False,
+                              delete_extra=False, resume=False):
     """
     Upload files to storage container as blobs
 
@@ -157,42 +203,93 @@ def storage_blob_upload_batch(client, source, destination, pattern=None, source_
         operation only if the resource's ETag does not match the value specified. Specify the
         wildcard character (*) to perform the operation only if the resource does not exist,
         and fail the operation if it does exist.
-    """
 
-    def _append_blob(file_path, blob_name, blob_content_settings):
-        if not client.exists(destination_container_name, blob_name):
-            client.create_blob(
-                container_name=destination_container_name,
-                blob_name=blob_name,
-                content_settings=blob_content_settings,
-                metadata=metadata,
-                lease_id=lease_id,
-                if_modified_since=if_modified_since,
-                if_match=if_match,
-                if_none_match=if_none_match,
-                timeout=timeout)
-
-        append_blob_args = {
-            'container_name': destination_container_name,
-            'blob_name': blob_name,
-            'file_path': file_path,
-            'progress_callback': lambda c, t: None,
-            'maxsize_condition': maxsize_condition,
-            'lease_id': lease_id,
-            'timeout': timeout
-        }
+    :param int max_concurrency:
+        The number of files uploaded concurrently. Each file is uploaded with up to max_connections
+        connections. Defaults to the core.max_concurrency configuration.
 
-        if supported_api_version(ResourceType.DATA_STORAGE, min_api='2016-05-31'):
-            append_blob_args['validate_content'] = validate_content
+    :param bool sync:
+        Upload only the files which are new or changed compared to the blobs in the container. A file
+        is unchanged when its blob has the same size and either the same Content-MD5 or the file and
+        the blob did not change since the last sync.
 
-        return client.append_blob_from_path(**append_blob_args)
+    :param bool delete_extra:
+        With --sync, delete the blobs matching the pattern which have no local file.
+
+    :param bool resume:
+        Continue the interrupted upload of the same folder to the container. The files uploaded
+        before the interruption are skipped, large block blobs are continued from their uploaded
+        blocks.
+    """
 
-    def _upload_blob(file_path, blob_name, blob_content_settings):
+    if delete_extra and not sync:
+        raise CLIError('usage error: --delete-extra requires --sync')
+    if sync and blob_type not in ('block', 'page'):
+        raise CLIError('usage error: --sync is not supported for append blobs')
+
+    from azure.cli.command_modules.storage.journal import TransferJournal
+    journal = None if dryrun else TransferJournal.for_batch('upload', client.account_name,
+                                                            destination_container_name, source, resume)
+
+    # the length of each append blob before its file is appended, so that a retry appends only the rest of the file
+    append_offsets = {}
+
+    def _append_blob(file_path, blob_name, blob_content_settings, progress_callback=None):
+        from azure.common import AzureMissingResourceHttpError
+        size = os.path.getsize(file_path)
+        start = append_offsets.get(blob_name)
+        if start is None:
+            try:
+                start = client.get_blob_properties(destination_container_name, blob_name, lease_id=lease_id,
+                                                   timeout=timeout).properties.content_length
+            except AzureMissingResourceHttpError:
+                client.create_blob(
+                    container_name=destination_container_name,
+                    blob_name=blob_name,
+                    content_settings=blob_content_settings,
+                    metadata=metadata,
+                    lease_id=lease_id,
+                    if_modified_since=if_modified_since,
+                    if_match=if_match,
+                    if_none_match=if_none_match,
+                    timeout=timeout)
+                start = 0
+            append_offsets[blob_name] = start
+            appended = 0
+        else:
+            # a failed attempt may have appended some of the blocks of the file, continue after them
+            blob = client.get_blob_properties(destination_container_name, blob_name, lease_id=lease_id,
+                                              timeout=timeout)
+            appended = blob.properties.content_length - start
+            if appended >= size:
+                return blob.properties
+            logger.info('resuming the append of %s after %d bytes', file_path, appended)
+
+        progress_callback = progress_callback or (lambda c, t: None)
+        with open(file_path, 'rb') as stream:
+            stream.seek(appended)
+            append_blob_args = {
+                'container_name': destination_container_name,
+                'blob_name': blob_name,
+                'stream': stream,
+                'count': size - appended,
+                'progress_callback': lambda current, _: progress_callback(appended + current, size),
+                'maxsize_condition': maxsize_condition,
+                'lease_id': lease_id,
+                'timeout': timeout
+            }
+
+            if supported_api_version(ResourceType.DATA_STORAGE, min_api='2016-05-31'):
+                append_blob_args['validate_content'] = validate_content
+
+            return client.append_blob_from_stream(**append_blob_args)
+
+    def _upload_blob(file_path, blob_name, blob_content_settings, progress_callback=None):
         create_blob_args = {
             'container_name': destination_container_name,
             'blob_name': blob_name,
             'file_path': file_path,
-            'progress_callback': lambda c, t: None,
+            'progress_callback': progress_callback or (lambda c, t: None),
             'content_settings': blob_content_settings,
             'metadata': metadata,
             'max_connections': max_connections,
@@ -220,6 +317,19 @@ def storage_blob_upload_batch(client, source, destination, pattern=None, source_
     logger = get_az_logger(__name__)
     settings_class = get_sdk(ResourceType.DATA_STORAGE, 'blob.models#ContentSettings')
 
+    manifest = None
+    sync_files = {}
+    extra_blobs = []
+    if sync:
+        from azure.cli.command_modules.storage.sync import SyncManifest, plan_blob_sync
+        manifest = SyncManifest.for_destination(client.account_name, destination_container_name, source)
+        plan = plan_blob_sync(client, destination_container_name, source_files or [], pattern, manifest)
+        sync_files = dict((f.destination, f) for f in plan.changed)
+        source_files = [(f.source, f.destination) for f in plan.changed]
+        extra_blobs = plan.extras if delete_extra else []
+        logger.warning('%d files are unchanged, uploading %d new or changed files.', len(plan.unchanged),
+                       len(plan.changed))
+
     results = []
     if dryrun:
         logger.info('upload action: from %s to %s', source, destination)
@@ -227,27 +337,97 @@ def storage_blob_upload_batch(client, source, destination, pattern=None, source_
         logger.info('  container %s', destination_container_name)
         logger.info('       type %s', blob_type)
         logger.info('      total %d', len(source_files))
+        for name in extra_blobs:
+            logger.info('     delete %s', name)
         results = []
         for src, dst in source_files or []:
             results.append(_create_return_result(dst, guess_content_type(src, content_settings, settings_class)))
     else:
-        for src, dst in source_files or []:
-            logger.warning('uploading {}'.format(src))
+        versions = dict((dst, _get_file_version(src)) for src, dst in source_files or [])
+        if resume:
+            remaining = [(src, dst) for src, dst in source_files or [] if not journal.is_completed(dst, *versions[dst])]
+            logger.warning('Skipping %d files uploaded before the interruption.',
+                           len(source_files or []) - len(remaining))
+            source_files = remaining
+
+        def _upload(src, dst, progress_callback):
+            logger.info('uploading %s', src)
             guessed_content_settings = guess_content_type(src, content_settings, settings_class)
-            results.append(
-                _create_return_result(dst, guessed_content_settings, upload_action(src, dst, guessed_content_settings)))
+            sync_file = sync_files.get(dst)
+            version = versions[dst]
+            if upload_action is _upload_blob and blob_type == 'block' and \
+                    (version[0] or 0) > client.MAX_SINGLE_PUT_SIZE:
+                if sync_file:
+                    guessed_content_settings = _with_content_md5(sync_file, guessed_content_settings)
+                upload_result, guessed_content_settings = upload_blob_blocks(
+                    client, journal, destination_container_name, dst, src, guessed_content_settings, version,
+                    progress_callback=progress_callback, max_connections=max_connections,
+                    compute_md5=bool(sync_file) and not guessed_content_settings.content_md5,
+                    validate_content=validate_content, metadata=metadata, lease_id=lease_id,
+                    if_modified_since=if_modified_since, if_unmodified_since=if_unmodified_since,
+                    if_match=if_match, if_none_match=if_none_match, timeout=timeout)
+            else:
+                if sync_file:
+                    guessed_content_settings = _with_content_md5(sync_file, guessed_content_settings,
+                                                                 getattr(client, 'MAX_SINGLE_PUT_SIZE', 0))
+                upload_result = upload_action(src, dst, guessed_content_settings, progress_callback)
+            journal.record_completed(dst, *version)
+            if sync_file:
+                manifest.record(sync_file._replace(md5=guessed_content_settings.content_md5), upload_result.etag)
+            return _create_return_result(dst, guessed_content_settings, upload_result)
+
+        def _delete(name, _, progress_callback):
+            logger.info('deleting %s', name)
+            client.delete_blob(destination_container_name, name, lease_id=lease_id, timeout=timeout)
+            manifest.remove(name)
+
+        outcomes = deletions = None
+        try:
+            outcomes = run_transfers([TransferOperation(src, dst, versions[dst][0]) for src, dst in source_files or []],
+                                     _upload, max_concurrency=max_concurrency, progress_message='Uploading')
+            deletions = run_transfers([TransferOperation(name, None, None) for name in extra_blobs], _delete,
+                                      max_concurrency=max_concurrency)
+        finally:
+            journal.close(completed=deletions is not None and all(o.error is None for o in outcomes))
+            if manifest:
+                manifest.save()
+        if deletions:
+            logger.warning('Deleted %d blobs which have no local file.',
+                           len([o for o in deletions if o.error is None]))
+        results = transfer_results(outcomes, 'upload', lambda operation: _create_return_result(
+            operation.destination, guess_content_type(operation.source, content_settings, settings_class)))
+        raise_for_failed_transfers(deletions, 'delete', results)
 
     return results
 
 
-def _download_blob(blob_service, container, destination_folder, blob_name):
-    # TODO: try catch IO exception
-    destination_path = os.path.join(destination_folder, blob_name)
-    destination_folder = os.path.dirname(destination_path)
-    if not os.path.exists(destination_folder):
-        mkdir_p(destination_folder)
+def _with_content_md5(sync_file, content_settings, max_single_put_size=None):
+    # the service computes the Content-MD5 of the blobs uploaded in a single request only. Set it for the larger
+    # blobs so that the next sync can compare their content without the manifest. The MD5 of the block blobs
+    # uploaded block by block is computed while they are uploaded instead.
+    if sync_file.md5 is None and max_single_put_size is not None and sync_file.size > max_single_put_size:
+        from azure.cli.command_modules.storage.sync import compute_file_md5
+        sync_file = sync_file._replace(md5=compute_file_md5(sync_file.source))
+    if sync_file.md5 is None or content_settings.content_md5:
+        return content_settings
+    import copy
+    content_settings = copy.copy(content_settings)
+    content_settings.content_md5 = sync_file.md5
+    return content_settings
 
-    blob = blob_service.get_blob_to_path(container, blob_name, destination_path)
+
+def _get_file_version(path):
+    """ The size and modification time of the file, which identify the version of the file. """
+    try:
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime
+    except OSError:
+        return None, None
+
+
+def _download_blob(blob_service, container, destination_path, blob_name, progress_callback=None):
+    blob = download_to_path(destination_path, lambda path: blob_service.get_blob_to_path(
+        container, blob_name, path, progress_callback=progress_callback))
     return blob.name
 
 
@@ -256,12 +436,9 @@ def _copy_blob_to_blob_container(blob_service, source_blob_service, destination_
     source_blob_url = source_blob_service.make_blob_url(source_container, source_blob_name,
                                                         sas_token=source_sas)
 
-    try:
-        blob_service.copy_blob(destination_container, source_blob_name, source_blob_url)
-        return blob_service.make_blob_url(destination_container, source_blob_name)
-    except AzureException:
-        error_template = 'Failed to copy blob {} to container {}.'
-        raise CLIError(error_template.format(source_blob_name, destination_container))
+    # the errors of the service are raised as they are, so that the transient ones are retried
+    blob_service.copy_blob(destination_container, source_blob_name, source_blob_url)
+    return blob_service.make_blob_url(destination_container, source_blob_name)
 
 
 def _copy_file_to_blob_container(blob_service, source_file_service, destination_container,
@@ -273,9 +450,5 @@ def _copy_file_to_blob_container(blob_service, source_file_service, destination_
     blob_name = os.path.join(source_file_dir, source_file_name) \
         if source_file_dir else source_file_name
 
-    try:
-        blob_service.copy_blob(destination_container, blob_name=blob_name, copy_source=file_url)
-        return blob_service.make_blob_url(destination_container, blob_name)
-    except AzureException as ex:
-        error_template = 'Failed to copy file {} to container {}. {}'
-        raise CLIError(error_template.format(source_file_name, destination_container, ex))
+    blob_service.copy_blob(destination_container, blob_name=blob_name, copy_source=file_url)
+    return blob_service.make_blob_url(destination_container, blob_name)
@@ -24,6 +24,8 @@ from azure.cli.command_modules.storage._transformers import \
      transform_logging_list_output, transform_metrics_list_output,
      transform_url, transform_storage_list_output, transform_container_permission_output,
      create_boolean_result_output_transformer)
+from azure.cli.command_modules.storage.account_cache import invalidate_account_cache
+from azure.cli.core.application import APPLICATION
 from azure.cli.core.commands import cli_command, VersionConstraint
 from azure.cli.core.commands.arm import cli_generic_update_command
 from azure.cli.core.util import empty_on_404
@@ -49,6 +51,7 @@ def _dont_fail_not_exist(ex):
 
 
 # storage account commands
+APPLICATION.register(APPLICATION.TRANSFORM_RESULT, invalidate_account_cache)
 factory = lambda kwargs: storage_client_factory().storage_accounts  # noqa: E731 lambda vs def
 cli_command(__name__, 'storage account check-name', mgmt_path + 'check_name_availability', factory)
 cli_command(__name__, 'storage account delete', mgmt_path + 'delete', factory, confirmation=True)
@@ -215,7 +215,8 @@ def show_storage_account_connection_string(
 @transfer_doc(BlockBlobService.create_blob_from_path)
 def upload_blob(client, container_name, blob_name, file_path, blob_type=None, content_settings=None, metadata=None,
                 validate_content=False, maxsize_condition=None, max_connections=2, lease_id=None, tier=None,
-                if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+                if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None,
+                adaptive=False):
     """Upload a blob to a container."""
 
     settings_class = get_sdk(ResourceType.DATA_STORAGE, 'blob.models#ContentSettings')
@@ -281,6 +282,47 @@ def upload_blob(client, container_name, blob_name, file_path, blob_type=None, co
 
         return client.create_blob_from_path(**create_blob_args)
 
+    def upload_block_blob_adaptively():
+        import os
+        from azure.cli.core.azlogging import get_az_logger
+        from azure.cli.command_modules.storage.transfer import upload_blocks_adaptively
+
+        if os.stat(file_path).st_size <= client.MAX_SINGLE_PUT_SIZE:
+            return upload_block_blob()
+
+        put_block_args = {'lease_id': lease_id, 'timeout': timeout}
+        if supported_api_version(ResourceType.DATA_STORAGE, min_api='2016-05-31'):
+            put_block_args['validate_content'] = validate_content
+
+        def _put_block(data, block_id):
+            client.put_block(container_name, blob_name, data, block_id, **put_block_args)
+
+        # with --validate-content, the Content-MD5 of the blob is computed while its blocks are uploaded
+        compute_md5 = validate_content and not content_settings.content_md5
+        upload = upload_blocks_adaptively(file_path, _put_block, initial_concurrency=max_connections,
+                                          progress_callback=_update_progress, compute_md5=compute_md5)
+        blob_content_settings = content_settings
+        if compute_md5:
+            import copy
+            blob_content_settings = copy.copy(content_settings)
+            blob_content_settings.content_md5 = upload.content_md5
+        BlobBlock = get_sdk(ResourceType.DATA_STORAGE, 'blob.models#BlobBlock')
+        result = client.put_block_list(container_name, blob_name, [BlobBlock(id=b) for b in upload.block_ids],
+                                       content_settings=blob_content_settings, metadata=metadata, lease_id=lease_id,
+                                       if_modified_since=if_modified_since, if_unmodified_since=if_unmodified_since,
+                                       if_match=if_match, if_none_match=if_none_match, timeout=timeout)
+        get_az_logger(__name__).warning(
+            'Uploaded %d blocks of %d MiB with up to %d concurrent blocks (%d at the end, %d retried) in %.1f seconds, '
+            '%.1f MB/s', len(upload.block_ids), upload.block_size // (1024 * 1024), upload.peak_concurrency,
+            upload.concurrency, upload.retries, upload.seconds, upload.size / max(upload.seconds, 1e-6) / 1e6)
+        return result
+
+    if adaptive:
+        if blob_type != 'block':
+            raise CLIError('--adaptive is only supported for block blobs, not for VHD disk uploads. *.vhd files are '
+                           'uploaded as page blobs unless --type block is given.')
+        return upload_block_blob_adaptively()
+
     type_func = {
         'append': upload_append_blob,
         'block': upload_block_blob,
@@ -10,16 +10,18 @@ Commands for storage file share operations
 import os.path
 from azure.cli.core.azlogging import get_az_logger
 from azure.cli.core.util import CLIError
-from azure.common import AzureException, AzureHttpError
+from azure.common import AzureHttpError
 from azure.cli.core.profiles import supported_api_version, ResourceType, get_sdk
-from azure.cli.command_modules.storage.util import (filter_none, collect_blobs, collect_files,
+from azure.cli.command_modules.storage.util import (collect_blobs, collect_files,
                                                     create_blob_service_from_storage_client,
                                                     create_short_lived_container_sas,
                                                     create_short_lived_share_sas, guess_content_type)
+from azure.cli.command_modules.storage.transfer import (run_transfers, wait_for_started_copies, transfer_results,
+                                                        prepare_directories, download_to_path, TransferOperation)
 
 
 def storage_file_upload_batch(client, destination, source, pattern=None, dryrun=False, validate_content=False,
-                              content_settings=None, max_connections=1, metadata=None):
+                              content_settings=None, max_connections=1, metadata=None, max_concurrency=None):
     """ Upload local files to Azure Storage File Share in batch """
 
     from .util import glob_files_locally
@@ -27,22 +29,25 @@ def storage_file_upload_batch(client, destination, source, pattern=None, dryrun=
     logger = get_az_logger(__name__)
     settings_class = get_sdk(ResourceType.DATA_STORAGE, 'file.models#ContentSettings')
 
+    def _create_return_result(src, dst):
+        return {'File': client.make_file_url(destination, os.path.dirname(dst), os.path.basename(dst)),
+                'Type': guess_content_type(src, content_settings, settings_class).content_type}
+
     if dryrun:
         logger.info('upload files to file share')
         logger.info('    account %s', client.account_name)
         logger.info('      share %s', destination)
         logger.info('      total %d', len(source_files or []))
-        return [{'File': client.make_file_url(destination, os.path.dirname(src), os.path.basename(dst)),
-                 'Type': guess_content_type(src, content_settings, settings_class).content_type}
-                for src, dst in source_files]
+        return [_create_return_result(src, dst) for src, dst in source_files]
+
+    # create the directory tree once, then upload the files concurrently
+    _make_directories_in_files_share(client, destination, set(os.path.dirname(dst) for _, dst in source_files),
+                                     max_concurrency=max_concurrency)
 
-    # TODO: Performance improvement
-    # 1. Upload files in parallel
-    def _upload_action(src, dst):
+    def _upload_action(src, dst, progress_callback):
         dir_name = os.path.dirname(dst)
         file_name = os.path.basename(dst)
 
-        _make_directory_in_files_share(client, destination, dir_name)
         create_file_args = {
             'share_name': destination,
             'directory_name': dir_name,
@@ -51,28 +56,32 @@ def storage_file_upload_batch(client, destination, source, pattern=None, dryrun=
             'content_settings': guess_content_type(src, content_settings, settings_class),
             'metadata': metadata,
             'max_connections': max_connections,
+            'progress_callback': progress_callback
         }
 
         if supported_api_version(ResourceType.DATA_STORAGE, min_api='2016-05-31'):
             create_file_args['validate_content'] = validate_content
 
-        logger.warning('uploading %s', src)
+        logger.info('uploading %s', src)
         client.create_file_from_path(**create_file_args)
 
-        return client.make_file_url(destination, dir_name, file_name)
+        return _create_return_result(src, dst)
 
-    return list(_upload_action(src, dst) for src, dst in source_files)
+    outcomes = run_transfers([TransferOperation(src, dst, _get_file_size(src)) for src, dst in source_files],
+                             _upload_action, max_concurrency=max_concurrency, progress_message='Uploading')
+    return transfer_results(outcomes, 'upload', lambda operation: _create_return_result(operation.source,
+                                                                                        operation.destination))
 
 
 def storage_file_download_batch(client, source, destination, pattern=None, dryrun=False,
-                                validate_content=False, max_connections=1):
+                                validate_content=False, max_connections=1, max_concurrency=None):
     """
     Download files from file share to local directory in batch
     """
 
-    from .util import glob_files_remotely, mkdir_p
+    from .util import glob_files_remotely
 
-    source_files = glob_files_remotely(client, source, pattern)
+    source_files = glob_files_remotely(client, source, pattern, max_concurrency)
 
     if dryrun:
         source_files_list = list(source_files)
@@ -90,37 +99,44 @@ def storage_file_download_batch(client, source, destination, pattern=None, dryru
 
         return []
 
-    def _download_action(pair):
-        destination_dir = os.path.join(destination, pair[0])
-        mkdir_p(destination_dir)
+    source_files = list(source_files)
+    prepare_directories(destination, [os.path.join(*pair) for pair in source_files])
+
+    def _create_return_result(pair, destination_path):
+        return {'File': client.make_file_url(source, *pair), 'Path': destination_path}
 
+    def _download_action(pair, destination_path, progress_callback):
         get_file_args = {
             'share_name': source,
             'directory_name': pair[0],
             'file_name': pair[1],
-            'file_path': os.path.join(destination, *pair),
+            'progress_callback': progress_callback,
             'max_connections': max_connections
         }
 
         if supported_api_version(ResourceType.DATA_STORAGE, min_api='2016-05-31'):
             get_file_args['validate_content'] = validate_content
 
-        client.get_file_to_path(**get_file_args)
-        return client.make_file_url(source, *pair)
+        download_to_path(destination_path, lambda path: client.get_file_to_path(file_path=path, **get_file_args))
+        return _create_return_result(pair, destination_path)
 
-    return list(_download_action(f) for f in source_files)
+    outcomes = run_transfers([TransferOperation(pair, os.path.join(destination, *pair), None)
+                              for pair in source_files],
+                             _download_action, max_concurrency=max_concurrency, progress_message='Downloading')
+    return transfer_results(outcomes, 'download',
+                            lambda operation: _create_return_result(operation.source, operation.destination))
 
 
 def storage_file_copy_batch(client, source_client,
                             destination_share=None, destination_path=None,
                             source_container=None, source_share=None, source_sas=None,
-                            pattern=None, dryrun=False, metadata=None, timeout=None):
+                            pattern=None, dryrun=False, metadata=None, timeout=None, max_concurrency=None,
+                            wait=False):
     """
     Copy a group of files asynchronously
     """
-    logger = None
+    logger = get_az_logger(__name__)
     if dryrun:
-        logger = get_az_logger(__name__)
         logger.warning('copy files or blobs to file share')
         logger.warning('    account %s', client.account_name)
         logger.warning('      share %s', destination_share)
@@ -147,17 +163,16 @@ def storage_file_copy_batch(client, source_client,
                                                           source_client.account_key,
                                                           source_container)
 
-        def action_blob_copy(blob_name):
-            if dryrun:
-                logger.warning('  - copy blob %s', blob_name)
-            else:
-                return _create_file_and_directory_from_blob(
-                    client, source_client, destination_share, source_container, source_sas,
-                    blob_name, destination_dir=destination_path, metadata=metadata, timeout=timeout,
-                    existing_dirs=existing_dirs)
+        operations = [TransferOperation(blob, _get_copy_destination(destination_path, blob), None)
+                      for blob in collect_blobs(source_client, source_container, pattern)]
 
-        return list(filter_none(action_blob_copy(blob) for blob in
-                                collect_blobs(source_client, source_container, pattern)))
+        def action_blob_copy(blob_name, _, _progress_callback):
+            return {'File': _create_file_and_directory_from_blob(
+                client, source_client, destination_share, source_container, source_sas,
+                blob_name, destination_dir=destination_path, metadata=metadata, timeout=timeout,
+                existing_dirs=existing_dirs)}
+
+        copy_action = action_blob_copy
 
     elif source_share:
         # copy files from share to share
@@ -177,22 +192,54 @@ def storage_file_copy_batch(client, source_client,
                                                       source_client.account_key,
                                                       source_share)
 
-        def action_file_copy(file_info):
+        operations = [TransferOperation(file_info, _get_copy_destination(destination_path, *file_info), None)
+                      for file_info in collect_files(source_client, source_share, pattern)]
+
+        def action_file_copy(file_info, _, _progress_callback):
             dir_name, file_name = file_info
-            if dryrun:
-                logger.warning('  - copy file %s', os.path.join(dir_name, file_name))
-            else:
-                return _create_file_and_directory_from_file(
-                    client, source_client, destination_share, source_share, source_sas, dir_name,
-                    file_name, destination_dir=destination_path, metadata=metadata,
-                    timeout=timeout, existing_dirs=existing_dirs)
-
-        return list(filter_none(action_file_copy(file) for file in
-                                collect_files(source_client, source_share, pattern)))
+            return {'File': _create_file_and_directory_from_file(
+                client, source_client, destination_share, source_share, source_sas, dir_name,
+                file_name, destination_dir=destination_path, metadata=metadata,
+                timeout=timeout, existing_dirs=existing_dirs)}
+
+        copy_action = action_file_copy
     else:
         # won't happen, the validator should ensure either source_container or source_share is set
         raise ValueError('Fail to find source. Neither blob container or file share is specified.')
 
+    if dryrun:
+        for operation in operations:
+            logger.warning('  - copy %s %s', 'blob' if source_container else 'file',
+                           operation.source if source_container else os.path.join(*operation.source))
+        return []
+
+    # create the directory tree once, the copies then find the directories in the cache
+    _make_directories_in_files_share(client, destination_share,
+                                     set(os.path.dirname(o.destination) for o in operations),
+                                     existing_dirs=existing_dirs, max_concurrency=max_concurrency)
+    outcomes = run_transfers(operations, copy_action, max_concurrency=max_concurrency)
+    if wait:
+        def _get_copy(operation):
+            dir_name, file_name = os.path.split(operation.destination)
+            return client.get_file_properties(destination_share, dir_name or None, file_name,
+                                              timeout=timeout).properties.copy
+
+        outcomes = wait_for_started_copies(outcomes, _get_copy, max_concurrency=max_concurrency,
+                                           progress_message='Copying')
+    return transfer_results(outcomes, 'copy', lambda operation: {'File': client.make_file_url(
+        destination_share, os.path.dirname(operation.destination) or None, os.path.basename(operation.destination))})
+
+
+def _get_file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+def _get_copy_destination(destination_dir, *path):
+    return os.path.join(destination_dir, *path) if destination_dir else os.path.join(*path)
+
 
 def _create_file_and_directory_from_blob(file_service, blob_service, share, container, sas,
                                          blob_name,
@@ -202,18 +249,14 @@ def _create_file_and_directory_from_blob(file_service, blob_service, share, cont
     Copy a blob to file share and create the directory if needed.
     """
     blob_url = blob_service.make_blob_url(container, blob_name, sas_token=sas)
-    full_path = os.path.join(destination_dir, blob_name) if destination_dir else blob_name
+    full_path = _get_copy_destination(destination_dir, blob_name)
     file_name = os.path.basename(full_path)
     dir_name = os.path.dirname(full_path)
     _make_directory_in_files_share(file_service, share, dir_name, existing_dirs)
 
-    try:
-        file_service.copy_file(share, dir_name, file_name, blob_url, metadata, timeout)
-        return file_service.make_file_url(share, dir_name, file_name)
-    except AzureException:
-        error_template = 'Failed to copy blob {} to file share {}. Please check if you have ' + \
-                         'permission to read source or set a correct sas token.'
-        raise CLIError(error_template.format(blob_name, share))
+    # the errors of the service are raised as they are, so that the transient ones are retried
+    file_service.copy_file(share, dir_name, file_name, blob_url, metadata, timeout)
+    return file_service.make_file_url(share, dir_name, file_name)
 
 
 def _create_file_and_directory_from_file(file_service, source_file_service, share, source_share,
@@ -225,19 +268,13 @@ def _create_file_and_directory_from_file(file_service, source_file_service, shar
     """
     file_url = source_file_service.make_file_url(source_share, source_file_dir or None,
                                                  source_file_name, sas_token=sas)
-    full_path = os.path.join(destination_dir, source_file_dir, source_file_name) \
-        if destination_dir else os.path.join(source_file_dir, source_file_name)
+    full_path = _get_copy_destination(destination_dir, source_file_dir, source_file_name)
     file_name = os.path.basename(full_path)
     dir_name = os.path.dirname(full_path)
     _make_directory_in_files_share(file_service, share, dir_name, existing_dirs)
 
-    try:
-        file_service.copy_file(share, dir_name, file_name, file_url, metadata, timeout)
-        return file_service.make_file_url(share, dir_name or None, file_name)
-    except AzureException:
-        error_template = 'Failed to copy file {} from share {} to file share {}. Please check if ' \
-                         'you have right permission to read source or set a correct sas token.'
-        raise CLIError(error_template.format(file_name, source_share, share))
+    file_service.copy_file(share, dir_name, file_name, file_url, metadata, timeout)
+    return file_service.make_file_url(share, dir_name or None, file_name)
 
 
 def _make_directory_in_files_share(file_service, file_share, directory_path, existing_dirs=None):
@@ -252,14 +289,8 @@ def _make_directory_in_files_share(file_service, file_share, directory_path, exi
     if not directory_path:
         return
 
-    parents = [directory_path]
-    p = os.path.dirname(directory_path)
-    while p:
-        parents.append(p)
-        p = os.path.dirname(p)
-
-    for dir_name in reversed(parents):
-        if existing_dirs and (dir_name in existing_dirs):
+    for dir_name in reversed(_get_directory_and_parents(directory_path)):
+        if existing_dirs is not None and (dir_name in existing_dirs):
             continue
 
         try:
@@ -269,5 +300,40 @@ def _make_directory_in_files_share(file_service, file_share, directory_path, exi
         except AzureHttpError:
             raise CLIError('Failed to create directory {}'.format(dir_name))
 
-        if existing_dirs:
-            existing_dirs.add(directory_path)
+        if existing_dirs is not None:
+            existing_dirs.add(dir_name)
+
+
+def _make_directories_in_files_share(file_service, file_share, directory_paths, existing_dirs=None,
+                                     max_concurrency=None):
+    """
+    Create the given directories and their parents. The directories of the same depth are created
+    concurrently, after their parents.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from azure.cli.core.util import get_max_concurrency
+
+    existing_dirs = existing_dirs if existing_dirs is not None else set()
+    levels = {}
+    for path in directory_paths:
+        parents = _get_directory_and_parents(path)
+        for depth, dir_name in enumerate(reversed(parents)):
+            if dir_name not in existing_dirs:
+                levels.setdefault(depth, set()).add(dir_name)
+
+    def _create(dir_name):
+        _make_directory_in_files_share(file_service, file_share, dir_name, existing_dirs)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency or get_max_concurrency()) as executor:
+        for depth in sorted(levels):
+            # the parents are in the cache once created, so each directory is created once
+            list(executor.map(_create, sorted(levels[depth])))
+
+
+def _get_directory_and_parents(directory_path):
+    parents = []
+    p = directory_path
+    while p:
+        parents.append(p)
+        p = os.path.dirname(p)
+    return parents
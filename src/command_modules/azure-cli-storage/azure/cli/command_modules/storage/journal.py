@@ -0,0 +1,118 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Journal of the completed work of a batch transfer, so that an interrupted batch can be resumed
+"""
+
+import json
+import os
+import threading
+import time
+
+from azure.cli.core.azlogging import get_az_logger
+
+logger = get_az_logger(__name__)
+
+TRANSFER_JOURNAL_DIR = 'storage_transfers'
+# The journal is synced to disk after this many records or seconds, whichever comes first
+JOURNAL_SYNC_RECORDS = 256
+JOURNAL_SYNC_INTERVAL = 1
+
+
+class TransferJournal(object):
+    '''Append-only journal of the files transferred by a batch and the blocks uploaded for the large block blobs.
+
+    A record is one JSON line. Records are written to the file as they come but synced to disk in batches, so a
+    crash loses at most the last batch of records, which are then transferred again.'''
+
+    def __init__(self, path, resume=False):
+        from azure.cli.command_modules.storage.util import mkdir_p
+        self.path = path
+        self._lock = threading.Lock()
+        self._files = {}
+        self._blocks = {}
+        self._pending = 0
+        self._last_sync = time.time()
+        lines = self._load() if resume else []
+        mkdir_p(os.path.dirname(path))
+        self._stream = open(path, 'a' if resume else 'w')
+        if lines and not lines[-1].endswith('\n'):
+            # terminate the incomplete record so that it does not corrupt the next one
+            self._stream.write('\n')
+
+    @classmethod
+    def for_batch(cls, action, account_name, container, folder, resume=False):
+        import hashlib
+        from azure.cli.core._environment import get_config_dir
+        key = '{}/{}/{}/{}'.format(action, account_name, container, os.path.abspath(folder))
+        file_name = hashlib.sha1(key.encode('utf-8')).hexdigest() + '.journal'
+        return cls(os.path.join(get_config_dir(), TRANSFER_JOURNAL_DIR, file_name), resume)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                lines = f.readlines()
+        except (IOError, OSError):
+            logger.warning('No interrupted transfer to resume, transferring all the files.')
+            return []
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # a record is incomplete if writing it was interrupted
+                continue
+            version = (record['size'], record.get('mtime'))
+            if 'block' in record:
+                blocks = self._blocks.setdefault(record['name'], {})
+                blocks.setdefault(version, set()).add(record['block'])
+            else:
+                self._files[record['name']] = version
+        logger.info('Resuming from %s: %d files completed, %d blobs partially uploaded', self.path,
+                    len(self._files), len(self._blocks))
+        return lines
+
+    def is_completed(self, name, size, mtime=None):
+        '''Whether the file was transferred. `size` and `mtime` identify the version of the file.'''
+        return self._files.get(name) == (size, mtime)
+
+    def get_blocks(self, name, size, mtime=None):
+        '''The IDs of the blocks uploaded for the given version of the blob.'''
+        with self._lock:
+            return set(self._blocks.get(name, {}).get((size, mtime), ()))
+
+    def record_completed(self, name, size, mtime=None):
+        with self._lock:
+            self._files[name] = (size, mtime)
+            self._append({'name': name, 'size': size, 'mtime': mtime})
+
+    def record_block(self, name, block_id, size, mtime=None):
+        with self._lock:
+            self._blocks.setdefault(name, {}).setdefault((size, mtime), set()).add(block_id)
+            self._append({'name': name, 'block': block_id, 'size': size, 'mtime': mtime})
+
+    def _append(self, record):
+        self._stream.write(json.dumps(record) + '\n')
+        self._pending += 1
+        if self._pending >= JOURNAL_SYNC_RECORDS or time.time() - self._last_sync >= JOURNAL_SYNC_INTERVAL:
+            self._sync()
+
+    def _sync(self):
+        self._stream.flush()
+        os.fsync(self._stream.fileno())
+        self._pending = 0
+        self._last_sync = time.time()
+
+    def close(self, completed=False):
+        '''Close the journal. The journal of a completed batch is deleted as there is nothing left to resume.'''
+        with self._lock:
+            if self._stream.closed:
+                return
+            if completed:
+                self._stream.close()
+                os.remove(self.path)
+            else:
+                self._sync()
+                self._stream.close()
@@ -0,0 +1,136 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Compare local files with the blobs in a container to transfer only the new and changed files
+"""
+
+import json
+import os
+import threading
+from collections import namedtuple
+
+from azure.cli.core.azlogging import get_az_logger
+
+logger = get_az_logger(__name__)
+
+SYNC_MANIFEST_DIR = 'storage_sync'
+
+SyncFile = namedtuple('SyncFile', ['source', 'destination', 'size', 'mtime', 'md5'])
+SyncPlan = namedtuple('SyncPlan', ['changed', 'unchanged', 'extras'])
+
+
+class SyncManifest(object):
+    '''Size, modification time, MD5 and ETag of the files transferred by the previous syncs of a local folder with
+    a container. An unchanged local file whose blob still has the ETag recorded is known to be in sync without
+    reading the file.'''
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        try:
+            with open(path) as f:
+                self._entries = json.load(f)
+        except (IOError, OSError, ValueError):
+            pass
+
+    @classmethod
+    def for_destination(cls, account_name, container, folder):
+        import hashlib
+        from azure.cli.core._environment import get_config_dir
+        key = '{}/{}/{}'.format(account_name, container, os.path.abspath(folder))
+        file_name = hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json'
+        return cls(os.path.join(get_config_dir(), SYNC_MANIFEST_DIR, file_name))
+
+    def get(self, name):
+        return self._entries.get(name)
+
+    def record(self, sync_file, etag):
+        with self._lock:
+            self._entries[sync_file.destination] = {'size': sync_file.size, 'mtime': sync_file.mtime,
+                                                    'md5': sync_file.md5, 'etag': etag}
+
+    def remove(self, name):
+        with self._lock:
+            self._entries.pop(name, None)
+
+    def save(self):
+        from azure.cli.command_modules.storage.transfer import download_to_path
+        from azure.cli.command_modules.storage.util import mkdir_p
+
+        def _write(path):
+            with open(path, 'w') as f:
+                json.dump(self._entries, f)
+
+        mkdir_p(os.path.dirname(self.path))
+        with self._lock:
+            # an interrupted save keeps the previous manifest
+            download_to_path(self.path, _write)
+
+
+def compute_file_md5(path):
+    '''Base64 encoded MD5 of the file, the format of the Content-MD5 of blobs.'''
+    import base64
+    from azure.cli.command_modules.storage.transfer import map_file, hash_mapped_file
+    mapped = map_file(path)
+    try:
+        return base64.b64encode(hash_mapped_file(mapped).digest()).decode('utf-8')
+    finally:
+        if mapped is not None:
+            mapped.close()
+
+
+def _local_file(source, destination):
+    stat = os.stat(source)
+    return SyncFile(source, destination, stat.st_size, stat.st_mtime, None)
+
+
+def _is_unchanged(local, blob, entry):
+    properties = blob.properties
+    if properties.content_length != local.size:
+        return local, False
+    if entry and entry['size'] == local.size and entry['mtime'] == local.mtime and entry['etag'] == properties.etag:
+        return local._replace(md5=entry['md5']), True
+    remote_md5 = properties.content_settings.content_md5
+    if not remote_md5:
+        # nothing to compare the content with, upload the file to be safe
+        return local, False
+    local = local._replace(md5=compute_file_md5(local.source))
+    return local, local.md5 == remote_md5
+
+
+def plan_blob_sync(blob_service, container, source_files, pattern=None, manifest=None):
+    '''Split the local files into the ones which are new or changed and the ones which are unchanged compared to the
+    blobs in the container, from a single listing of the container. The blobs matching the pattern that have no local
+    file are returned as extras.
+
+    A blob is unchanged when its size is the same as the file and either the file and the blob did not change since
+    they were recorded in the manifest or the Content-MD5 of the blob is the MD5 of the file.
+
+    :param source_files: (path, blob name) of the local files
+    :param SyncManifest manifest: the files transferred by previous syncs
+    :rtype: SyncPlan
+    '''
+    from azure.cli.command_modules.storage.util import list_blobs_matching
+    remote = dict((blob.name, blob) for blob in list_blobs_matching(blob_service, container, pattern))
+
+    changed, unchanged = [], []
+    for source, destination in source_files:
+        local = _local_file(source, destination)
+        blob = remote.pop(destination, None)
+        if blob is None:
+            changed.append(local)
+            continue
+        local, same = _is_unchanged(local, blob, manifest.get(destination) if manifest else None)
+        if same:
+            unchanged.append(local)
+            if manifest:
+                manifest.record(local, blob.properties.etag)
+        else:
+            changed.append(local)
+    logger.info('%d new or changed files, %d unchanged files, %d extra blobs', len(changed), len(unchanged),
+                len(remote))
+    return SyncPlan(changed, unchanged, sorted(remote))
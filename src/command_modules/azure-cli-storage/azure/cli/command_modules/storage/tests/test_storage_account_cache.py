@@ -0,0 +1,129 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+import mock
+
+from azure.cli.core.profiles import get_sdk, ResourceType
+from azure.cli.command_modules.storage.account_cache import StorageAccountCache
+
+SUBSCRIPTION = '00000000-0000-0000-0000-000000000000'
+
+
+def _account(name, resource_group):
+    Endpoints = get_sdk(ResourceType.MGMT_STORAGE, 'models#Endpoints')
+    account = mock.MagicMock()
+    account.name = name
+    account.id = '/subscriptions/{}/resourceGroups/{}/providers/Microsoft.Storage/storageAccounts/{}'.format(
+        SUBSCRIPTION, resource_group, name)
+    account.primary_endpoints = Endpoints()
+    account.primary_endpoints.blob = 'https://{}.blob.core.windows.net/'.format(name)
+    return account
+
+
+class TestStorageAccountCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.accounts = [_account('account{}'.format(i), 'group{}'.format(i % 3)) for i in range(10)]
+        self.list_accounts = mock.MagicMock(side_effect=lambda: iter(self.accounts))
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def _cache(self, **kwargs):
+        return StorageAccountCache(os.path.join(self.cache_dir, 'accounts.json'),
+                                   os.path.join(self.cache_dir, 'keys.json'), **kwargs)
+
+    def test_account_index_lists_accounts_once(self):
+        cache = self._cache(index_ttl=60)
+        account = cache.get_account(SUBSCRIPTION, 'account4', self.list_accounts)
+        self.assertEqual(account['resource_group'], 'group1')
+        self.assertEqual(account['endpoints']['blob'], 'https://account4.blob.core.windows.net/')
+        self.assertEqual(cache.get_account(SUBSCRIPTION, 'account5', self.list_accounts)['resource_group'], 'group2')
+
+        # a new process reads the index from the file
+        self.assertEqual(self._cache(index_ttl=60).get_account(SUBSCRIPTION, 'account7',
+                                                               self.list_accounts)['resource_group'], 'group1')
+        self.assertEqual(self.list_accounts.call_count, 1)
+
+    def test_account_index_refreshes_on_miss_and_expiry(self):
+        cache = self._cache(index_ttl=60)
+        cache.get_account(SUBSCRIPTION, 'account1', self.list_accounts)
+        self.accounts.append(_account('new', 'group9'))
+        self.assertEqual(cache.get_account(SUBSCRIPTION, 'new', self.list_accounts)['resource_group'], 'group9')
+        self.assertIsNone(cache.get_account(SUBSCRIPTION, 'missing', self.list_accounts))
+        self.assertEqual(self.list_accounts.call_count, 3)
+
+        cache = self._cache(index_ttl=0)
+        with mock.patch('time.time', return_value=10 ** 10):
+            cache.get_account(SUBSCRIPTION, 'account1', self.list_accounts)
+        self.assertEqual(self.list_accounts.call_count, 4)
+
+    def test_keys_cached_in_memory_by_default(self):
+        cache = self._cache(key_ttl=0)
+        fetch = mock.MagicMock(return_value='key')
+        self.assertEqual(cache.get_key(SUBSCRIPTION, 'account1', fetch), 'key')
+        self.assertEqual(cache.get_key(SUBSCRIPTION, 'account1', fetch), 'key')
+        self.assertEqual(fetch.call_count, 1)
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, 'keys.json')))
+
+    def test_keys_cached_on_disk_when_enabled(self):
+        fetch = mock.MagicMock(return_value='key')
+        self._cache(key_ttl=60).get_key(SUBSCRIPTION, 'account1', fetch)
+        self.assertEqual(self._cache(key_ttl=60).get_key(SUBSCRIPTION, 'account1', fetch), 'key')
+        self.assertEqual(fetch.call_count, 1)
+        if os.name == 'posix':
+            mode = stat.S_IMODE(os.stat(os.path.join(self.cache_dir, 'keys.json')).st_mode)
+            self.assertEqual(mode, 0o600)
+
+        with mock.patch('time.time', return_value=10 ** 10):
+            self._cache(key_ttl=60).get_key(SUBSCRIPTION, 'account1', fetch)
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_rejected_key_evicted(self):
+        fetch = mock.MagicMock(side_effect=['key', 'renewed'])
+        self._cache(key_ttl=60).get_key(SUBSCRIPTION, 'account1', fetch)
+        cache = self._cache(key_ttl=60)
+        self.assertEqual(cache.get_key(SUBSCRIPTION, 'account1', fetch), 'key')
+
+        self.assertFalse(cache.evict_key('account1', 'other'))
+        self.assertFalse(cache.evict_key('account2', 'key'))
+        self.assertTrue(cache.evict_key('account1', 'key'))
+        # the key is evicted from memory and from the file
+        self.assertEqual(cache.get_key(SUBSCRIPTION, 'account1', fetch), 'renewed')
+        self.assertEqual(self._cache(key_ttl=60).get_key(SUBSCRIPTION, 'account1', fetch), 'renewed')
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_rejected_key_evicted_on_authentication_failure(self):
+        from azure.cli.command_modules.storage.account_cache import evict_rejected_key
+        response = mock.MagicMock(status=403, headers={'x-ms-error-code': 'AuthorizationPermissionMismatch'})
+        with mock.patch('azure.cli.command_modules.storage.account_cache.ACCOUNT_CACHE') as cache:
+            callback = evict_rejected_key('account1', 'key')
+            callback(response)
+            self.assertFalse(cache.evict_key.called)
+            response.headers['x-ms-error-code'] = 'AuthenticationFailed'
+            callback(response)
+            cache.evict_key.assert_called_once_with('account1', 'key')
+
+    def test_invalidate(self):
+        cache = self._cache(index_ttl=60, key_ttl=60)
+        fetch = mock.MagicMock(return_value='key')
+        cache.get_account(SUBSCRIPTION, 'account1', self.list_accounts)
+        cache.get_key(SUBSCRIPTION, 'account1', fetch)
+        cache.invalidate()
+        self.assertEqual(os.listdir(self.cache_dir), [])
+        cache.get_account(SUBSCRIPTION, 'account1', self.list_accounts)
+        cache.get_key(SUBSCRIPTION, 'account1', fetch)
+        self.assertEqual(self.list_accounts.call_count, 2)
+        self.assertEqual(fetch.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,801 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import base64
+import hashlib
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import unittest
+from xml.etree import ElementTree
+
+import mock
+from azure.common import AzureHttpError
+from six.moves import BaseHTTPServer, socketserver  # pylint: disable=import-error
+from six.moves.urllib.parse import urlparse, parse_qs, unquote  # pylint: disable=import-error
+
+from azure.cli.core.profiles import get_sdk, ResourceType
+from azure.cli.core.util import CLIError, CLIPartialResultError
+from azure.cli.command_modules.storage.blob import (storage_blob_upload_batch, storage_blob_download_batch,
+                                                    storage_blob_copy_batch)
+from azure.cli.command_modules.storage.custom import upload_blob
+from azure.cli.command_modules.storage.file import storage_file_upload_batch, storage_file_copy_batch
+from azure.cli.command_modules.storage.journal import TransferJournal
+from azure.cli.command_modules.storage.sync import compute_file_md5
+from azure.cli.command_modules.storage.transfer import (download_to_path, choose_block_size, AdaptiveConcurrency,
+                                                        map_file, BackgroundMD5)
+from azure.cli.command_modules.storage.util import glob_files_locally
+
+EMULATOR_ACCOUNT = 'devstoreaccount1'
+EMULATOR_KEY = 'Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw=='
+
+
+class _StandInBlobServiceHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _content_md5(self, name):
+        # like the service, only blobs uploaded in a single request have a Content-MD5
+        if not self.server.content_md5:
+            return ''
+        return base64.b64encode(hashlib.md5(self.server.blobs[name]).digest()).decode('utf-8')
+
+    def _blob_headers(self, name):
+        return {'ETag': '"0x{:X}"'.format(abs(hash(self.server.blobs[name]))),
+                'Last-Modified': 'Mon, 16 Oct 2017 10:00:00 GMT',
+                'x-ms-blob-type': 'BlockBlob'}
+
+    def do_PUT(self):  # pylint: disable=invalid-name
+        url = urlparse(self.path)
+        name = unquote(url.path)
+        query = parse_qs(url.query)
+        block_id = base64.b64decode(query['blockid'][0]).decode('utf-8') if 'blockid' in query else None
+        key = '{}@{}'.format(name, block_id) if block_id else name
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with self.server.lock:
+            if query.get('comp') == ['appendblock']:
+                # the appends are identified by the offset they append at
+                key = '{}@{}'.format(name, len(self.server.blobs[name]))
+            self.server.requests.append(('PUT', key))
+            drops = self.server.drops.get(key, 0)
+            if drops:
+                self.server.drops[key] = drops - 1
+        if drops:
+            # drop the connection without a response
+            self.close_connection = True
+            return
+        with self.server.lock:
+            self.server.active += 1
+            self.server.peak = max(self.server.peak, self.server.active)
+            failures = self.server.failures.get(key, 0)
+            if failures:
+                self.server.failures[key] = failures - 1
+        try:
+            # give the other uploads the chance to overlap
+            threading.Event().wait(0.05)
+            if failures:
+                self._reply(self.server.failure_status)
+                return
+            if block_id:
+                with self.server.lock:
+                    self.server.staged.setdefault(name, {})[block_id] = body
+                self._reply(201)
+                return
+            copy_source = self.headers.get('x-ms-copy-source')
+            if copy_source:
+                with self.server.lock:
+                    self.server.blobs[name] = self.server.blobs[unquote(urlparse(copy_source).path)]
+                    self.server.copies[name] = list(self.server.copy_statuses)
+                self._reply(202, headers={'x-ms-copy-id': 'copy-' + name, 'x-ms-copy-status': 'pending',
+                                          'ETag': '"0x1"', 'Last-Modified': 'Mon, 16 Oct 2017 10:00:00 GMT'})
+                return
+            if query.get('comp') == ['appendblock']:
+                with self.server.lock:
+                    offset = len(self.server.blobs[name])
+                    position = self.headers.get('x-ms-blob-condition-appendpos')
+                    if position is not None and int(position) != offset:
+                        self._reply(412)
+                        return
+                    self.server.blobs[name] += body
+                headers = self._blob_headers(name)
+                headers['x-ms-blob-append-offset'] = str(offset)
+                self._reply(201, headers=headers)
+                return
+            if query.get('comp') == ['blocklist']:
+                block_ids = [base64.b64decode(e.text).decode('utf-8') for e in ElementTree.fromstring(body)]
+                staged = self.server.staged.pop(name)
+                body = b''.join(staged[b] for b in block_ids)
+                self.server.committed_md5[name] = self.headers.get('x-ms-blob-content-md5')
+            self.server.blobs[name] = body
+            self._reply(201, headers=self._blob_headers(name))
+        finally:
+            with self.server.lock:
+                self.server.active -= 1
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        url = urlparse(self.path)
+        name = unquote(url.path)
+        with self.server.lock:
+            self.server.requests.append(('GET', name))
+        if parse_qs(url.query).get('comp') == ['blocklist']:
+            blocks = ''.join('<Block><Name>{}</Name><Size>{}</Size></Block>'.format(
+                base64.b64encode(b.encode('utf-8')).decode('utf-8'), len(d))
+                             for b, d in sorted(self.server.staged.get(name, {}).items()))
+            body = '<?xml version="1.0" encoding="utf-8"?><BlockList><CommittedBlocks /><UncommittedBlocks>{}' \
+                   '</UncommittedBlocks></BlockList>'.format(blocks)
+            self._reply(200, body.encode('utf-8'), {'Content-Type': 'application/xml'})
+            return
+        if parse_qs(url.query).get('comp') == ['list']:
+            blobs = ''.join('<Blob><Name>{}</Name><Properties><Etag>{}</Etag><Content-Length>{}</Content-Length>'
+                            '<Content-MD5>{}</Content-MD5><BlobType>BlockBlob</BlobType></Properties></Blob>'.format(
+                                n.split('/', 2)[2], self._blob_headers(n)['ETag'], len(b), self._content_md5(n))
+                            for n, b in sorted(self.server.blobs.items()) if n.startswith(name + '/'))
+            body = '<?xml version="1.0" encoding="utf-8"?><EnumerationResults ContainerName="{}"><Blobs>{}' \
+                   '</Blobs><NextMarker /></EnumerationResults>'.format(name[1:], blobs)
+            self._reply(200, body.encode('utf-8'), {'Content-Type': 'application/xml'})
+            return
+        with self.server.lock:
+            failures = self.server.failures.get(name, 0)
+            if failures:
+                self.server.failures[name] = failures - 1
+        if failures:
+            self._reply(self.server.failure_status)
+            return
+        body = self.server.blobs[name]
+        headers = self._blob_headers(name)
+        headers['Content-Range'] = 'bytes 0-{}/{}'.format(len(body) - 1, len(body))
+        self._reply(206, body, headers)
+
+    def do_DELETE(self):  # pylint: disable=invalid-name
+        name = unquote(urlparse(self.path).path)
+        with self.server.lock:
+            self.server.requests.append(('DELETE', name))
+        self.server.blobs.pop(name)
+        self._reply(202)
+
+    def do_HEAD(self):  # pylint: disable=invalid-name
+        name = unquote(urlparse(self.path).path)
+        if name not in self.server.blobs:
+            self._reply(404)
+            return
+        headers = self._blob_headers(name)
+        with self.server.lock:
+            self.server.requests.append(('HEAD', name))
+            statuses = self.server.copies.get(name)
+            if statuses:
+                status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+                size = len(self.server.blobs[name])
+                headers.update({'x-ms-copy-id': 'copy-' + name, 'x-ms-copy-status': status[0],
+                                'x-ms-copy-progress': '{}/{}'.format(int(size * status[1]), size),
+                                'x-ms-copy-status-description': status[2] if len(status) > 2 else ''})
+        # the body is not sent, only its length
+        self._reply(200, self.server.blobs[name], headers=headers)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class _StandInBlobService(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), _StandInBlobServiceHandler)
+        self.lock = threading.Lock()
+        self.blobs = {}
+        self.staged = {}
+        self.copies = {}
+        self.copy_statuses = [('success', 1)]
+        self.requests = []
+        self.failures = {}
+        self.drops = {}
+        self.failure_status = 503
+        self.content_md5 = True
+        self.committed_md5 = {}
+        self.active = 0
+        self.peak = 0
+
+
+class TestStorageBatchTransfer(unittest.TestCase):
+    def setUp(self):
+        self.server = _StandInBlobService()
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        BlockBlobService = get_sdk(ResourceType.DATA_STORAGE, 'blob#BlockBlobService')
+        self.client = BlockBlobService(account_name=EMULATOR_ACCOUNT, account_key=EMULATOR_KEY,
+                                       custom_domain='http://127.0.0.1:{}'.format(self.server.server_port))
+        # failed requests are retried by the batch operations, not the SDK
+        self.client.retry = lambda context: None
+
+        self.source_dir = tempfile.mkdtemp()
+        self.destination_dir = tempfile.mkdtemp()
+        for index in range(12):
+            folder = os.path.join(self.source_dir, 'dir{}'.format(index % 3))
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            with open(os.path.join(folder, 'file{}.txt'.format(index)), 'w') as f:
+                f.write('content {}\n'.format(index) * (index + 1))
+
+        self.retry_patch = mock.patch('azure.cli.command_modules.storage.transfer.TRANSFER_RETRY_BACKOFF', 0)
+        self.retry_patch.start()
+        self.poll_patch = mock.patch('azure.cli.command_modules.storage.transfer.COPY_POLL_MIN_INTERVAL', 0)
+        self.poll_patch.start()
+        self.config_dir = tempfile.mkdtemp()
+        self.config_patch = mock.patch.dict(os.environ, {'AZURE_CONFIG_DIR': self.config_dir})
+        self.config_patch.start()
+
+    def tearDown(self):
+        self.config_patch.stop()
+        shutil.rmtree(self.config_dir)
+        self.retry_patch.stop()
+        self.poll_patch.stop()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.source_dir)
+        shutil.rmtree(self.destination_dir)
+
+    def _upload_batch(self, **kwargs):
+        ContentSettings = get_sdk(ResourceType.DATA_STORAGE, 'blob.models#ContentSettings')
+        source_files = sorted(glob_files_locally(self.source_dir, None))
+        return source_files, storage_blob_upload_batch(
+            self.client, self.source_dir, 'cont', source_files=source_files, destination_container_name='cont',
+            blob_type='block', content_settings=ContentSettings(), **kwargs)
+
+    def test_upload_batch_concurrently(self):
+        source_files, results = self._upload_batch(max_concurrency=4)
+
+        self.assertEqual(len(self.server.blobs), 12)
+        self.assertGreater(self.server.peak, 1)
+        self.assertLessEqual(self.server.peak, 4)
+        for (src, dst), result in zip(source_files, results):
+            with open(src, 'rb') as f:
+                self.assertEqual(self.server.blobs['/cont/' + dst.replace(os.sep, '/')], f.read())
+            self.assertTrue(result['Blob'].endswith('/cont/' + dst.replace(os.sep, '/')))
+            self.assertEqual(result['Type'], 'text/plain')
+            self.assertIsNotNone(result['eTag'])
+
+    def test_upload_batch_retries_failed_files(self):
+        self.server.failures = {'/cont/dir0/file0.txt': 2, '/cont/dir1/file4.txt': 1}
+        _, results = self._upload_batch(max_concurrency=3)
+
+        self.assertEqual(len(results), 12)
+        self.assertEqual(len(self.server.blobs), 12)
+        self.assertEqual([r['Attempts'] for r in results if r['Blob'].endswith('/cont/dir0/file0.txt')], [3])
+        self.assertEqual(self.server.requests.count(('PUT', '/cont/dir0/file0.txt')), 3)
+        self.assertEqual(self.server.requests.count(('PUT', '/cont/dir1/file4.txt')), 2)
+
+    def test_upload_batch_retries_dropped_connections(self):
+        self.server.drops = {'/cont/dir0/file3.txt': 1}
+        _, results = self._upload_batch(max_concurrency=3)
+
+        self.assertEqual(len(self.server.blobs), 12)
+        self.assertEqual(self.server.requests.count(('PUT', '/cont/dir0/file3.txt')), 2)
+        self.assertEqual([r['Attempts'] for r in results if r['Blob'].endswith('/cont/dir0/file3.txt')], [2])
+
+    def test_upload_batch_reports_failed_files(self):
+        self.server.failures = {'/cont/dir2/file2.txt': 1}
+        self.server.failure_status = 403
+        with self.assertRaisesRegexp(CLIPartialResultError, '1 of 12 files failed to upload') as context:
+            self._upload_batch(max_concurrency=3)
+        # permanent failures are not retried, the other files are uploaded
+        self.assertEqual(self.server.requests.count(('PUT', '/cont/dir2/file2.txt')), 1)
+        self.assertEqual(len(self.server.blobs), 11)
+        # the outcome of every file is reported
+        results = context.exception.result
+        self.assertEqual(len(results), 12)
+        failed = [r for r in results if r['Status'] == 'Failed']
+        self.assertEqual(len(failed), 1)
+        self.assertTrue(failed[0]['Blob'].endswith('/cont/dir2/file2.txt'))
+        self.assertEqual(failed[0]['Attempts'], 1)
+        self.assertIsNotNone(failed[0]['Error'])
+        self.assertTrue(all(r['Error'] is None and r['eTag'] for r in results if r['Status'] == 'Succeeded'))
+
+    def test_upload_batch_retries_append_after_appended_blocks(self):
+        AppendBlobService = get_sdk(ResourceType.DATA_STORAGE, 'blob#AppendBlobService')
+        self.client = AppendBlobService(account_name=EMULATOR_ACCOUNT, account_key=EMULATOR_KEY,
+                                        custom_domain='http://127.0.0.1:{}'.format(self.server.server_port))
+        self.client.retry = lambda context: None
+        self.client.MAX_BLOCK_SIZE = 16
+        self.server.blobs['/cont/dir2/file11.txt'] = b'existing '
+        # the third append of each file fails
+        self.server.failures = {'/cont/dir2/file11.txt@41': 1, '/cont/dir1/file10.txt@32': 1}
+        ContentSettings = get_sdk(ResourceType.DATA_STORAGE, 'blob.models#ContentSettings')
+        source_files = sorted(glob_files_locally(self.source_dir, None))
+        results = storage_blob_upload_batch(self.client, self.source_dir, 'cont', source_files=source_files,
+                                            destination_container_name='cont', blob_type='append',
+                                            content_settings=ContentSettings(), max_concurrency=3)
+
+        self.assertEqual(len(results), 12)
+        for src, dst in source_files:
+            with open(src, 'rb') as f:
+                content = f.read()
+            name = '/cont/' + dst.replace(os.sep, '/')
+            expected = b'existing ' + content if name == '/cont/dir2/file11.txt' else content
+            self.assertEqual(self.server.blobs[name], expected)
+        self.assertEqual(self.server.requests.count(('PUT', '/cont/dir1/file10.txt@32')), 2)
+        self.assertEqual(self.server.requests.count(('PUT', '/cont/dir1/file10.txt@0')), 1)
+
+    def test_download_batch_concurrently(self):
+        self._upload_batch()
+        del self.server.requests[:]
+        self.server.failures = {'/cont/dir1/file7.txt': 1}
+
+        results = storage_blob_download_batch(self.client, 'cont', self.destination_dir, 'cont', max_concurrency=4)
+
+        self.assertEqual(sorted(r['Blob'] for r in results), sorted(n[len('/cont/'):] for n in self.server.blobs))
+        self.assertEqual(set(r['Status'] for r in results), set(['Succeeded']))
+        self.assertEqual([r['Attempts'] for r in results if r['Blob'] == 'dir1/file7.txt'], [2])
+        for name, content in self.server.blobs.items():
+            with open(os.path.join(self.destination_dir, *name.split('/')[2:]), 'rb') as f:
+                self.assertEqual(f.read(), content)
+        self.assertEqual(self.server.requests.count(('GET', '/cont/dir1/file7.txt')), 2)
+        self.assertEqual(sorted(os.listdir(self.destination_dir)), ['dir0', 'dir1', 'dir2'])
+        self.assertEqual(len(os.listdir(os.path.join(self.destination_dir, 'dir1'))), 4)
+
+    def test_download_batch_keeps_no_partial_files(self):
+        self._upload_batch()
+        self.server.failures = {'/cont/dir0/file3.txt': 1}
+        self.server.failure_status = 404
+
+        with self.assertRaisesRegexp(CLIError, '1 of 12 files failed to download'):
+            storage_blob_download_batch(self.client, 'cont', self.destination_dir, 'cont', max_concurrency=4)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.destination_dir, 'dir0'))),
+                         ['file0.txt', 'file6.txt', 'file9.txt'])
+
+    def _change_source_files(self):
+        with open(os.path.join(self.source_dir, 'dir1', 'file4.txt'), 'w') as f:
+            f.write('changed content')
+        with open(os.path.join(self.source_dir, 'dir2', 'new.txt'), 'w') as f:
+            f.write('new content')
+        os.remove(os.path.join(self.source_dir, 'dir0', 'file3.txt'))
+
+    def _uploaded(self):
+        return sorted(n for method, n in self.server.requests if method == 'PUT')
+
+    def test_sync_uploads_changed_files(self):
+        self._upload_batch()
+        # compare with the Content-MD5 of the blobs, the first upload was not a sync
+        del self.server.requests[:]
+        _, results = self._upload_batch(sync=True)
+        self.assertEqual(results, [])
+        self.assertEqual(self._uploaded(), [])
+        self.assertEqual(len(self.server.blobs), 12)
+
+        self._change_source_files()
+        _, results = self._upload_batch(sync=True)
+        self.assertEqual(self._uploaded(), ['/cont/dir1/file4.txt', '/cont/dir2/new.txt'])
+        self.assertEqual(len(results), 2)
+        # the blob of the removed file is kept
+        self.assertEqual(len(self.server.blobs), 13)
+        self.assertEqual(len([r for r in self.server.requests if r[0] == 'GET']), 2)
+
+    def test_sync_uses_manifest_without_content_md5(self):
+        self.server.content_md5 = False
+        self._upload_batch(sync=True)
+        self.assertEqual(len(self._uploaded()), 12)
+
+        del self.server.requests[:]
+        self._change_source_files()
+        self._upload_batch(sync=True, delete_extra=True)
+        self.assertEqual(self._uploaded(), ['/cont/dir1/file4.txt', '/cont/dir2/new.txt'])
+        self.assertEqual([n for method, n in self.server.requests if method == 'DELETE'], ['/cont/dir0/file3.txt'])
+        self.assertEqual(sorted(self.server.blobs), sorted('/cont/' + dst for _, dst in
+                                                           glob_files_locally(self.source_dir, None)))
+
+    def test_sync_computes_md5_of_large_blobs_while_uploading(self):
+        self.client.MAX_SINGLE_PUT_SIZE = 64
+        self.client.MAX_BLOCK_SIZE = 16
+        with mock.patch('azure.cli.command_modules.storage.sync.compute_file_md5',
+                        side_effect=AssertionError('the file is read before it is uploaded')):
+            self._upload_batch(sync=True)
+        large_files = [dst for src, dst in glob_files_locally(self.source_dir, None) if os.path.getsize(src) > 64]
+        self.assertTrue(large_files)
+        for dst in large_files:
+            name = '/cont/' + dst.replace(os.sep, '/')
+            expected = base64.b64encode(hashlib.md5(self.server.blobs[name]).digest()).decode('utf-8')
+            self.assertEqual(self.server.committed_md5[name], expected)
+
+    def test_upload_batch_resume(self):
+        self.server.failures = {'/cont/dir1/file4.txt': 1, '/cont/dir2/file8.txt': 1}
+        self.server.failure_status = 403
+        with self.assertRaises(CLIError):
+            self._upload_batch(max_concurrency=3)
+        self.assertEqual(len(self.server.blobs), 10)
+
+        del self.server.requests[:]
+        _, results = self._upload_batch(max_concurrency=3, resume=True)
+        self.assertEqual(self._uploaded(), ['/cont/dir1/file4.txt', '/cont/dir2/file8.txt'])
+        self.assertEqual(len(results), 2)
+        self.assertEqual(len(self.server.blobs), 12)
+        self.assertEqual(os.listdir(os.path.join(self.config_dir, 'storage_transfers')), [])
+
+    def test_upload_batch_resume_large_block_blob(self):
+        # upload the large files block by block, the blocks are 16 bytes
+        self.client.MAX_SINGLE_PUT_SIZE = 64
+        self.client.MAX_BLOCK_SIZE = 16
+        large_file = os.path.join(self.source_dir, 'dir0', 'file9.txt')
+        self.server.failures = {'/cont/dir0/file9.txt@00000004': 1}
+        self.server.failure_status = 403
+        with self.assertRaises(CLIError):
+            self._upload_batch(max_connections=1)
+        self.assertNotIn('/cont/dir0/file9.txt', self.server.blobs)
+
+        del self.server.requests[:]
+        self._upload_batch(max_connections=1, resume=True)
+        with open(large_file, 'rb') as f:
+            self.assertEqual(self.server.blobs['/cont/dir0/file9.txt'], f.read())
+        # the blocks uploaded before the failure are not uploaded again
+        uploaded = self._uploaded()
+        self.assertEqual(uploaded[0], '/cont/dir0/file9.txt')
+        self.assertIn('/cont/dir0/file9.txt@00000004', uploaded)
+        self.assertLessEqual(set(uploaded[1:]), set('/cont/dir0/file9.txt@{:08d}'.format(i) for i in range(4, 7)))
+
+    def test_download_batch_resume(self):
+        self._upload_batch()
+        self.server.failures = {'/cont/dir1/file7.txt': 1}
+        self.server.failure_status = 404
+        with self.assertRaises(CLIError):
+            storage_blob_download_batch(self.client, 'cont', self.destination_dir, 'cont')
+
+        del self.server.requests[:]
+        results = storage_blob_download_batch(self.client, 'cont', self.destination_dir, 'cont', resume=True)
+        self.assertEqual([r['Blob'] for r in results], ['dir1/file7.txt'])
+        self.assertEqual(results[0]['File'], os.path.join(self.destination_dir, 'dir1/file7.txt'))
+        self.assertEqual([n for method, n in self.server.requests if method == 'GET' and 'file' in n],
+                         ['/cont/dir1/file7.txt'])
+
+    def test_copy_batch_starts_copies_concurrently(self):
+        self._upload_batch()
+        del self.server.requests[:]
+        self.server.peak = 0
+
+        results = storage_blob_copy_batch(self.client, self.client, destination_container='copies',
+                                          source_container='cont', pattern='dir1/*', max_concurrency=4)
+        self.assertEqual(sorted(r['Blob'].split('/copies/')[1] for r in results),
+                         ['dir1/file1.txt', 'dir1/file10.txt', 'dir1/file4.txt', 'dir1/file7.txt'])
+        self.assertGreater(self.server.peak, 1)
+        # the copies are not waited for
+        self.assertNotIn('HEAD', [method for method, _ in self.server.requests])
+
+    def test_copy_batch_retries_copy_starts(self):
+        self._upload_batch()
+        self.server.failures = {'/copies/dir2/file2.txt': 1}
+
+        results = storage_blob_copy_batch(self.client, self.client, destination_container='copies',
+                                          source_container='cont', pattern='dir2/*')
+        self.assertEqual(len(results), 4)
+        self.assertEqual(self.server.requests.count(('PUT', '/copies/dir2/file2.txt')), 2)
+        self.assertIn('/copies/dir2/file2.txt', self.server.blobs)
+
+    def test_copy_batch_waits_for_copies(self):
+        self._upload_batch()
+        self.server.copy_statuses = [('pending', 0), ('pending', 0.5), ('success', 1)]
+
+        results = storage_blob_copy_batch(self.client, self.client, destination_container='copies',
+                                          source_container='cont', pattern='dir2/*', wait=True)
+        self.assertEqual(len(results), 4)
+        for result in results:
+            self.assertEqual(result['Status'], 'Succeeded')
+            self.assertEqual(result['Copy'].status, 'success')
+            size = len(self.server.blobs['/copies/' + result['Blob'].split('/copies/')[1]])
+            self.assertEqual(result['Copy'].progress, '{}/{}'.format(size, size))
+        # the copies are checked together until all completed
+        self.assertEqual(len([r for r in self.server.requests if r[0] == 'HEAD']), 4 * 3)
+
+    def test_copy_batch_waits_for_started_copies(self):
+        self._upload_batch()
+        self.server.failures = {'/copies/dir2/file2.txt': 1}
+        self.server.failure_status = 403
+
+        with self.assertRaisesRegexp(CLIPartialResultError, '1 of 4 files failed to copy') as context:
+            storage_blob_copy_batch(self.client, self.client, destination_container='copies',
+                                    source_container='cont', pattern='dir2/*', wait=True)
+        results = context.exception.result
+        self.assertEqual(len(results), 4)
+        failed = [r for r in results if r['Status'] == 'Failed']
+        self.assertEqual([r['Blob'].split('/copies/')[1] for r in failed], ['dir2/file2.txt'])
+        self.assertNotIn('Copy', failed[0])
+        # the copies which started are waited for
+        for result in results:
+            if result['Status'] == 'Succeeded':
+                self.assertEqual(result['Copy'].status, 'success')
+        self.assertNotIn(('HEAD', '/copies/dir2/file2.txt'), self.server.requests)
+
+    def test_copy_batch_reports_failed_copies(self):
+        self._upload_batch()
+        self.server.copy_statuses = [('pending', 0), ('failed', 0.5, 'source changed')]
+
+        with self.assertRaisesRegexp(CLIPartialResultError, '4 of 4 files failed to copy') as context:
+            storage_blob_copy_batch(self.client, self.client, destination_container='copies',
+                                    source_container='cont', pattern='dir2/*', wait=True)
+        for result in context.exception.result:
+            self.assertEqual(result['Status'], 'Failed')
+            self.assertEqual(result['Copy'].status, 'failed')
+            self.assertIn('source changed', result['Error'])
+
+    @mock.patch('azure.cli.command_modules.storage.transfer.ADAPTIVE_MIN_BLOCK_SIZE', 16)
+    @mock.patch('azure.cli.command_modules.storage.transfer.ADAPTIVE_MAX_BLOCK_SIZE', 32)
+    def test_upload_blob_adaptively(self):
+        ContentSettings = get_sdk(ResourceType.DATA_STORAGE, 'blob.models#ContentSettings')
+        self.client.MAX_SINGLE_PUT_SIZE = 64
+        large_file = os.path.join(self.source_dir, 'dir2', 'file11.txt')
+        self.server.failures = {'/cont/large@00000003': 1}
+        self.server.failure_status = 503
+
+        result = upload_blob(self.client, 'cont', 'large', large_file, blob_type='block',
+                             content_settings=ContentSettings(), max_connections=2, adaptive=True)
+
+        with open(large_file, 'rb') as f:
+            content = f.read()
+        self.assertEqual(self.server.blobs['/cont/large'], content)
+        self.assertIsNotNone(result.etag)
+        blocks = [key for method, key in self.server.requests if key.startswith('/cont/large@')]
+        self.assertEqual(len(set(blocks)), (len(content) + 31) // 32)
+        self.assertEqual(blocks.count('/cont/large@00000003'), 2)
+        self.assertGreater(self.server.peak, 1)
+        self.assertIsNone(self.server.committed_md5['/cont/large'])
+
+        upload_blob(self.client, 'cont', 'large', large_file, blob_type='block', content_settings=ContentSettings(),
+                    validate_content=True, adaptive=True)
+        self.assertEqual(self.server.committed_md5['/cont/large'],
+                         base64.b64encode(hashlib.md5(content).digest()).decode('utf-8'))
+
+    def test_upload_blob_adaptively_requires_block_blob(self):
+        ContentSettings = get_sdk(ResourceType.DATA_STORAGE, 'blob.models#ContentSettings')
+        with self.assertRaisesRegexp(CLIError, 'only supported for block blobs'):
+            upload_blob(self.client, 'cont', 'disk.vhd', os.path.join(self.source_dir, 'dir0', 'file0.txt'),
+                        blob_type='page', content_settings=ContentSettings(), adaptive=True)
+
+    def test_sync_delete_extra_requires_sync(self):
+        with self.assertRaisesRegexp(CLIError, 'usage error'):
+            self._upload_batch(delete_extra=True)
+
+
+class TestFileBatchTransfer(unittest.TestCase):
+    def setUp(self):
+        self.source_dir = tempfile.mkdtemp()
+        for path in ['a.txt', 'x/b.txt', 'x/y/c.txt', 'x/y/d.txt', 'x/z/e.txt', 'w/f.txt']:
+            full_path = os.path.join(self.source_dir, *path.split('/'))
+            if not os.path.isdir(os.path.dirname(full_path)):
+                os.makedirs(os.path.dirname(full_path))
+            with open(full_path, 'w') as f:
+                f.write(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.source_dir)
+
+    def test_upload_batch_creates_directories_once(self):
+        FileContentSettings = get_sdk(ResourceType.DATA_STORAGE, 'file.models#ContentSettings')
+        client = mock.MagicMock()
+        created = []
+        client.create_directory.side_effect = lambda share_name, directory_name, fail_on_exist: \
+            created.append(directory_name)
+
+        results = storage_file_upload_batch(client, 'share', self.source_dir, content_settings=FileContentSettings(),
+                                            max_concurrency=3)
+
+        self.assertEqual(len(results), 6)
+        self.assertEqual(client.create_file_from_path.call_count, 6)
+        self.assertEqual(sorted(created), sorted(['w', 'x', os.path.join('x', 'y'), os.path.join('x', 'z')]))
+        # the parents are created before their subdirectories
+        self.assertGreater(created.index(os.path.join('x', 'y')), created.index('x'))
+        self.assertGreater(created.index(os.path.join('x', 'z')), created.index('x'))
+
+    @mock.patch('azure.cli.command_modules.storage.transfer.TRANSFER_RETRY_BACKOFF', 0)
+    def test_copy_batch_retries_copy_starts(self):
+        client = mock.MagicMock()
+        source_client = mock.MagicMock()
+        client.account_name = source_client.account_name = 'account'
+        client.copy_file.side_effect = [AzureHttpError('Server busy', 503), mock.DEFAULT]
+
+        results = storage_file_copy_batch(client, source_client, destination_share='share', source_container='cont',
+                                          pattern='x/b.txt')
+        self.assertEqual(len(results), 1)
+        self.assertEqual(client.copy_file.call_count, 2)
+
+        # the errors which are not transient are reported with the error of the service
+        client.copy_file.side_effect = AzureHttpError('This request is not authorized', 403)
+        with self.assertRaises(CLIError):
+            with mock.patch('azure.cli.command_modules.storage.transfer.logger') as logger:
+                storage_file_copy_batch(client, source_client, destination_share='share', source_container='cont',
+                                        pattern='x/b.txt')
+        self.assertIn('This request is not authorized', str(logger.error.call_args))
+        self.assertEqual(client.copy_file.call_count, 3)
+
+
+class TestAdaptiveUpload(unittest.TestCase):
+    def test_choose_block_size(self):
+        mib = 1024 * 1024
+        self.assertEqual(choose_block_size(100 * mib), 4 * mib)
+        self.assertEqual(choose_block_size(10 * 1024 * mib), 10 * mib)
+        self.assertEqual(choose_block_size(1024 * 1024 * mib), 100 * mib)
+        # within the number of blocks of a blob
+        self.assertEqual(choose_block_size(50000 * 99 * mib + 1), 100 * mib)
+        with self.assertRaises(CLIError):
+            choose_block_size(50000 * 100 * mib + 1)
+
+    def test_choose_block_size_before_large_blocks(self):
+        mib = 1024 * 1024
+        with mock.patch('azure.cli.core.profiles.supported_api_version', return_value=False):
+            self.assertEqual(choose_block_size(10 * 1024 * mib), 4 * mib)
+            self.assertEqual(choose_block_size(50000 * 4 * mib), 4 * mib)
+            with self.assertRaises(CLIError):
+                choose_block_size(50000 * 4 * mib + 1)
+
+    def test_concurrency_ramps_up_while_throughput_improves(self):
+        concurrency = AdaptiveConcurrency(2, 8)
+        now = [concurrency._window_start]  # pylint: disable=protected-access
+
+        def _window(seconds):
+            blocks = concurrency.current
+            for _ in range(blocks):
+                now[0] += seconds / blocks
+                concurrency.on_block(100, now[0])
+
+        _window(1.0)
+        self.assertEqual(concurrency.current, 3)
+        _window(1.0)  # 300 bytes/s, up from 200
+        self.assertEqual(concurrency.current, 4)
+        _window(1.0)
+        self.assertEqual(concurrency.current, 6)
+        _window(1.5)  # 400 bytes/s, the same as before
+        self.assertEqual(concurrency.current, 6)
+        _window(2.0)  # 300 bytes/s
+        self.assertEqual(concurrency.current, 5)
+        _window(1.0)
+        self.assertEqual(concurrency.current, 7)
+        _window(0.5)
+        self.assertEqual(concurrency.current, 8)
+        self.assertEqual(concurrency.peak, 8)
+
+        concurrency.on_error()
+        self.assertEqual(concurrency.current, 4)
+
+
+class TestMappedFileMD5(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    @mock.patch('azure.cli.command_modules.storage.transfer.HASH_CHUNK_SIZE', 1000)
+    def test_md5_of_mapped_file(self):
+        for size in [0, 1, 999, 1000, 12345]:
+            path = os.path.join(self.folder, 'file{}'.format(size))
+            content = os.urandom(size)
+            with open(path, 'wb') as f:
+                f.write(content)
+            expected = base64.b64encode(hashlib.md5(content).digest()).decode('utf-8')
+            self.assertEqual(compute_file_md5(path), expected)
+            mapped = map_file(path)
+            self.assertEqual(BackgroundMD5(mapped).result(), expected)
+            if mapped is not None:
+                mapped.close()
+
+    @mock.patch('azure.cli.command_modules.storage.transfer.HASH_CHUNK_SIZE', 1000)
+    def test_md5_of_mapped_file_without_buffer_interface(self):
+        # like the maps of Python 2
+        path = os.path.join(self.folder, 'file')
+        content = os.urandom(12345)
+        with open(path, 'wb') as f:
+            f.write(content)
+        with mock.patch('azure.cli.command_modules.storage.transfer.memoryview', create=True,
+                        side_effect=TypeError('cannot make memory view')):
+            self.assertEqual(compute_file_md5(path), base64.b64encode(hashlib.md5(content).digest()).decode('utf-8'))
+
+
+class TestDownloadToPath(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'file.txt')
+        with open(self.path, 'w') as f:
+            f.write('previous')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_download_replaces_file_when_complete(self):
+        def _download(path):
+            self.assertNotEqual(path, self.path)
+            with open(self.path) as f:
+                self.assertEqual(f.read(), 'previous')
+            with open(path, 'w') as f:
+                f.write('downloaded')
+            return 'result'
+
+        self.assertEqual(download_to_path(self.path, _download), 'result')
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'downloaded')
+        self.assertEqual(os.listdir(self.folder), ['file.txt'])
+
+    def test_failed_download_keeps_file(self):
+        def _download(path):
+            with open(path, 'w') as f:
+                f.write('partial')
+            raise IOError('connection reset')
+
+        with self.assertRaises(IOError):
+            download_to_path(self.path, _download)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'previous')
+        self.assertEqual(os.listdir(self.folder), ['file.txt'])
+
+    @unittest.skipUnless(os.name == 'posix', 'file modes are POSIX')
+    def test_download_follows_umask_and_keeps_mode(self):
+        def _download(path):
+            with open(path, 'w') as f:
+                f.write('downloaded')
+
+        new_path = os.path.join(self.folder, 'new.txt')
+        umask = os.umask(0o022)
+        try:
+            download_to_path(new_path, _download)
+        finally:
+            os.umask(umask)
+        self.assertEqual(stat.S_IMODE(os.stat(new_path).st_mode), 0o644)
+
+        os.chmod(self.path, 0o640)
+        download_to_path(self.path, _download)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o640)
+
+        download_to_path(self.path, _download, mode=0o600)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+
+class TestTransferJournal(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'transfers', 'batch.journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_resume_from_interrupted_journal(self):
+        journal = TransferJournal(self.path)
+        journal.record_completed('a.txt', 10, 1.5)
+        journal.record_block('b.bin', '00000000', 100, 2.5)
+        journal.close()
+        # interrupted while writing a record
+        with open(self.path, 'a') as f:
+            f.write('{"name": "c.t')
+
+        journal = TransferJournal(self.path, resume=True)
+        self.assertTrue(journal.is_completed('a.txt', 10, 1.5))
+        self.assertFalse(journal.is_completed('a.txt', 10, 3.5))
+        self.assertEqual(journal.get_blocks('b.bin', 100, 2.5), set(['00000000']))
+        self.assertEqual(journal.get_blocks('b.bin', 120, 2.5), set())
+        journal.record_completed('c.txt', 5)
+        journal.close()
+
+        journal = TransferJournal(self.path, resume=True)
+        self.assertTrue(journal.is_completed('c.txt', 5))
+        journal.close(completed=True)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_new_batch_discards_journal(self):
+        journal = TransferJournal(self.path)
+        journal.record_completed('a.txt', 10, 1.5)
+        journal.close()
+
+        TransferJournal(self.path).close()
+        journal = TransferJournal(self.path, resume=True)
+        self.assertFalse(journal.is_completed('a.txt', 10, 1.5))
+        journal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
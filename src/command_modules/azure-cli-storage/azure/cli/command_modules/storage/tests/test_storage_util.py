@@ -0,0 +1,157 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+import unittest
+from fnmatch import fnmatch
+
+from azure.common import AzureMissingResourceHttpError
+from azure.cli.core.profiles import get_sdk, ResourceType
+from azure.cli.command_modules.storage.util import collect_blobs, glob_files_remotely, write_file_atomically
+
+NAMES = ['logs/{}/{:02d}/{:02d}.log'.format(year, month, day)
+         for year in range(2014, 2018) for month in range(1, 13) for day in range(1, 4)] + \
+    ['logs/readme.txt', 'logs/2017/summary.txt', 'images/a.png', 'images/b.png', 'readme.txt', 'a[b]/c']
+
+
+class _StandInBlobService(object):
+    def __init__(self, names):
+        self.names = sorted(names)
+        self.listed = 0
+
+    def list_blobs(self, container, prefix=None, delimiter=None):
+        Blob, BlobPrefix = get_sdk(ResourceType.DATA_STORAGE, 'blob.models#Blob', 'blob.models#BlobPrefix')
+        prefixes = set()
+        for name in self.names:
+            if prefix and not name.startswith(prefix):
+                continue
+            rest = name[len(prefix or ''):]
+            if delimiter and delimiter in rest:
+                prefixes.add((prefix or '') + rest[:rest.index(delimiter) + 1])
+                continue
+            self.listed += 1
+            blob = Blob()
+            blob.name = name
+            yield blob
+        for name in sorted(prefixes):
+            self.listed += 1
+            item = BlobPrefix()
+            item.name = name
+            yield item
+
+
+class _StandInFileService(object):
+    def __init__(self, names, latency=0):
+        self.names = names
+        self.latency = latency
+        self.listed_directories = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def list_directories_and_files(self, share, directory_name=None):
+        Directory, File = get_sdk(ResourceType.DATA_STORAGE, 'file.models#Directory', 'file.models#File')
+        with self._lock:
+            self.listed_directories.append(directory_name)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.latency)
+        with self._lock:
+            self.active -= 1
+        prefix = directory_name + '/' if directory_name else ''
+        children = set(n[len(prefix):].split('/')[0] + ('/' if '/' in n[len(prefix):] else '')
+                       for n in self.names if n.startswith(prefix))
+        if not children:
+            raise AzureMissingResourceHttpError('The specified resource does not exist.', 404)
+        return [Directory(c[:-1]) if c.endswith('/') else File(c) for c in sorted(children)]
+
+
+class TestCollectBlobs(unittest.TestCase):
+    def _collect(self, pattern):
+        service = _StandInBlobService(NAMES)
+        return sorted(collect_blobs(service, 'container', pattern)), service.listed
+
+    def test_collect_blobs_matches_pattern(self):
+        for pattern in ['*', 'logs/2017/10/*', 'logs/201[67]/0?/*', 'logs/*/01/01.log', '*.txt', 'logs/2017?1*',
+                        'images/[!a]*', 'logs/201[!4]/1[12]/0[13].log', 'a[[]b]/*', 'missing/*']:
+            self.assertEqual(self._collect(pattern)[0], sorted(n for n in NAMES if fnmatch(n, pattern)), pattern)
+
+    def test_collect_blobs_lists_literal_prefix(self):
+        names, listed = self._collect('logs/2017/10/*')
+        self.assertEqual(len(names), 3)
+        self.assertEqual(listed, 3)
+
+    def test_collect_blobs_skips_virtual_directories(self):
+        names, listed = self._collect('logs/201[67]/1?/*.log')
+        self.assertEqual(len(names), 2 * 3 * 3)
+        # the blobs of the matching months, the years and months and logs/2017/summary.txt
+        self.assertEqual(listed, 2 * 3 * 3 + 4 + 2 * 12 + 1)
+
+
+class TestGlobFilesRemotely(unittest.TestCase):
+    def _glob(self, pattern):
+        service = _StandInFileService(NAMES)
+        files = sorted(os.path.join(d, f) for d, f in glob_files_remotely(service, 'share', pattern))
+        return files, service.listed_directories
+
+    def test_glob_files_matches_pattern(self):
+        for pattern in [None, 'logs/2017/10/*', 'logs/201[67]/0?/*', 'logs/*/01/01.log', '*.txt', 'images/[!a]*',
+                        'missing/*']:
+            expected = sorted(os.path.join(*n.split('/')) for n in NAMES if not pattern or fnmatch(n, pattern))
+            self.assertEqual(self._glob(pattern)[0], expected, pattern)
+
+    def test_glob_files_skips_directories(self):
+        files, directories = self._glob('logs/2017/1?/*')
+        self.assertEqual(len(files), 9)
+        self.assertEqual(sorted(directories), ['logs/2017', 'logs/2017/10', 'logs/2017/11', 'logs/2017/12'])
+
+    def test_glob_files_lists_directories_concurrently(self):
+        service = _StandInFileService(NAMES, latency=0.05)
+        files = list(glob_files_remotely(service, 'share', 'logs/*', max_concurrency=4))
+        self.assertEqual(len(files), 4 * 12 * 3 + 2)
+        self.assertEqual(service.peak, 4)
+
+
+class TestWriteFileAtomically(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'keys.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    @unittest.skipIf(os.name == 'nt', 'file modes are not enforced on Windows')
+    def test_write_file_atomically_with_mode(self):
+        with open(self.path, 'w') as f:
+            f.write('old')
+        os.chmod(self.path, 0o644)
+        umask = os.umask(0)
+        try:
+            write_file_atomically(self.path, 'new', mode=0o600)
+        finally:
+            os.umask(umask)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'new')
+        # the file replaced does not widen the mode
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+        self.assertEqual(os.listdir(self.folder), ['keys.json'])
+
+    def test_write_file_atomically_keeps_file_on_failure(self):
+        with open(self.path, 'w') as f:
+            f.write('old')
+        with self.assertRaises(TypeError):
+            write_file_atomically(self.path, object())
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'old')
+        self.assertEqual(os.listdir(self.folder), ['keys.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
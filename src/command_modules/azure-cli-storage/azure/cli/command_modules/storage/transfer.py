@@ -0,0 +1,598 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import errno
+import os
+import time
+from collections import deque, namedtuple
+
+from azure.cli.core.azlogging import get_az_logger
+
+logger = get_az_logger(__name__)
+
+# Number of times a failed transfer is tried again and the wait before the first retry, doubled for each retry.
+# These retries come on top of the retry policy of the storage client, which retries each request of a transfer
+# (ExponentialRetry by default): a transfer is tried again once the client gave up on one of its requests.
+TRANSFER_RETRIES = 2
+TRANSFER_RETRY_BACKOFF = 1
+_RETRYABLE_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+# The status of pending server-side copies is polled every COPY_POLL_MIN_INTERVAL seconds while they progress,
+# backing off up to COPY_POLL_MAX_INTERVAL seconds while none of them does
+COPY_POLL_MIN_INTERVAL = 1
+COPY_POLL_MAX_INTERVAL = 30
+COPY_POLL_BACKOFF = 1.5
+
+# The MD5 of a file is computed in chunks of this size
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Service limits of block blobs and the bounds of the block size chosen for adaptive uploads. The block size aims at
+# ADAPTIVE_TARGET_BLOCKS blocks and the blocks in flight are kept within ADAPTIVE_MAX_BUFFER bytes of memory.
+MAX_BLOCKS = 50000
+# Largest block before API version 2016-05-31
+LEGACY_MAX_BLOCK_SIZE = 4 * 1024 * 1024
+ADAPTIVE_MIN_BLOCK_SIZE = 4 * 1024 * 1024
+ADAPTIVE_MAX_BLOCK_SIZE = 100 * 1024 * 1024
+ADAPTIVE_TARGET_BLOCKS = 1024
+ADAPTIVE_MAX_CONCURRENCY = 32
+ADAPTIVE_MAX_BUFFER = 1024 * 1024 * 1024
+# Change of the throughput between two windows of blocks which is taken as an improvement or a degradation
+ADAPTIVE_THRESHOLD = 0.1
+
+TransferOperation = namedtuple('TransferOperation', ['source', 'destination', 'size'])
+BlockUpload = namedtuple('BlockUpload', ['block_ids', 'block_size', 'size', 'concurrency', 'peak_concurrency',
+                                         'retries', 'seconds', 'content_md5'])
+
+
+class TransferOutcome(object):  # pylint: disable=too-few-public-methods
+    '''The outcome of a transfer: `result` if it succeeded, otherwise `error`.'''
+
+    __slots__ = ('operation', 'result', 'error', 'attempts', 'size')
+
+    def __init__(self, operation, result=None, error=None, attempts=0):
+        self.operation = operation
+        self.result = result
+        self.error = error
+        self.attempts = attempts
+        self.size = operation.size
+
+
+def _is_retryable(ex):
+    from azure.common import AzureException
+    status_code = getattr(ex, 'status_code', None)
+    if status_code is not None:
+        return status_code in _RETRYABLE_STATUS_CODES
+    if isinstance(ex, AzureException):
+        # the storage client raises the failures of the connection (reset, timeout, name resolution) as
+        # AzureException without a status code
+        from azure.cli.core.profiles import get_sdk, ResourceType
+        return str(ex) != get_sdk(ResourceType.DATA_STORAGE, '_error#_ERROR_DECRYPTION_FAILURE')
+    # connection failures, but not local files which cannot be read or written
+    return isinstance(ex, EnvironmentError) and \
+        getattr(ex, 'errno', None) not in (errno.ENOENT, errno.EACCES, errno.EISDIR, errno.ENOSPC)
+
+
+def run_transfers(operations, transfer, max_concurrency=None, retries=TRANSFER_RETRIES, progress_message=None):
+    '''Run `transfer(source, destination, progress_callback)` for each of the operations on a bounded pool of
+    workers. Failed transfers are retried when the failure is transient.
+
+    The retries are in addition to those of the retry policy of the storage client used by `transfer`.
+
+    :param operations: TransferOperation (source, destination, size in bytes or None) for each transfer
+    :param transfer: transfers one operation. `progress_callback(current, total)` follows the signature of the
+        progress callbacks of the storage SDK.
+    :param int max_concurrency: number of concurrent transfers, defaults to core.max_concurrency
+    :param str progress_message: message of the progress shown, no progress is shown if None
+    :return: a TransferOutcome for each operation, in the order of the operations
+    '''
+    from concurrent.futures import ThreadPoolExecutor
+    from azure.cli.core.util import get_max_concurrency
+
+    operations = [o if isinstance(o, TransferOperation) else TransferOperation(*o) for o in operations]
+    if not operations:
+        return []
+
+    progress = None
+    if progress_message:
+        from azure.cli.core.application import APPLICATION
+        progress = APPLICATION.get_progress_controller(det=True)
+        progress.begin(message=progress_message)
+
+    def _run(operation):
+        task = progress.add_task(operation.destination, total_val=operation.size) if progress else None
+        outcome = TransferOutcome(operation)
+
+        def progress_callback(current, total):
+            outcome.size = total
+            if task:
+                task.add(value=current, total_val=total)
+
+        while True:
+            outcome.attempts += 1
+            try:
+                outcome.result = transfer(operation.source, operation.destination, progress_callback)
+                outcome.error = None
+                break
+            except Exception as ex:  # pylint: disable=broad-except
+                outcome.error = ex
+                if outcome.attempts > retries or not _is_retryable(ex):
+                    break
+                delay = TRANSFER_RETRY_BACKOFF * 2 ** (outcome.attempts - 1)
+                logger.info('Transfer of %s failed, retrying in %s seconds: %s', operation.source, delay, ex)
+                time.sleep(delay)
+        if task:
+            task.end(failed=outcome.error is not None)
+        return outcome
+
+    start = time.time()
+    try:
+        workers = min(len(operations), max_concurrency or get_max_concurrency())
+        if workers == 1:
+            outcomes = [_run(o) for o in operations]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                outcomes = list(executor.map(_run, operations))
+    finally:
+        if progress:
+            progress.end()
+    _log_throughput(outcomes, time.time() - start)
+    return outcomes
+
+
+def wait_for_copies(operations, get_copy, max_concurrency=None, progress_message=None):
+    '''Poll the status of the server-side copies of the operations together until all of them completed.
+
+    :param operations: TransferOperation (source, destination, size) for each copy
+    :param get_copy: returns the CopyProperties of the destination of an operation
+    :param int max_concurrency: number of concurrent status requests, defaults to core.max_concurrency
+    :param str progress_message: message of the progress shown, no progress is shown if None
+    :return: a TransferOutcome for each operation with the final CopyProperties as result. Failed and aborted
+        copies have a CLIError.
+    '''
+    from concurrent.futures import ThreadPoolExecutor
+    from azure.cli.core.util import CLIError, get_max_concurrency
+
+    outcomes = [TransferOutcome(o) for o in operations]
+    if not outcomes:
+        return []
+
+    progress = None
+    tasks = {}
+    if progress_message:
+        from azure.cli.core.application import APPLICATION
+        progress = APPLICATION.get_progress_controller(det=True)
+        progress.begin(message=progress_message)
+        tasks = dict((id(o), progress.add_task(o.operation.destination, total_val=o.size)) for o in outcomes)
+
+    def _poll(outcome):
+        try:
+            return get_copy(outcome.operation)
+        except Exception as ex:  # pylint: disable=broad-except
+            return ex
+
+    def _complete(outcome, error=None):
+        outcome.error = error
+        if error:
+            logger.info('Copy of %s failed: %s', outcome.operation.source, error)
+        else:
+            logger.info('Copy of %s completed', outcome.operation.source)
+        task = tasks.get(id(outcome))
+        if task:
+            task.end(failed=error is not None)
+
+    start = time.time()
+    pending = list(outcomes)
+    poll_failures = {}
+    interval = COPY_POLL_MIN_INTERVAL
+    workers = min(len(outcomes), max_concurrency or get_max_concurrency())
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while pending:
+                changed = False
+                still_pending = []
+                for outcome, copy in zip(pending, list(executor.map(_poll, pending))):
+                    if isinstance(copy, Exception):
+                        poll_failures[id(outcome)] = poll_failures.get(id(outcome), 0) + 1
+                        if poll_failures[id(outcome)] > TRANSFER_RETRIES or not _is_retryable(copy):
+                            _complete(outcome, copy)
+                        else:
+                            still_pending.append(outcome)
+                        continue
+                    poll_failures.pop(id(outcome), None)
+                    copied, total = _parse_copy_progress(copy.progress)
+                    if outcome.result is None or (copy.status, copy.progress) != \
+                            (outcome.result.status, outcome.result.progress):
+                        changed = True
+                    outcome.result = copy
+                    outcome.size = total
+                    task = tasks.get(id(outcome))
+                    if task and total is not None:
+                        task.add(value=copied, total_val=total)
+                    if copy.status == 'pending':
+                        still_pending.append(outcome)
+                    elif copy.status == 'success':
+                        _complete(outcome)
+                    else:
+                        _complete(outcome, CLIError('Copy {}: {}'.format(copy.status, copy.status_description)))
+                pending = still_pending
+                if pending:
+                    interval = COPY_POLL_MIN_INTERVAL if changed else \
+                        min(interval * COPY_POLL_BACKOFF, COPY_POLL_MAX_INTERVAL)
+                    logger.info('%d copies pending, checking again in %.1f seconds', len(pending), interval)
+                    time.sleep(interval)
+    finally:
+        if progress:
+            progress.end()
+    _log_throughput(outcomes, time.time() - start)
+    return outcomes
+
+
+def wait_for_started_copies(outcomes, get_copy, max_concurrency=None, progress_message=None):
+    '''Wait for the copies of the outcomes of `run_transfers` which started, see `wait_for_copies`. The result
+    of each started copy, a dict, gets the final CopyProperties as 'Copy' and the copy's error if it failed.
+    :return: the outcomes
+    '''
+    started = [o for o in outcomes if o.error is None]
+    copies = wait_for_copies([o.operation for o in started], get_copy, max_concurrency=max_concurrency,
+                             progress_message=progress_message)
+    for outcome, copy in zip(started, copies):
+        outcome.result = dict(outcome.result, Copy=copy.result)
+        outcome.error = copy.error
+    return outcomes
+
+
+def _parse_copy_progress(progress):
+    '''Bytes copied and total bytes of a copy progress of the form <copied>/<total>.'''
+    try:
+        copied, total = progress.split('/')
+        return int(copied), int(total)
+    except (AttributeError, ValueError):
+        return None, None
+
+
+def _log_throughput(outcomes, elapsed):
+    transferred = [o for o in outcomes if o.error is None]
+    size = sum(o.size or 0 for o in transferred)
+    logger.info('Transferred %d files, %d bytes in %.1f seconds (%d bytes/s)', len(transferred), size, elapsed,
+                size / elapsed if elapsed else size)
+
+
+def choose_block_size(size):
+    '''Block size for uploading a blob of `size` bytes in about ADAPTIVE_TARGET_BLOCKS blocks, in whole MiB within
+    the bounds of the adaptive block size and large enough to stay within the number of blocks of a blob. The blocks
+    are at most LEGACY_MAX_BLOCK_SIZE with the API versions before 2016-05-31.'''
+    from azure.cli.core.util import CLIError
+    from azure.cli.core.profiles import supported_api_version, ResourceType
+    max_block_size = ADAPTIVE_MAX_BLOCK_SIZE
+    if not supported_api_version(ResourceType.DATA_STORAGE, min_api='2016-05-31'):
+        max_block_size = min(max_block_size, LEGACY_MAX_BLOCK_SIZE)
+    if size > MAX_BLOCKS * max_block_size:
+        raise CLIError('The file is larger than the largest block blob, {} blocks of {} bytes.'.format(
+            MAX_BLOCKS, max_block_size))
+    mib = 1024 * 1024
+    block_size = max(size // ADAPTIVE_TARGET_BLOCKS, (size + MAX_BLOCKS - 1) // MAX_BLOCKS)
+    block_size = (block_size + mib - 1) // mib * mib
+    return min(max_block_size, max(ADAPTIVE_MIN_BLOCK_SIZE, block_size))
+
+
+class AdaptiveConcurrency(object):
+    '''Number of blocks uploaded concurrently, tuned from the throughput of the last window of blocks.
+
+    The throughput of a window is the bytes of its blocks over the time it took, so that it measures the link rather
+    than a single connection. While it improves the concurrency is raised by half, when it degrades it is lowered by
+    one and a failed block halves it.'''
+
+    def __init__(self, initial, maximum):
+        self.maximum = max(1, maximum)
+        self.current = max(1, min(initial, self.maximum))
+        self.peak = self.current
+        self._last_throughput = None
+        self._reset(time.time())
+
+    def _reset(self, now):
+        self._window_start = now
+        self._window_bytes = 0
+        self._window_blocks = 0
+
+    def on_block(self, size, now=None):
+        now = time.time() if now is None else now
+        self._window_bytes += size
+        self._window_blocks += 1
+        if self._window_blocks < self.current:
+            return
+        throughput = self._window_bytes / max(now - self._window_start, 1e-6)
+        last = self._last_throughput
+        if last is None or throughput > last * (1 + ADAPTIVE_THRESHOLD):
+            self.current = min(self.maximum, self.current + max(1, self.current // 2))
+        elif throughput < last * (1 - ADAPTIVE_THRESHOLD):
+            self.current = max(1, self.current - 1)
+        self.peak = max(self.peak, self.current)
+        logger.debug('%.1f MB/s with %d blocks in flight, now %d', throughput / 1e6, self._window_blocks,
+                     self.current)
+        self._last_throughput = throughput
+        self._reset(now)
+
+    def on_error(self, now=None):
+        self.current = max(1, self.current // 2)
+        self._last_throughput = None
+        self._reset(time.time() if now is None else now)
+
+
+def map_file(path):
+    '''Read-only memory map of the file, or None for an empty file which cannot be mapped. Slicing the map reads the
+    file without a seek and read per block, and views of the map are hashed without copying them.'''
+    import mmap
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def hash_mapped_file(mapped, md5=None):
+    '''Update `md5` with the content of the memory map, in chunks of HASH_CHUNK_SIZE.'''
+    import hashlib
+    md5 = md5 or hashlib.md5()
+    if mapped is None:
+        return md5
+    try:
+        view = memoryview(mapped)
+    except TypeError:
+        # Python 2 maps have no buffer interface, the chunks are hashed from slices of the map instead
+        view = mapped
+    try:
+        for offset in range(0, len(view), HASH_CHUNK_SIZE):
+            # hashlib releases the GIL while hashing large buffers, so the hashing runs alongside the uploads
+            md5.update(view[offset:offset + HASH_CHUNK_SIZE])
+    finally:
+        if view is not mapped and hasattr(view, 'release'):
+            view.release()
+    return md5
+
+
+class BackgroundMD5(object):
+    '''Base64 encoded MD5 of a memory-mapped file, the format of Content-MD5, computed on a worker thread while the
+    blocks of the file are uploaded from the same map.'''
+
+    def __init__(self, mapped):
+        import threading
+        self._md5 = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(mapped,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, mapped):
+        try:
+            self._md5 = hash_mapped_file(mapped)
+        except Exception as ex:  # pylint: disable=broad-except
+            self._error = ex
+
+    def join(self):
+        self._thread.join()
+
+    def result(self):
+        import base64
+        self.join()
+        if self._error:
+            raise self._error  # pylint: disable=raising-bad-type
+        return base64.b64encode(self._md5.digest()).decode('utf-8')
+
+
+def upload_blocks_adaptively(file_path, put_block, initial_concurrency=2, max_concurrency=None,
+                             progress_callback=None, retries=TRANSFER_RETRIES, compute_md5=False):
+    '''Upload the file in blocks with `put_block(data, block_id)`, choosing the block size from the size of the file
+    and tuning the number of concurrent blocks from the measured throughput and errors. Blocks which fail with a
+    transient error are retried.
+
+    :param int max_concurrency: the most blocks in flight, defaults to ADAPTIVE_MAX_CONCURRENCY within
+        ADAPTIVE_MAX_BUFFER bytes
+    :param bool compute_md5: compute the MD5 of the file while the blocks are uploaded
+    :return: BlockUpload with the IDs of the blocks to commit, in order, and the parameters used
+    '''
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+    size = os.path.getsize(file_path)
+    block_size = choose_block_size(size)
+    block_ids = ['{:08d}'.format(i) for i in range((size + block_size - 1) // block_size)]
+    maximum = min(max_concurrency or ADAPTIVE_MAX_CONCURRENCY, max(1, ADAPTIVE_MAX_BUFFER // block_size))
+    concurrency = AdaptiveConcurrency(initial_concurrency, maximum)
+    mapped = map_file(file_path)
+
+    def _put(index):
+        data = mapped[index * block_size:(index + 1) * block_size]
+        put_block(data, block_ids[index])
+        return len(data)
+
+    pending = deque(range(len(block_ids)))
+    running = {}
+    attempts = {}
+    transferred = 0
+    start = time.time()
+    md5 = None
+    try:
+        md5 = BackgroundMD5(mapped) if compute_md5 else None
+        with ThreadPoolExecutor(max_workers=concurrency.maximum) as executor:
+            while pending or running:
+                while pending and len(running) < concurrency.current:
+                    index = pending.popleft()
+                    running[executor.submit(_put, index)] = index
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    try:
+                        uploaded = future.result()
+                    except Exception as ex:  # pylint: disable=broad-except
+                        attempts[index] = attempts.get(index, 0) + 1
+                        if attempts[index] > retries or not _is_retryable(ex):
+                            raise
+                        concurrency.on_error()
+                        delay = TRANSFER_RETRY_BACKOFF * 2 ** (attempts[index] - 1)
+                        logger.info('Block %s failed, retrying in %s seconds with %d blocks in flight: %s',
+                                    block_ids[index], delay, concurrency.current, ex)
+                        time.sleep(delay)
+                        pending.appendleft(index)
+                        continue
+                    transferred += uploaded
+                    concurrency.on_block(uploaded)
+                    if progress_callback:
+                        progress_callback(transferred, size)
+        content_md5 = md5.result() if md5 else None
+    finally:
+        if md5:
+            # the map cannot be closed while it is being hashed
+            md5.join()
+        if mapped is not None:
+            mapped.close()
+    return BlockUpload(block_ids, block_size, size, concurrency.current, concurrency.peak, sum(attempts.values()),
+                       time.time() - start, content_md5)
+
+
+def upload_blob_blocks(client, journal, container_name, blob_name, file_path, content_settings, version,  # pylint: disable=too-many-arguments,too-many-locals
+                       progress_callback=None, max_connections=2, compute_md5=False, validate_content=False,
+                       metadata=None, lease_id=None, if_modified_since=None, if_unmodified_since=None, if_match=None,
+                       if_none_match=None, timeout=None):
+    '''Upload a block blob block by block from a memory map of the file, recording the uploaded blocks in the
+    journal of the batch. The blocks recorded for the same version of the file which the service still has are
+    not uploaded again. With `compute_md5`, the Content-MD5 of the blob is computed while the blocks are uploaded.
+
+    :param client: BlockBlobService the blocks are uploaded with, in blocks of its MAX_BLOCK_SIZE
+    :param journal: TransferJournal of the batch
+    :param version: tuple of the size and the modification time of the file
+    :return: tuple of the result of the Put Block List request and the content settings of the blob
+    '''
+    from concurrent.futures import ThreadPoolExecutor
+    import copy
+    import threading
+    from azure.cli.core.profiles import get_sdk, supported_api_version, ResourceType
+    size, mtime = version
+    block_size = client.MAX_BLOCK_SIZE
+    block_ids = ['{:08d}'.format(i) for i in range((size + block_size - 1) // block_size)]
+
+    uploaded = journal.get_blocks(blob_name, size, mtime)
+    if uploaded:
+        # only the blocks the service still has are skipped, uncommitted blocks expire
+        from azure.common import AzureMissingResourceHttpError
+        try:
+            staged = client.get_block_list(container_name, blob_name, block_list_type='uncommitted',
+                                           lease_id=lease_id, timeout=timeout)
+            uploaded &= set(b.id for b in staged.uncommitted_blocks)
+        except AzureMissingResourceHttpError:
+            uploaded = set()
+        logger.info('resuming %s from %d of %d blocks', file_path, len(uploaded), len(block_ids))
+
+    lock = threading.Lock()
+    transferred = [sum(min(block_size, size - i * block_size) for i, b in enumerate(block_ids) if b in uploaded)]
+    mapped = map_file(file_path)
+
+    def _put_block(index):
+        block_id = block_ids[index]
+        if block_id in uploaded:
+            return
+        data = mapped[index * block_size:(index + 1) * block_size]
+        put_block_args = {'lease_id': lease_id, 'timeout': timeout}
+        if supported_api_version(ResourceType.DATA_STORAGE, min_api='2016-05-31'):
+            put_block_args['validate_content'] = validate_content
+        client.put_block(container_name, blob_name, data, block_id, **put_block_args)
+        journal.record_block(blob_name, block_id, size, mtime)
+        with lock:
+            transferred[0] += len(data)
+            if progress_callback:
+                progress_callback(transferred[0], size)
+
+    md5 = None
+    try:
+        md5 = BackgroundMD5(mapped) if compute_md5 else None
+        with ThreadPoolExecutor(max_workers=max_connections or 1) as executor:
+            list(executor.map(_put_block, range(len(block_ids))))
+        if md5:
+            content_settings = copy.copy(content_settings)
+            content_settings.content_md5 = md5.result()
+    finally:
+        if md5:
+            md5.join()
+        if mapped is not None:
+            mapped.close()
+
+    BlobBlock = get_sdk(ResourceType.DATA_STORAGE, 'blob.models#BlobBlock')
+    result = client.put_block_list(container_name, blob_name, [BlobBlock(id=b) for b in block_ids],
+                                   content_settings=content_settings, metadata=metadata, lease_id=lease_id,
+                                   if_modified_since=if_modified_since, if_unmodified_since=if_unmodified_since,
+                                   if_match=if_match, if_none_match=if_none_match, timeout=timeout)
+    return result, content_settings
+
+
+def prepare_directories(root, paths):
+    '''Create the directories of the files at the relative `paths` under `root`. Each directory is created once
+    instead of checking for it before writing every file.'''
+    from azure.cli.command_modules.storage.util import mkdir_p
+    for folder in sorted(set(os.path.dirname(os.path.join(root, p)) for p in paths)):
+        mkdir_p(folder)
+
+
+def download_to_path(file_path, download, mode=None):
+    '''Run `download(temp_path)` and move the downloaded file to `file_path` once it is complete, so that an
+    interrupted or failed download never leaves a partial file behind.
+
+    The file is created with `mode`, by default with the mode of the file it replaces or, for a new file, the mode
+    set by the umask like any other file the command creates.'''
+    import stat
+    import uuid
+    from azure.cli.command_modules.storage.util import replace_file
+    folder, name = os.path.split(file_path)
+    flags = os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, 'O_BINARY', 0)
+    while True:
+        temp_path = os.path.join(folder, '.{}.{}.partial'.format(name, uuid.uuid4().hex[:8]))
+        try:
+            os.close(os.open(temp_path, flags, 0o666 if mode is None else mode))
+            break
+        except OSError as ex:
+            if ex.errno != errno.EEXIST:
+                raise
+    try:
+        result = download(temp_path)
+        if mode is None:
+            try:
+                os.chmod(temp_path, stat.S_IMODE(os.stat(file_path).st_mode))
+            except OSError:
+                # a new file
+                pass
+        replace_file(temp_path, file_path)
+        return result
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def raise_for_failed_transfers(outcomes, action, result=None):
+    '''Log the failed transfers and raise a CLIError if there are any. With `result`, the error is a
+    CLIPartialResultError, so the result is output before the command fails.'''
+    from azure.cli.core.util import CLIError, CLIPartialResultError
+    failed = [o for o in outcomes if o.error is not None]
+    for outcome in failed:
+        logger.error('Failed to %s %s: %s', action, outcome.operation.source, outcome.error)
+    if failed:
+        message = '{} of {} files failed to {}.'.format(len(failed), len(outcomes), action)
+        if result is not None:
+            raise CLIPartialResultError(message, result)
+        raise CLIError(message)
+
+
+def transfer_results(outcomes, action, failed_result):
+    '''The result of every transfer with its status, error and number of attempts, in the order of the operations.
+    Raises a CLIPartialResultError with the results when any transfer failed.
+
+    :param failed_result: function returning the result reported for the operation of a failed transfer which
+        has no result
+    '''
+    results = []
+    for outcome in outcomes:
+        result = dict(outcome.result if outcome.result is not None else failed_result(outcome.operation))
+        result.update({'Status': 'Succeeded' if outcome.error is None else 'Failed',
+                       'Error': None if outcome.error is None else str(outcome.error),
+                       'Attempts': outcome.attempts})
+        results.append(result)
+    raise_for_failed_transfers(outcomes, action, results)
+    return results
@@ -23,7 +23,39 @@ def collect_blobs(blob_service, container, pattern=None):
     if not _pattern_has_wildcards(pattern):
         return [pattern] if blob_service.exists(container, pattern) else []
 
-    return (blob.name for blob in blob_service.list_blobs(container) if _match_path(pattern, blob.name))
+    return (blob.name for blob in list_blobs_matching(blob_service, container, pattern))
+
+
+def list_blobs_matching(blob_service, container, pattern=None):
+    """
+    List the blobs in the given blob container whose path matches the given pattern, with their properties.
+
+    Only the blobs starting with the literal prefix of the pattern are listed. When the directories after the prefix
+    are matched by '?' or '[seq]', the virtual directories down to the first '*' are listed one by one to skip the
+    ones which cannot match.
+    """
+    tokens = _tokenize_pattern(pattern)
+    prefix = _literal_prefix(tokens)
+    # '*' matches '/' too, so below the directories before the first '*' every directory may match
+    depth = tokens[:tokens.index(_STAR)].count('/') if _STAR in tokens else tokens.count('/')
+    if depth > prefix.count('/'):
+        blobs = _walk_blobs(blob_service, container, prefix, tokens, depth)
+    else:
+        blobs = blob_service.list_blobs(container, prefix=prefix or None)
+    return (blob for blob in blobs if _match_path(pattern, blob.name))
+
+
+def _walk_blobs(blob_service, container, prefix, tokens, depth):
+    BlobPrefix = get_sdk(ResourceType.DATA_STORAGE, 'blob.models#BlobPrefix')
+    prefixes = [prefix]
+    while prefixes:
+        current = prefixes.pop()
+        delimiter = '/' if current.count('/') < depth else None
+        for item in blob_service.list_blobs(container, prefix=current or None, delimiter=delimiter):
+            if not isinstance(item, BlobPrefix):
+                yield item
+            elif _can_match_prefix(tokens, item.name):
+                prefixes.append(item.name)
 
 
 def collect_files(file_service, share, pattern=None):
@@ -76,20 +108,38 @@ def glob_files_locally(folder_path, pattern):
                 yield (full_path, full_path[len_folder_path:])
 
 
-def glob_files_remotely(client, share_name, pattern):
+def glob_files_remotely(client, share_name, pattern, max_concurrency=None):
     """glob the files in remote file share based on the given pattern"""
-    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    from azure.common import AzureMissingResourceHttpError
+    from azure.cli.core.util import get_max_concurrency
     Directory, File = get_sdk(ResourceType.DATA_STORAGE, 'file.models#Directory', 'file.models#File')
 
-    queue = deque([""])
-    while queue:
-        current_dir = queue.pop()
-        for f in client.list_directories_and_files(share_name, current_dir):
-            if isinstance(f, File):
-                if (pattern and fnmatch(os.path.join(current_dir, f.name), pattern)) or (not pattern):
-                    yield current_dir, f.name
-            elif isinstance(f, Directory):
-                queue.appendleft(os.path.join(current_dir, f.name))
+    def _list(directory):
+        try:
+            return list(client.list_directories_and_files(share_name, directory))
+        except AzureMissingResourceHttpError:
+            if directory:
+                return []
+            raise
+
+    # start from the directory of the literal prefix of the pattern, and skip the directories which cannot match.
+    # the directories of a level are listed concurrently.
+    tokens = _tokenize_pattern(pattern)
+    level = [os.path.dirname(_literal_prefix(tokens))]
+    with ThreadPoolExecutor(max_workers=max_concurrency or get_max_concurrency()) as executor:
+        while level:
+            next_level = []
+            for current_dir, items in zip(level, executor.map(_list, level)):
+                for f in items:
+                    if isinstance(f, File):
+                        if (pattern and fnmatch(os.path.join(current_dir, f.name), pattern)) or (not pattern):
+                            yield current_dir, f.name
+                    elif isinstance(f, Directory):
+                        path = os.path.join(current_dir, f.name)
+                        if not pattern or _can_match_prefix(tokens, os.path.join(path, '')):
+                            next_level.append(path)
+            level = next_level
 
 
 def create_short_lived_container_sas(account_name, account_key, container):
@@ -125,6 +175,42 @@ def mkdir_p(path):
             raise
 
 
+def write_file_atomically(path, content, mode=0o666):
+    """ Write `content` to a new file next to `path` created with `mode`, less the umask, and move it over `path`
+    once it is complete. Readers never see a partial file and the content is never readable by more users than
+    `mode` allows. """
+    import errno
+    import uuid
+    folder, name = os.path.split(path)
+    flags = os.O_CREAT | os.O_EXCL | os.O_WRONLY
+    while True:
+        temp_path = os.path.join(folder, '.{}.{}.tmp'.format(name, uuid.uuid4().hex[:8]))
+        try:
+            fd = os.open(temp_path, flags, mode)
+            break
+        except OSError as ex:
+            if ex.errno != errno.EEXIST:
+                raise
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        replace_file(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def replace_file(source, destination):
+    if hasattr(os, 'replace'):
+        os.replace(source, destination)
+        return
+    # Python 2: os.rename replaces existing files on POSIX only
+    if os.name == 'nt' and os.path.exists(destination):
+        os.remove(destination)
+    os.rename(source, destination)
+
+
 def _pattern_has_wildcards(p):
     return not p or p.find('*') != -1 or p.find('?') != -1 or p.find('[') != -1
 
@@ -133,6 +219,72 @@ def _match_path(pattern, *args):
     return fnmatch(os.path.join(*args), pattern) if pattern else True
 
 
+_STAR = '*'
+
+
+def _tokenize_pattern(pattern):
+    """ Split a pattern into the tokens matching a single character each, and '*'. """
+    tokens = []
+    i, n = 0, len(pattern or '')
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == '*':
+            if not tokens or tokens[-1] != _STAR:
+                tokens.append(_STAR)
+        elif c == '[':
+            j = i
+            if j < n and pattern[j] == '!':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            while j < n and pattern[j] != ']':
+                j += 1
+            if j >= n:
+                tokens.append('[[]')
+            else:
+                tokens.append(pattern[i - 1:j + 1])
+                i = j + 1
+        else:
+            tokens.append(c)
+    return tokens
+
+
+def _literal_prefix(tokens):
+    """ The characters the paths matching the pattern start with. """
+    prefix = ''
+    for token in tokens:
+        if token in (_STAR, '?') or len(token) > 1 and token != '[[]':
+            break
+        prefix += '[' if token == '[[]' else token
+    return prefix
+
+
+def _can_match_prefix(tokens, path):
+    """ Whether the paths starting with the given path may match the pattern. """
+    def _closure(states):
+        for i in list(states):
+            while i < len(tokens) and tokens[i] == _STAR:
+                i += 1
+                states.add(i)
+        return states
+
+    states = _closure(set([0]))
+    for c in path:
+        matched = set()
+        for i in states:
+            if i == len(tokens):
+                continue
+            if tokens[i] == _STAR:
+                matched.add(i)
+            elif fnmatch(c, tokens[i]):
+                matched.add(i + 1)
+        if not matched:
+            return False
+        states = _closure(matched)
+    return True
+
+
 def get_blob_tier_names(model):
     return [v for v in dir(get_sdk(ResourceType.DATA_STORAGE, 'blob.models#' + model)) if not v.startswith('_')]
 
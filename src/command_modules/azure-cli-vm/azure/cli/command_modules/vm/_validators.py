@@ -8,13 +8,10 @@
 import os
 import re
 
-from msrestazure.azure_exceptions import CloudError
-
-from azure.mgmt.keyvault import KeyVaultManagementClient
 import azure.cli.core.azlogging as azlogging
 from azure.cli.core.commands.arm import resource_id, parse_resource_id, is_valid_resource_id
 from azure.cli.core.commands.validators import \
-    (get_default_location_from_resource_group, validate_file_or_dict, validate_parameter_set)
+    (get_default_location_from_resource_group, validate_file_or_dict, validate_parameter_set, run_validators)
 from azure.cli.core.util import CLIError, hash_string
 from azure.cli.command_modules.vm._vm_utils import check_existence
 from azure.cli.command_modules.vm._template_builder import StorageProfile
@@ -65,6 +62,7 @@ def _get_resource_group_from_vault_name(vault_name):
     :return: resource group name or None
     :rtype: str
     """
+    from azure.mgmt.keyvault import KeyVaultManagementClient
     from azure.cli.core.commands.client_factory import get_mgmt_service_client
     client = get_mgmt_service_client(KeyVaultManagementClient).vaults
     for vault in client.list():
@@ -160,6 +158,7 @@ def _validate_secrets(secrets, os_type):
 def _parse_image_argument(namespace):
     """ Systematically determines what type is supplied for the --image parameter. Updates the
         namespace and returns the type for subsequent processing. """
+    from msrestazure.azure_exceptions import CloudError
     # 1 - easy check for URI
     if namespace.image.lower().endswith('.vhd'):
         return 'uri'
@@ -778,24 +777,38 @@ def _resolve_role_id(role, scope):
     return role_id
 
 
-def process_vm_create_namespace(namespace):
-    get_default_location_from_resource_group(namespace)
-    _validate_vm_create_storage_profile(namespace)
+def _validate_vm_create_storage_account_for_profile(namespace):
     if namespace.storage_profile in [StorageProfile.SACustomImage,
                                      StorageProfile.SAPirImage]:
         _validate_vm_create_storage_account(namespace)
 
-    _validate_vm_create_availability_set(namespace)
-    _validate_vm_vmss_create_vnet(namespace)
-    _validate_vm_create_nsg(namespace)
-    _validate_vm_create_public_ip(namespace)
-    _validate_vm_create_nics(namespace)
-    _validate_vm_vmss_create_auth(namespace)
+
+def _validate_vm_create_os_type_options(namespace):
     if namespace.secrets:
         _validate_secrets(namespace.secrets, namespace.os_type)
     if namespace.license_type and namespace.os_type.lower() != 'windows':
         raise CLIError('usage error: --license-type is only applicable on Windows VM')
-    _validate_vm_vmss_msi(namespace)
+
+
+def process_vm_create_namespace(namespace):
+    # the lookups of the validators are independent unless stated, so they run concurrently
+    location = get_default_location_from_resource_group
+    storage_profile = _validate_vm_create_storage_profile
+    public_ip = _validate_vm_create_public_ip
+    run_validators(namespace, [
+        (location, []),
+        (storage_profile, [location]),
+        (_validate_vm_create_storage_account_for_profile, [location, storage_profile]),
+        (_validate_vm_create_availability_set, []),
+        (_validate_vm_vmss_create_vnet, [location]),
+        (_validate_vm_create_nsg, []),
+        (public_ip, []),
+        # existing NICs override the public IP type
+        (_validate_vm_create_nics, [public_ip]),
+        (_validate_vm_vmss_create_auth, [storage_profile]),
+        (_validate_vm_create_os_type_options, [storage_profile]),
+        (_validate_vm_vmss_msi, [])
+    ], interactive=[_validate_vm_vmss_create_auth])
 
 # endregion
 
@@ -824,6 +837,7 @@ def _get_default_address_pool(resource_group, balancer_name, balancer_type):
 
 
 def _validate_vmss_create_load_balancer_or_app_gateway(namespace):
+    from msrestazure.azure_exceptions import CloudError
 
     INSTANCE_THRESHOLD = _get_vmss_create_instance_threshold()
 
@@ -925,16 +939,31 @@ def get_network_client():
     return get_mgmt_service_client(ResourceType.MGMT_NETWORK)
 
 
-def process_vmss_create_namespace(namespace):
-    get_default_location_from_resource_group(namespace)
+def _validate_vmss_create_storage_profile(namespace):
     _validate_vm_create_storage_profile(namespace, for_scale_set=True)
+
+
+def _validate_vmss_create_vnet(namespace):
     _validate_vm_vmss_create_vnet(namespace, for_scale_set=True)
-    _validate_vmss_create_load_balancer_or_app_gateway(namespace)
-    _validate_vmss_create_subnet(namespace)
-    _validate_vmss_create_public_ip(namespace)
-    _validate_vmss_create_nsg(namespace)
-    _validate_vm_vmss_create_auth(namespace)
-    _validate_vm_vmss_msi(namespace)
+
+
+def process_vmss_create_namespace(namespace):
+    # the lookups of the validators are independent unless stated, so they run concurrently
+    location = get_default_location_from_resource_group
+    storage_profile = _validate_vmss_create_storage_profile
+    vnet = _validate_vmss_create_vnet
+    balancer = _validate_vmss_create_load_balancer_or_app_gateway
+    run_validators(namespace, [
+        (location, []),
+        (storage_profile, [location]),
+        (vnet, [location]),
+        (balancer, [vnet]),
+        (_validate_vmss_create_subnet, [vnet, balancer]),
+        (_validate_vmss_create_public_ip, [balancer]),
+        (_validate_vmss_create_nsg, []),
+        (_validate_vm_vmss_create_auth, [storage_profile]),
+        (_validate_vm_vmss_msi, [])
+    ], interactive=[_validate_vm_vmss_create_auth])
 
     if not namespace.public_ip_per_vm and namespace.vm_domain_name:
         raise CLIError('Usage error: --vm-domain-name can only be used when --public-ip-per-vm is enabled')
@@ -950,6 +979,7 @@ def validate_vm_disk(namespace):
 
 
 def process_disk_or_snapshot_create_namespace(namespace):
+    from msrestazure.azure_exceptions import CloudError
     if namespace.source:
         usage_error = 'usage error: --source {SNAPSHOT | DISK} | --source VHD_BLOB_URI [--source-storage-account-id ID]'
         try:
@@ -961,6 +991,7 @@ def process_disk_or_snapshot_create_namespace(namespace):
 
 
 def process_image_create_namespace(namespace):
+    from msrestazure.azure_exceptions import CloudError
     try:
         # try capturing from VM, a most common scenario
         compute_client = _compute_client_factory()
@@ -995,6 +1026,7 @@ def process_image_create_namespace(namespace):
 
 
 def _figure_out_storage_source(resource_group_name, source):
+    from msrestazure.azure_exceptions import CloudError
     source_blob_uri = None
     source_disk = None
     source_snapshot = None
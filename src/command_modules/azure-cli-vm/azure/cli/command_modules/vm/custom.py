@@ -18,14 +18,14 @@ except ImportError:
 from six.moves.urllib.request import urlopen  # noqa, pylint: disable=import-error,unused-import
 from azure.cli.command_modules.vm._validators import _get_resource_group_from_vault_name
 from azure.cli.core.commands.validators import validate_file_or_dict, DefaultStr, DefaultInt
-from azure.keyvault import KeyVaultId
 
 from azure.cli.core.commands import LongRunningOperation, DeploymentOutputLongRunningOperation
 from azure.cli.core.commands.arm import parse_resource_id, resource_id, is_valid_resource_id
+from azure.cli.core.commands.arm_batch import ArmRequestBatch
 from azure.cli.core.commands.client_factory import get_mgmt_service_client, get_data_service_client
 from azure.cli.core.util import CLIError
 import azure.cli.core.azlogging as azlogging
-from azure.cli.core.profiles import get_sdk, ResourceType, supported_api_version
+from azure.cli.core.profiles import get_sdk, get_api_version, ResourceType, supported_api_version
 
 from ._vm_utils import read_content_if_is_file
 from ._vm_diagnostics_templates import get_default_diag_config
@@ -173,23 +173,28 @@ def get_vm_details(resource_group_name, vm_name):
     fqdns = []
     private_ips = []
     mac_addresses = []
-    # pylint: disable=line-too-long,no-member
+    # the NICs and then their public IPs are retrieved in ARM batch requests
+    api_version = get_api_version(ResourceType.MGMT_NETWORK)
+    batch = ArmRequestBatch(network_client)
     for nic_ref in result.network_profile.network_interfaces:
-        nic_parts = parse_resource_id(nic_ref.id)
-        nic = network_client.network_interfaces.get(nic_parts['resource_group'], nic_parts['name'])
-        if nic.mac_address:
-            mac_addresses.append(nic.mac_address)
-        for ip_configuration in nic.ip_configurations:
-            private_ips.append(ip_configuration.private_ip_address)
-            if ip_configuration.public_ip_address:
-                res = parse_resource_id(ip_configuration.public_ip_address.id)
-                public_ip_info = network_client.public_ip_addresses.get(res['resource_group'],
-                                                                        res['name'])
-                if public_ip_info.ip_address:
-                    public_ips.append(public_ip_info.ip_address)
-                if public_ip_info.dns_settings:
-                    fqdns.append(public_ip_info.dns_settings.fqdn)
+        batch.add_get(nic_ref.id, api_version)
+    for nic in [r.result() for r in batch.resolve()]:
+        nic_properties = nic.get('properties', {})
+        if nic_properties.get('macAddress'):
+            mac_addresses.append(nic_properties['macAddress'])
+        for ip_configuration in nic_properties.get('ipConfigurations', []):
+            ip_properties = ip_configuration.get('properties', {})
+            private_ips.append(ip_properties.get('privateIPAddress'))
+            if ip_properties.get('publicIPAddress'):
+                batch.add_get(ip_properties['publicIPAddress']['id'], api_version)
+    for public_ip_info in [r.result() for r in batch.resolve()]:
+        public_ip_properties = public_ip_info.get('properties', {})
+        if public_ip_properties.get('ipAddress'):
+            public_ips.append(public_ip_properties['ipAddress'])
+        if public_ip_properties.get('dnsSettings'):
+            fqdns.append(public_ip_properties['dnsSettings'].get('fqdn'))
 
+    # pylint: disable=line-too-long,no-member
     setattr(result, 'power_state',
             ','.join([s.display_status for s in result.instance_view.statuses if s.code.startswith('PowerState/')]))
     setattr(result, 'public_ips', ','.join(public_ips))
@@ -2077,6 +2082,7 @@ def get_vm_format_secret(secrets, certificate_store=None):
     :return: formatted secrets as an array
     :rtype: list
     """
+    from azure.keyvault import KeyVaultId
     from azure.mgmt.keyvault import KeyVaultManagementClient
     client = get_mgmt_service_client(KeyVaultManagementClient).vaults
     grouped_secrets = {}
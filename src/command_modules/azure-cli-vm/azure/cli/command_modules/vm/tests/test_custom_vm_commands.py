@@ -15,7 +15,7 @@ from azure.cli.command_modules.vm.custom import (_get_access_extension_upgrade_i
                                                  _WINDOWS_ACCESS_EXT,
                                                  _get_extension_instance_name)
 from azure.cli.command_modules.vm.custom import \
-    (attach_unmanaged_data_disk, detach_data_disk, get_vmss_instance_view)
+    (attach_unmanaged_data_disk, detach_data_disk, get_vmss_instance_view, get_vm_details)
 from azure.cli.command_modules.vm.disk_encryption import (encrypt_vm, decrypt_vm, _check_encrypt_is_supported,
                                                           encrypt_vmss, decrypt_vmss)
 from azure.mgmt.compute.models import (NetworkProfile, StorageProfile, DataDisk, OSDisk,
@@ -24,7 +24,7 @@ from azure.mgmt.compute.models import (NetworkProfile, StorageProfile, DataDisk,
                                        VirtualMachineExtension, ImageReference,
                                        DiskCreateOptionTypes, CachingTypes,
                                        VirtualMachineScaleSetVMProfile, VirtualMachineScaleSetOSProfile,
-                                       LinuxConfiguration)
+                                       LinuxConfiguration, NetworkInterfaceReference, VirtualMachineInstanceView)
 
 
 class Test_Vm_Custom(unittest.TestCase):
@@ -210,6 +210,43 @@ class Test_Vm_Custom(unittest.TestCase):
         vm_client.virtual_machine_scale_set_vms.list.assert_called_once_with('rg1', 'vmss1', expand='instanceView',
                                                                              select='instanceView')
 
+    @mock.patch('azure.cli.core.commands.arm_batch.ArmRequestBatch._post_batch', autospec=True)
+    @mock.patch('azure.cli.command_modules.vm.custom.get_mgmt_service_client', autospec=True)
+    @mock.patch('azure.cli.command_modules.vm.custom.get_instance_view', autospec=True)
+    def test_get_vm_details_batches_network_requests(self, mock_instance_view, mock_client, mock_post_batch):
+        nic_id = '/subscriptions/sub1/resourceGroups/rg1/providers/Microsoft.Network/networkInterfaces/nic{}'
+        ip_id = '/subscriptions/sub1/resourceGroups/rg1/providers/Microsoft.Network/publicIPAddresses/ip{}'
+        vm = FakedVM([NetworkInterfaceReference(nic_id.format(i)) for i in range(2)])
+        vm.instance_view = VirtualMachineInstanceView(
+            statuses=[InstanceViewStatus(code='PowerState/running', display_status='VM running')])
+        mock_instance_view.return_value = vm
+        mock_client.return_value.config.base_url = 'https://management.azure.com'
+        resources = {}
+        for i in range(2):
+            resources[nic_id.format(i)] = {'properties': {
+                'macAddress': '00-0D-3A-00-00-0{}'.format(i),
+                'ipConfigurations': [{'properties': {'privateIPAddress': '10.0.0.{}'.format(i),
+                                                     'publicIPAddress': {'id': ip_id.format(i)}}}]}}
+            resources[ip_id.format(i)] = {'properties': {'ipAddress': '40.0.0.{}'.format(i),
+                                                         'dnsSettings': {'fqdn': 'vm{}.westus'.format(i)}}}
+
+        def _post_batch(_, content):
+            return [{'name': r['name'], 'httpStatusCode': 200,
+                     'content': resources[r['url'].split('https://management.azure.com')[1].split('?')[0]]}
+                    for r in content['requests']]
+        mock_post_batch.side_effect = _post_batch
+
+        # execute
+        result = get_vm_details('rg1', 'vm1')
+
+        # assert
+        self.assertEqual(mock_post_batch.call_count, 2)
+        self.assertEqual(result.private_ips, '10.0.0.0,10.0.0.1')
+        self.assertEqual(result.public_ips, '40.0.0.0,40.0.0.1')
+        self.assertEqual(result.fqdns, 'vm0.westus,vm1.westus')
+        self.assertEqual(result.mac_addresses, '00-0D-3A-00-00-00,00-0D-3A-00-00-01')
+        self.assertEqual(result.power_state, 'VM running')
+
     # pylint: disable=line-too-long
     @mock.patch('azure.cli.command_modules.vm.disk_encryption._compute_client_factory', autospec=True)
     @mock.patch('azure.cli.command_modules.vm.disk_encryption._get_keyvault_key_url', autospec=True)